@@ -53,6 +53,9 @@ class Construction(Record):
 #@ - a field id can be created dynamically by specifying a "dynamic_id" in the table meta.
 #@ - a field can be specified as unique in the table, uniqueness can be attributed to a unique field or a set of fields
 #@ - all records have a get_index field, by default records are sorted in ascending order, if a specific order is needed a field can have a sort_index
+#@ - values can be stored by column ("columnar = True"): boolean, integer, float and string fields are stored in numpy arrays, and table.column(field_name) returns them without python work per record
+#@ - fields or sets of fields can be indexed ("indexes = ("zone", ("kind", "floor"))"): table.select_by(zone=zone, kind="wall") then only reads matching records (unique fields are also indexed)
+#@ - numeric or date fields can have a sorted index ("sorted_indexes = ("area",)"): table.select_range("area", 10, 20) (bounds included) and table.order_by("area") then use bisections instead of reading all records
 
 #@ For example, let's define a new table with TableMeta:
 
@@ -0,0 +1,130 @@
+import itertools
+
+from .oerrors_omemdb import OExceptionCollection
+
+
+class Batch:
+    """
+    Steps deferred by a db batch (see Db.batch): uniqueness checks and sort indexes setting of touched tables, post
+    save of modified records.
+    """
+    def __init__(self, db):
+        self._db = db
+        self._tables = {}  # {table: None, ...} (dicts are used as ordered sets)
+        self._post_save_records = {}  # {record: created, ...}
+
+    def touch(self, table):
+        """
+        table was modified: its uniqueness will be checked and its sort indexes set on commit
+        """
+        self._tables[table] = None
+
+    def add_post_save(self, record, created):
+        """
+        post save is called once per record (created if record was added during batch)
+        """
+        self._tables[record.get_table()] = None
+        self._post_save_records.setdefault(record, created)
+
+    def commit(self):
+        """
+        Raises
+        ------
+        OExceptionCollection if uniqueness is not respected (post save is not called)
+        """
+        # check uniqueness (all tables, so that all errors are reported)
+        oec = OExceptionCollection()
+        for table in self._tables:
+            with oec.catch_errors():
+                table._dev_check_uniqueness()
+        oec.raise_if_error()
+
+        # set sort indexes
+        for table in self._tables:
+            table._dev_set_all_sort_indexes()
+
+        # post save (records deleted during batch are skipped)
+        with self._db._dev_journal_suspended():
+            for record, created in self._post_save_records.items():
+                if record.get_table() is not None:
+                    record._dev_post_save(created, False)  # not db_is_initializing
+
+
+class UndoLog:
+    """
+    Changes of a db batch (see Db.batch), so that it can be rolled back: data of updated and deleted records before
+    their first modification, added records, and placements of records in sortable tables (logged by sort managers).
+    Rollback restores records in place, records retrieved before the batch remain valid.
+    """
+    def __init__(self, db):
+        self._db = db
+        self._saved_data = {}  # {table: {record: data, ...}, ...}
+        self._added_records = {}  # {table: {record: None, ...}, ...} (dicts are used as ordered sets)
+        self._deleted_records = {}  # {record: {sorted index field: indexing order, ...}, ...}
+
+    def touch(self, table):
+        """
+        table will be modified (its sort manager logs operations)
+        """
+        if table in self._saved_data:
+            return
+        self._saved_data[table] = {}
+        self._added_records[table] = {}
+        if table._dev_sortable:
+            table._sort_manager.start_undo_log()
+
+    def save(self, record):
+        """
+        record will be modified (updated or deleted): its data is saved, unless it was already saved or record was
+        added during batch
+        """
+        table = record.get_table()
+        self.touch(table)
+        if record not in self._saved_data[table] and record not in self._added_records[table]:
+            self._saved_data[table][record] = record._dev_get_data()
+
+    def add(self, record):
+        table = record.get_table()
+        self.touch(table)
+        self._added_records[table][record] = None
+
+    def delete(self, record):
+        """
+        record will be removed from its table (it was saved before being unregistered)
+        """
+        table = record.get_table()
+        if record in self._added_records[table]:  # nothing to restore
+            del self._added_records[table][record]
+        else:  # indexing orders are kept, so that order of equal values is restored
+            self._deleted_records[record] = {
+                field_name: index.get_num(record) for field_name, index in table._dev_sorted_indexes.items()}
+
+    def close(self):
+        """
+        stops logging (batch was committed or rolled back)
+        """
+        for table in self._saved_data:
+            if table._dev_sortable:
+                table._sort_manager.stop_undo_log()
+
+    def rollback(self):
+        """
+        restores saved records and removes added ones (no hooks are called), then stops logging
+        """
+        relations_manager = self._db._dev_relations_manager
+
+        # replace current links of logged records by saved ones (links pointing on added records are links of logged
+        # records)
+        for table, saved_data in self._saved_data.items():
+            for record in itertools.chain(self._added_records[table], saved_data):
+                relations_manager.unregister_links_from(record)
+            for record, data in saved_data.items():
+                for field, descriptor in table._dev_linkable_fields:
+                    if data.get(field) is not None:
+                        for record_link in descriptor._dev_get_links(data[field]):
+                            relations_manager.restore_link(record_link)
+
+        # restore records
+        for table, saved_data in self._saved_data.items():
+            table._dev_rollback(saved_data, tuple(self._added_records[table]), self._deleted_records)
+        self.close()
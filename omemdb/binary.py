@@ -0,0 +1,204 @@
+import io
+import json
+import struct
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from omemdb.packages.omarsh import fields
+
+from . import CONF
+from .util import write_file_atomically
+
+ARRAY_KEY = "__omemdb_array__"  # {ARRAY_KEY: [block, offset, shape]}
+SERIES_KEY = "__omemdb_series__"  # {SERIES_KEY: [data block, data offset, index block, index offset, length, name,
+#   date_format]}
+
+_DATA_NAME = "data.json"
+
+
+def _get_block_name(block_num):
+    return f"blocks/{block_num}.npy"
+
+
+class _BlocksWriter:
+    """
+    arrays are concatenated by (table, field, dtype), each concatenation is stored as a npy block
+    """
+    def __init__(self):
+        self._blocks = {}  # {key: [arrays, size, block_num], ...}
+
+    def add(self, key, array):
+        """
+        Returns
+        -------
+        block_num, offset
+        """
+        if key not in self._blocks:
+            self._blocks[key] = [[], 0, len(self._blocks)]
+        arrays, size, block_num = self._blocks[key]
+        arrays.append(array.ravel())
+        self._blocks[key][1] = size + array.size
+        return block_num, size
+
+    def write(self, zip_file):
+        for arrays, size, block_num in self._blocks.values():
+            with zip_file.open(_get_block_name(block_num), "w", force_zip64=True) as f:
+                np.save(f, np.concatenate(arrays), allow_pickle=False)
+
+
+def _memmap_block(path, zip_info):
+    """
+    blocks are stored without compression: they are mapped directly from the container file
+    """
+    if zip_info.compress_type != zipfile.ZIP_STORED:
+        raise ValueError(f"can't memory-map compressed block {zip_info.filename}")
+    with open(path, "rb") as f:
+        # skip local file header (extra field length may differ from central directory one)
+        f.seek(zip_info.header_offset)
+        name_length, extra_length = struct.unpack("<HH", f.read(30)[26:30])
+        f.seek(zip_info.header_offset + 30 + name_length + extra_length)
+
+        # read npy header
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, _, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, _, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+    if shape[0] == 0:  # empty files can't be mapped
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape)
+
+
+def _is_binary_array(value):
+    return isinstance(value, np.ndarray) and not value.dtype.hasobject
+
+
+def _is_binary_series(value):
+    return (
+            isinstance(value, pd.Series)
+            and isinstance(value.index, pd.DatetimeIndex)
+            and value.index.tz is None
+            and not value.dtype.hasobject
+            and isinstance(value.name, (str, int, float, bool, type(None)))
+    )
+
+
+def db_to_binary(db, buffer_or_path):
+    """
+    Container is a zip file: json data of records (data.json), numpy arrays and time series being stored in npy blocks.
+    Only NumpyArray and TimeSeries fields are concerned (other values and non numeric arrays or series are stored as
+    json data).
+    """
+    # prepare json data (arrays and series are replaced by their position in blocks)
+    blocks = _BlocksWriter()
+    json_data = {"__version__": db.version}
+    for table in db:
+        schema = table._dev_schema
+        binary_fields = [
+            (name, type(field)) for name, field in schema.declared_fields.items()
+            if type(field) in (fields.NumpyArray, fields.TimeSeries)
+        ]
+        table_data = []
+        for record in table:
+            record_dict = record.to_dict(raw_links=True)
+            binary_values = {}
+            for name, field_type in binary_fields:
+                value = record_dict[name]
+                if field_type is fields.NumpyArray and _is_binary_array(value):
+                    block_num, offset = blocks.add((table.get_ref(), name, value.dtype.str), value)
+                    binary_values[name] = {ARRAY_KEY: [block_num, offset, list(value.shape)]}
+                elif field_type is fields.TimeSeries and _is_binary_series(value):
+                    data_block_num, data_offset = blocks.add((table.get_ref(), name, value.dtype.str), value.values)
+                    index_block_num, index_offset = blocks.add(
+                        (table.get_ref(), name, "index"),
+                        np.asarray(value.index.values, dtype="datetime64[ns]").view("int64")
+                    )
+                    binary_values[name] = {SERIES_KEY: [
+                        data_block_num,
+                        data_offset,
+                        index_block_num,
+                        index_offset,
+                        len(value),
+                        value.name,
+                        schema.declared_fields[name]._date_format
+                    ]}
+                else:
+                    continue
+                record_dict[name] = None  # not serialized
+            record_data = schema.dump(record_dict)
+            record_data.update(binary_values)
+            table_data.append(record_data)
+        json_data[table.get_ref()] = table_data
+
+    # write
+    def write(buffer):
+        with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as zip_file:
+            zip_file.writestr(_DATA_NAME, json.dumps(json_data, ensure_ascii=CONF.ensure_ascii))
+            blocks.write(zip_file)
+
+    if isinstance(buffer_or_path, str):
+        write_file_atomically(buffer_or_path, write, is_bytes=True)
+    else:
+        write(buffer_or_path)
+
+
+def json_data_from_binary(buffer_or_path, decode=True, mmap=False):
+    """
+    Parameters
+    ----------
+    buffer_or_path
+    decode: bool or callable, default True
+        if True, arrays and series are returned as numpy arrays and pandas series (that fields deserialize directly),
+        else they are converted to their json data (if json data must be prepared or migrated). If callable, is called
+        with json data (arrays and series not being converted yet) and must return a bool.
+    mmap: bool, default False
+        path only. If True, blocks are memory-mapped (read-only): arrays and series values are views on the file, their
+        bytes are read when they are accessed.
+
+    Returns
+    -------
+    json_data
+    """
+    assert not mmap or isinstance(buffer_or_path, str), "buffer_or_path must be a path to memory-map blocks"
+    with zipfile.ZipFile(buffer_or_path, "r") as zip_file:
+        json_data = json.loads(zip_file.read(_DATA_NAME).decode(CONF.encoding))
+        if callable(decode):
+            decode = decode(json_data)
+        blocks = {}
+
+        def get_block(block_num):
+            if block_num not in blocks:
+                block_name = _get_block_name(block_num)
+                if mmap:
+                    blocks[block_num] = _memmap_block(buffer_or_path, zip_file.getinfo(block_name))
+                else:
+                    blocks[block_num] = np.load(io.BytesIO(zip_file.read(block_name)), allow_pickle=False)
+            return blocks[block_num]
+
+        for table_ref, table_data in json_data.items():
+            if not isinstance(table_data, list):
+                continue
+            for record_data in table_data:
+                for key, value in record_data.items():
+                    if type(value) is not dict:
+                        continue
+                    if ARRAY_KEY in value:
+                        block_num, offset, shape = value[ARRAY_KEY]
+                        array = get_block(block_num)[offset:offset + int(np.prod(shape))].reshape(shape)
+                        record_data[key] = array if decode else array.tolist()
+                    elif SERIES_KEY in value:
+                        (data_block_num, data_offset, index_block_num, index_offset, length, name,
+                         date_format) = value[SERIES_KEY]
+                        index = get_block(index_block_num)[index_offset:index_offset + length].view("M8[ns]")
+                        series = pd.Series(
+                            data=get_block(data_block_num)[data_offset:data_offset + length],
+                            index=pd.DatetimeIndex(index),
+                            name=name
+                        )
+                        record_data[key] = series if decode else \
+                            fields.TimeSeries(date_format=date_format)._serialize(series, None, None)
+
+    return json_data
@@ -0,0 +1,141 @@
+import math
+
+from omemdb.packages.omarsh import fields, missing as MISSING, EXCLUDE
+from omemdb.packages.omarsh.decorators import PRE_LOAD, POST_LOAD, VALIDATES, VALIDATES_SCHEMA
+from omemdb.packages.omarsh.no_validation_deserializer import deserialize_field
+
+from .omemdb_fields.api import LinkField
+from .record_link import RecordLink
+
+
+class BulkLoadError(Exception):
+    """
+    raised when bulk loader could not load records data (per record loading must be used instead, to report errors)
+    """
+
+
+class BulkLoader:
+    """
+    Deserializes a list of records data column by column (one precompiled converter per field), instead of calling
+    schema.load record by record.
+
+    Only simple tables are supported (see is_supported): no schema processors or field validation methods, no dynamic
+    fields, no custom record initialization. If a value can't be converted, a BulkLoadError is raised and per record
+    loading must be used (errors are reported by per record loading only).
+    """
+    def __init__(self, table):
+        self._table = table
+        schema = table._dev_schema
+        self._converters = [
+            (field.attribute or name, _get_column_converter(field, name))
+            for name, field in schema.load_fields.items()
+        ]
+
+    @classmethod
+    def is_supported(cls, table):
+        schema = table._dev_schema
+        record_cls = table._dev_record_cls
+
+        # processors
+        for tag in (PRE_LOAD, POST_LOAD, VALIDATES_SCHEMA):
+            if schema._has_processors(tag):
+                return False
+        if len(schema._hooks[VALIDATES]) > 0:
+            return False
+
+        # dynamic fields
+        if hasattr(record_cls.Schema, "dynamic_post_load"):
+            return False
+
+        # load options
+        if schema.unknown != EXCLUDE or schema.partial:
+            return False
+        for name, field in schema.load_fields.items():
+            if field.data_key is not None or (field.attribute is not None and "." in field.attribute):
+                return False
+
+        # record initialization
+        from .record import Record  # touchy import
+        if record_cls.__init__ is not Record.__init__ or record_cls._update_inert is not Record._update_inert:
+            return False
+
+        return True
+
+    def load(self, records_data, skip_validation=False):
+        """
+        Parameters
+        ----------
+        records_data: list of dicts
+        skip_validation: bool, default False
+
+        Returns
+        -------
+        list of deserialized data dicts
+
+        Raises
+        ------
+        BulkLoadError
+        """
+        for data in records_data:
+            if not isinstance(data, dict):
+                raise BulkLoadError("records data must be dicts")
+
+        rows = [{} for _ in range(len(records_data))]
+        for key, converter in self._converters:
+            try:
+                column = converter(records_data, skip_validation)
+            except Exception as e:
+                raise BulkLoadError(str(e)) from e
+            for row, value in zip(rows, column):
+                if value is not MISSING:
+                    row[key] = value
+        return rows
+
+
+def _get_column_converter(field, name):
+    """
+    Returns
+    -------
+    converter: (records_data, skip_validation) -> list of deserialized values (MISSING if value must not be stored)
+    """
+    def convert(value, data, skip_validation):
+        # generic conversion (same as schema load)
+        if value is MISSING:
+            field._validate_missing(value)
+            load_default = field.load_default
+            return load_default() if callable(load_default) else load_default
+        return deserialize_field(field, value, name, data, skip_validation=skip_validation)
+
+    # prepare fast conversion of most common values
+    fast_type, fast_convert = None, None
+    field_type = type(field)
+    if field_type is fields.String:
+        fast_type, fast_convert = str, None
+    elif field_type is fields.Integer:
+        fast_type, fast_convert = int, None
+    elif field_type is fields.Float:
+        fast_type = float
+        if not field.allow_nan:  # special values must be rejected by generic conversion
+            fast_convert = lambda v: v if math.isfinite(v) else convert(v, None, False)
+    elif field_type is LinkField:
+        target_table_ref, metadata = field.target_table_ref, field.metadata
+        fast_type, fast_convert = str, lambda v: RecordLink.from_id(target_table_ref, v, **metadata)
+    allow_none = field.allow_none
+
+    def convert_column(records_data, skip_validation):
+        # fast conversion is only possible if no validation is needed
+        if fast_type is None or (field.validators and not skip_validation):
+            return [convert(data.get(name, MISSING), data, skip_validation) for data in records_data]
+
+        values = []
+        for data in records_data:
+            value = data.get(name, MISSING)
+            if type(value) is fast_type:
+                values.append(value if fast_convert is None else fast_convert(value))
+            elif value is None and allow_none:
+                values.append(None)
+            else:
+                values.append(convert(value, data, skip_validation))
+        return values
+
+    return convert_column
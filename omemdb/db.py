@@ -1,8 +1,12 @@
 import collections
+import concurrent.futures
+import contextlib
+import gc
 from typing import Iterable
 import os
 import logging
 import importlib
+import itertools
 
 from . import CONF
 from .util import json_load, json_dump
@@ -11,12 +15,33 @@ from .oerrors_omemdb import OExceptionCollection, MissingVersionKey, MissingTabl
     VersionIsTooLowAutoMigrateIsOff, OmemdbMarshValidator
 
 from .table import Table
-from .util import json_data_to_json, camel_to_lower
+from .record import Record
+from .util import json_data_to_json, json_data_to_json_file, camel_to_lower
 from .relations_manager import RelationsManager
+from .json_stream import JsonObjectStream, materialize
+from .journal import Journal
+from .batch import Batch, UndoLog
+from .binary import db_to_binary, json_data_from_binary
 
 logger = logging.getLogger(__name__)
 
 
+@contextlib.contextmanager
+def _paused_gc():
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _read_json_file(path):
+    with open(path, encoding=CONF.encoding) as f:
+        return json_load(f)
+
+
 def _get_json_data_version(json_data):
     json_data_version = json_data.get("__version__", None)
     if json_data_version is None:
@@ -79,12 +104,21 @@ class Db:
         return json_data
 
     # ---------------------------------------- end of to subclass ------------------------------------------------------
-    def __init__(self, json_data=None, auto_migrate=True, skip_validation=False):
+    def __init__(self, json_data=None, auto_migrate=True, skip_validation=False, bulk_load=False):
         """
+        Parameters
+        ----------
+        json_data: dict, default None
+        auto_migrate: bool, default True
+        skip_validation: bool, default False
+        bulk_load: bool, default False
+            if True, tables that support it are deserialized column by column (faster on big tables). Tables with schema
+            processors, dynamic fields or custom record initialization are loaded record by record.
+
         workflow
         --------
         (methods belonging to create/update/delete framework:
-            db.__init__, table.batch_add, record.update, queryset.delete, record.delete)
+            db.__init__, table.batch_add, record.update, queryset.bulk_update, queryset.delete, record.delete)
         1. add inert
             * data is checked
             * old links are unregistered
@@ -109,6 +143,35 @@ class Db:
                 list(t._dev_link_dependencies)
             ))
 
+        # store dynamic id dependencies (so that dynamic ids are refreshed when a record they depend on is modified)
+        for t_ref, dependencies in table_activation_map.items():
+            t = self._tables[t_ref]
+            if t._dev_dynamic_id_fct is None:
+                continue
+            for dependency_ref in dependencies:
+                if dependency_ref in self._tables:  # else activation map check will fail
+                    self._tables[dependency_ref]._dev_dynamic_id_dependent_tables.add(t)
+                    # records of t may point on dependency through the other tables its id depends on
+                    self._tables[dependency_ref]._dev_dynamic_id_relay_tables.update(
+                        self._tables[ref] for ref in dependencies if ref in self._tables)
+
+        # store sort group dependencies (so that records are regrouped when a record their group may depend on is
+        # modified): linked tables, and tables they link to
+        for t in self._tables.values():
+            if not callable(t._dev_sortable):
+                continue
+            linked_tables = set()
+            to_visit = [t]
+            while len(to_visit) > 0:
+                for dependency_ref in to_visit.pop()._dev_link_dependencies:
+                    dependency = self._tables.get(dependency_ref)
+                    if dependency is not None and dependency not in linked_tables:
+                        linked_tables.add(dependency)
+                        to_visit.append(dependency)
+            for dependency in linked_tables:
+                dependency._dev_sort_group_dependent_tables.add(t)
+                dependency._dev_sort_group_relay_tables.update(linked_tables)
+
         # check activation map
         activation_order = []
         for i in range(10):
@@ -135,6 +198,15 @@ class Db:
         # record links container
         self._dev_relations_manager = RelationsManager(self)
 
+        # change tracking
+        self._dev_populated_revisions = None  # {table_ref: revision, ...} once populated, before post save
+        self._dev_snapshots_revisions = {}  # {multi files dir real path: {table_ref: revision, ...}, ...}
+        self._dev_journal = None
+
+        # batch in progress and its undo log (see batch)
+        self._dev_batch = None
+        self._dev_undo_log = None
+
         # 2. POPULATE IF JSON_DATA
         if json_data is None:
             return
@@ -142,55 +214,104 @@ class Db:
         # pre load json data (may be subclassed for custom data operations)
         json_data = self._pre_load(json_data)
 
-        # check version
-        if self.version is not None:
-            # prepare versions
-            current_version = Version.from_text(self.version)
-            json_data_version = _get_json_data_version(json_data)
+        # check version (and migrate if needed)
+        json_data = self._dev_check_version(json_data, auto_migrate=auto_migrate)
 
-            # migrate if asked and relevant
-            if auto_migrate and (json_data_version.major != current_version.major):
-                json_data = self.migrate(json_data)
+        # populate (garbage collection is paused during bulk loading: numerous objects are created and none of them
+        # is garbage)
+        with _paused_gc() if bulk_load else contextlib.nullcontext():
+            self._dev_populate(
+                ((table_ref, json_data[table_ref]) for table_ref in self._tables if table_ref in json_data),
+                skip_validation=skip_validation,
+                bulk_load=bulk_load
+            )
 
-            # update json_data_version
-            json_data_version = _get_json_data_version(json_data)
+    def _dev_check_version(self, json_data, auto_migrate=True):
+        """
+        Returns
+        -------
+        json_data (migrated if needed)
+        """
+        if self.version is None:
+            return json_data
+
+        # prepare versions
+        current_version = Version.from_text(self.version)
+        json_data_version = _get_json_data_version(json_data)
+
+        # migrate if asked and relevant
+        if auto_migrate and (json_data_version.major != current_version.major):
+            json_data = self.migrate(json_data)
 
-            # check version is not in the future
-            if json_data_version > current_version:
-                raise VersionIsTooHigh(json_data_version, current_version)
+        # update json_data_version
+        json_data_version = _get_json_data_version(json_data)
+
+        # check version is not in the future
+        if json_data_version > current_version:
+            raise VersionIsTooHigh(json_data_version, current_version)
+
+        # check major version is ok
+        if json_data_version.major != current_version.major:
+            raise VersionIsTooLowAutoMigrateIsOff(json_data_version, current_version)
+
+        return json_data
 
-            # check major version is ok
-            if json_data_version.major != current_version.major:
-                raise VersionIsTooLowAutoMigrateIsOff(json_data_version, current_version)
+    def _dev_populate(self, tables_data, skip_validation=False, bulk_load=False):
+        """
+        used by: db.__init__, db.from_json (stream mode)
 
+        Parameters
+        ----------
+        tables_data: iterable of (table_ref, records_data) (data has been checked and migrated, records_data may be a
+            generator)
+        """
         # add records
         added_records_by_table = {}  # {table_ref: [records, ...]
+        found_table_refs = set()
         oec = OExceptionCollection()
-        for table in self._tables.values():
+        for table_ref, records_data in tables_data:
+            found_table_refs.add(table_ref)
             with oec.catch_errors():
-                try:
-                    added_records_by_table[table.get_ref()] = table._dev_add_inert(
-                        json_data[table.get_ref()],
-                        skip_validation=skip_validation)
-                except KeyError:
-                    raise MissingTableKey(table.get_ref())
+                added_records_by_table[table_ref] = self._tables[table_ref]._dev_add_inert(
+                    records_data,
+                    skip_validation=skip_validation,
+                    bulk=bulk_load)
+        for table_ref in self._tables:
+            if table_ref not in found_table_refs:
+                oec.append(MissingTableKey(table_ref))
         oec.raise_if_error()
+        self._dev_populated_revisions = self._dev_get_revisions()
 
         # activate links in correct order (must be done before uniqueness check so links point on records)
         for t_ref in self._activation_order:
-            for r in added_records_by_table.get(t_ref, ()):
-                r._dev_activate_links()
+            self._tables[t_ref]._dev_activate_links(added_records_by_table.get(t_ref, ()))
 
         # check uniqueness and set sort index
         for table in self._tables.values():
             table._dev_check_uniqueness()
             table._dev_set_all_sort_indexes()
 
-        # post save
-        for records in added_records_by_table.values():
+        # post save (skipped for records that don't override it)
+        for table_ref, records in added_records_by_table.items():
+            if self._tables[table_ref]._dev_record_cls._post_save is Record._post_save:
+                continue
             for r in records:
                 r._dev_post_save(True, True)  # created, db_is_initializing
 
+    def _dev_get_revisions(self):
+        return {table_ref: table._dev_revision for table_ref, table in self._tables.items()}
+
+    @contextlib.contextmanager
+    def _dev_journal_suspended(self):
+        """
+        used while hooks are called: their operations are replayed with the operation that called them
+        """
+        journal, self._dev_journal = self._dev_journal, None
+        try:
+            yield
+        finally:
+            self._dev_journal = journal
+
     # --------------------------------------------- public api ---------------------------------------------------------
     @classmethod
     def get_table_refs(cls):
@@ -226,7 +347,53 @@ class Db:
 
     # ----------------------------------------- load -------------------------------------------------------------------
     @classmethod
-    def from_json(cls, buffer_or_path, auto_migrate=True, skip_validation=False):
+    def from_json(
+            cls,
+            buffer_or_path,
+            auto_migrate=True,
+            skip_validation=False,
+            bulk_load=False,
+            stream=False,
+            max_workers=None,
+            use_processes=False,
+            journal_path=None
+    ):
+        """
+        Parameters
+        ----------
+        buffer_or_path: buffer, file path or dir path (multi files)
+        auto_migrate: bool, default True
+        skip_validation: bool, default False
+        bulk_load: bool, default False
+            see Db.__init__
+        stream: bool, default False
+            mono file only. If True, file is parsed table by table and record by record, records being created while
+            file is read (json data is not loaded in memory). If data must be migrated, or if _pre_load was subclassed,
+            whole json data is loaded. With bulk_load, records data of one table is loaded at a time.
+        max_workers: int, default None
+            multi files only. If given, table files are read and parsed concurrently by max_workers workers (records are
+            created while other files are being parsed).
+        use_processes: bool, default False
+            multi files only, if max_workers is given. Use a process pool instead of a thread pool (json parsing does
+            not release the GIL, but parsed data must be sent back to main process).
+        journal_path: str, default None
+            mono file path only (snapshot path, see start_journal). If given, operations of journal (if it exists and
+            belongs to snapshot) are replayed, and journaling is resumed.
+        """
+        # manage journal
+        if journal_path is not None:
+            assert isinstance(buffer_or_path, str) and os.path.isfile(buffer_or_path), \
+                "buffer_or_path must provide snapshot file path if journal_path is given"
+            db = cls.from_json(
+                buffer_or_path,
+                auto_migrate=auto_migrate,
+                skip_validation=skip_validation,
+                bulk_load=bulk_load,
+                stream=stream
+            )
+            db._dev_journal = Journal.resume(db, buffer_or_path, journal_path)
+            return db
+
         # find mode
         if isinstance(buffer_or_path, str) and os.path.isdir(buffer_or_path):  # multi
             # load content
@@ -239,14 +406,37 @@ class Db:
             with open(admin_path, encoding=CONF.encoding) as f:
                 json_data["__version__"] = json_load(f)["__version__"]
 
-            # tables
+            # tables paths
+            tables_paths = {}
             for model in cls.models:
                 table_ref = camel_to_lower(model.__name__)
                 table_path = os.path.join(buffer_or_path, f"{table_ref}.json")
                 if not os.path.exists(table_path):
                     raise FileNotFoundError(f"no file for table {table_ref} at path {table_path}")
-                with open(table_path, encoding=CONF.encoding) as f:
-                    json_data[table_ref] = json_load(f)
+                tables_paths[table_ref] = table_path
+
+            # files contain loaded data if it is neither prepared nor migrated: incremental exports may reuse them
+            files_are_reusable = cls._dev_is_streamable(json_data, auto_migrate=auto_migrate)
+
+            # tables
+            if max_workers is not None:
+                db = cls._dev_from_json_files_concurrently(
+                    json_data,
+                    tables_paths,
+                    max_workers,
+                    use_processes=use_processes,
+                    auto_migrate=auto_migrate,
+                    skip_validation=skip_validation,
+                    bulk_load=bulk_load
+                )
+            else:
+                for table_ref, table_path in tables_paths.items():
+                    json_data[table_ref] = _read_json_file(table_path)
+                db = cls(json_data=json_data, auto_migrate=auto_migrate, skip_validation=skip_validation,
+                         bulk_load=bulk_load)
+            if files_are_reusable:
+                db._dev_snapshots_revisions[os.path.realpath(buffer_or_path)] = db._dev_populated_revisions
+            return db
 
         else:  # mono
             # transform to buffer if is path
@@ -260,13 +450,140 @@ class Db:
 
             # load content
             try:
+                if stream:
+                    return cls._dev_from_json_stream(
+                        buffer_or_path,
+                        auto_migrate=auto_migrate,
+                        skip_validation=skip_validation,
+                        bulk_load=bulk_load
+                    )
                 json_data = json_load(buffer_or_path)
             finally:
                 # close buffer if is path
                 if is_path:
                     buffer_or_path.close()
 
-        return cls(json_data=json_data, auto_migrate=auto_migrate, skip_validation=skip_validation)
+        return cls(json_data=json_data, auto_migrate=auto_migrate, skip_validation=skip_validation, bulk_load=bulk_load)
+
+    @classmethod
+    def from_binary(cls, buffer_or_path, auto_migrate=True, skip_validation=False, bulk_load=False, mmap=False):
+        """
+        Parameters
+        ----------
+        buffer_or_path: binary buffer or file path (see to_binary)
+        auto_migrate: bool, default True
+        skip_validation: bool, default False
+        bulk_load: bool, default False
+            see Db.__init__
+        mmap: bool, default False
+            path only. If True, NumpyArray and TimeSeries values are read-only views on memory-mapped file: their bytes
+            are only read when they are accessed, and are shared by forked processes. File must not be modified while
+            db is used (to_binary replaces it, which is safe on posix systems).
+
+        Arrays and series are loaded from their binary blocks. If data must be migrated, or if _pre_load was
+        subclassed, they are converted to their json data first (so that migrations work on standard json data).
+        """
+        json_data = json_data_from_binary(
+            buffer_or_path,
+            decode=lambda json_data_header: cls._dev_is_streamable(json_data_header, auto_migrate=auto_migrate),
+            mmap=mmap
+        )
+        return cls(json_data=json_data, auto_migrate=auto_migrate, skip_validation=skip_validation, bulk_load=bulk_load)
+
+    @classmethod
+    def _dev_is_streamable(cls, json_data_header, auto_migrate=True):
+        """
+        Returns
+        -------
+        True if tables data can be used while it is read, without preparation or migration
+        """
+        if cls._pre_load is not Db._pre_load:
+            return False
+        if cls.version is None:
+            return True
+        if "__version__" not in json_data_header:
+            return False
+        return not (
+            auto_migrate and
+            _get_json_data_version(json_data_header).major != Version.from_text(cls.version).major
+        )
+
+    @classmethod
+    def _dev_from_json_files_concurrently(
+            cls,
+            json_data_header,
+            tables_paths,
+            max_workers,
+            use_processes=False,
+            auto_migrate=True,
+            skip_validation=False,
+            bulk_load=False
+    ):
+        executor_cls = concurrent.futures.ProcessPoolExecutor if use_processes else \
+            concurrent.futures.ThreadPoolExecutor
+        with executor_cls(max_workers=max_workers) as executor:
+            futures = {
+                table_ref: executor.submit(_read_json_file, table_path)
+                for table_ref, table_path in tables_paths.items()
+            }
+
+            # load everything if data must be prepared or migrated
+            if not cls._dev_is_streamable(json_data_header, auto_migrate=auto_migrate):
+                json_data = dict(json_data_header)
+                json_data.update((table_ref, future.result()) for table_ref, future in futures.items())
+                return cls(
+                    json_data=json_data,
+                    auto_migrate=auto_migrate,
+                    skip_validation=skip_validation,
+                    bulk_load=bulk_load
+                )
+
+            # create records while other tables are parsed (in activation order)
+            db = cls()
+            db._dev_check_version(json_data_header, auto_migrate=auto_migrate)
+            with _paused_gc() if bulk_load else contextlib.nullcontext():
+                db._dev_populate(
+                    ((table_ref, futures.pop(table_ref).result()) for table_ref in db._activation_order),
+                    skip_validation=skip_validation,
+                    bulk_load=bulk_load
+                )
+            return db
+
+    @classmethod
+    def _dev_from_json_stream(cls, buffer, auto_migrate=True, skip_validation=False, bulk_load=False):
+        table_refs = set(cls.get_table_refs())
+        items = JsonObjectStream(buffer).items()
+
+        # read header (items before first table)
+        json_data = {}
+        first_table_item = None
+        for key, value in items:
+            if key in table_refs:
+                first_table_item = (key, value)
+                break
+            json_data[key] = materialize(value)
+        tables_items = itertools.chain(() if first_table_item is None else (first_table_item,), items)
+
+        # load everything if data must be prepared or migrated
+        if not cls._dev_is_streamable(json_data, auto_migrate=auto_migrate):
+            json_data.update((key, materialize(value)) for key, value in tables_items)
+            return cls(
+                json_data=json_data,
+                auto_migrate=auto_migrate,
+                skip_validation=skip_validation,
+                bulk_load=bulk_load
+            )
+
+        # stream
+        db = cls()
+        db._dev_check_version(json_data, auto_migrate=auto_migrate)
+        with _paused_gc() if bulk_load else contextlib.nullcontext():
+            db._dev_populate(
+                ((key, value) for key, value in tables_items if key in table_refs),
+                skip_validation=skip_validation,
+                bulk_load=bulk_load
+            )
+        return db
 
     # ----------------------------------------- export -----------------------------------------------------------------
     def to_json_data(self):
@@ -276,7 +593,33 @@ class Db:
         d.move_to_end("__version__", last=False)
         return d
 
-    def to_json(self, buffer_or_path=None, indent=2, multi_files=False):
+    def to_json(
+            self,
+            buffer_or_path=None,
+            indent=2,
+            multi_files=False,
+            max_workers=None,
+            use_processes=False,
+            incremental=False
+    ):
+        """
+        Parameters
+        ----------
+        buffer_or_path: buffer, file path or dir path (multi files), default None (json string is returned)
+        indent: int, default 2
+        multi_files: bool, default False
+            if True, one file is written per table (and an __admin__.json file for version). Each file is written to a
+            temporary file which is then renamed, so readers never see a partially written table.
+        max_workers: int, default None
+            multi files only. If given, table files are encoded and written concurrently by max_workers workers (tables
+            data is dumped by main thread, encoding and writing of a table starts as soon as its data is dumped).
+        use_processes: bool, default False
+            multi files only, if max_workers is given. Use a process pool instead of a thread pool (json encoding does
+            not release the GIL, but dumped data must be sent to worker processes).
+        incremental: bool, default False
+            multi files only. If True, only tables that were modified since db was last exported to (or loaded from)
+            this dir are written. Files must not have been modified by another process in the meantime.
+        """
         # mono file
         if not multi_files:
             return json_data_to_json(
@@ -294,14 +637,139 @@ class Db:
         if not os.path.isdir(buffer_or_path):
             os.mkdir(buffer_or_path)
 
+        # find tables to dump (all of them, unless they were not modified since last snapshot of dir)
+        snapshot_path = os.path.realpath(buffer_or_path)
+        snapshot_revisions = self._dev_snapshots_revisions.pop(snapshot_path, {}) if incremental else {}
+        for table in self._tables.values():  # lazy renumbering modifies exported sort indexes (and revisions)
+            table._dev_renumber_sort_indexes()
+        revisions = self._dev_get_revisions()
+        tables_paths = []
+        for table_ref, table in self._tables.items():
+            table_path = os.path.join(buffer_or_path, f"{table_ref}.json")
+            if snapshot_revisions.get(table_ref) != revisions[table_ref] or not os.path.exists(table_path):
+                tables_paths.append((table, table_path))
+
         # dump version
-        with open(os.path.join(buffer_or_path, "__admin__.json"), "w", encoding=CONF.encoding) as f:
-            json_dump({"__version__": self.version}, f)
+        json_data_to_json_file(
+            {"__version__": self.version},
+            os.path.join(buffer_or_path, "__admin__.json"),
+            indent=None
+        )
 
         # dump tables
-        for table in self._tables.values():
-            with open(os.path.join(buffer_or_path, f"{table.get_ref()}.json"), "w", encoding=CONF.encoding) as f:
-                table.to_json(buffer_or_path=f, indent=indent)
+        if max_workers is None:
+            for table, table_path in tables_paths:
+                json_data_to_json_file(table.to_json_data(), table_path, indent=indent)
+        else:
+            executor_cls = concurrent.futures.ProcessPoolExecutor if use_processes else \
+                concurrent.futures.ThreadPoolExecutor
+            with executor_cls(max_workers=max_workers) as executor:
+                futures = [
+                    executor.submit(json_data_to_json_file, table.to_json_data(), table_path, indent=indent)
+                    for table, table_path in tables_paths
+                ]
+                for future in futures:  # raise errors, if any
+                    future.result()
+
+        # store snapshot (only once all files were written)
+        self._dev_snapshots_revisions[snapshot_path] = revisions
+
+    def to_binary(self, buffer_or_path):
+        """
+        Binary snapshot, faster to write and load than json. Container is a zip file: records json data, NumpyArray and
+        TimeSeries fields values being stored in npy blocks (one block per table, field and dtype). Path files are
+        written atomically.
+
+        Parameters
+        ----------
+        buffer_or_path: binary buffer or file path
+        """
+        db_to_binary(self, buffer_or_path)
+
+    # ------------------------------------------- batch ----------------------------------------------------------------
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Defers uniqueness checks, sort indexes setting and post_save calls of operations (table.batch_add,
+        record.update, queryset.bulk_update, queryset.delete, record.delete) to the end of the batch: uniqueness is
+        checked once per modified table, sort indexes are set once per table, and post_save is called once per added
+        or updated record (created if record was added during batch).
+
+        If an error is raised (during batch or at its end), all changes are rolled back and error is raised again:
+        modified and deleted records are restored in place (records retrieved before the batch remain valid), added
+        records are removed. Hooks are not called on rollback.
+
+        A batch is journaled as a single operation. Nested batches are merged with the outer one.
+
+        Examples
+        --------
+        with db.batch():
+            for zone in db.zone:
+                zone.update(name=zone.name.upper())
+        """
+        # nested batch
+        if self._dev_batch is not None:
+            yield
+            return
+
+        self._dev_batch = Batch(self)
+        self._dev_undo_log = UndoLog(self)  # changes are logged until batch is committed (post save included)
+        if self._dev_journal is not None:
+            self._dev_journal.start_batch()
+        try:
+            try:
+                yield
+            finally:
+                batch, self._dev_batch = self._dev_batch, None
+            batch.commit()
+        except BaseException:
+            if self._dev_journal is not None:
+                self._dev_journal.discard_batch()
+            undo_log, self._dev_undo_log = self._dev_undo_log, None
+            undo_log.rollback()
+            raise
+        self._dev_undo_log.close()
+        self._dev_undo_log = None
+        if self._dev_journal is not None:
+            self._dev_journal.end_batch()
+
+    # ------------------------------------------- journal --------------------------------------------------------------
+    def start_journal(self, snapshot_path, journal_path, fsync=True, compact_every=None):
+        """
+        Writes a snapshot of db (mono file) and starts journaling operations (table.batch_add, record.update,
+        queryset.bulk_update, queryset.delete, record.delete, db.batch) to an append-only journal. Db can then be
+        restored with Db.from_json(snapshot_path, journal_path=journal_path).
+
+        Parameters
+        ----------
+        snapshot_path: str
+        journal_path: str
+        fsync: bool, default True
+            if True, journal is synced to disk after each operation
+        compact_every: int, default None
+            if given, journal is compacted (new snapshot is written) every compact_every operations
+        """
+        self.stop_journal()
+        self._dev_journal = Journal.start(
+            self,
+            snapshot_path,
+            journal_path,
+            fsync=fsync,
+            compact_every=compact_every
+        )
+
+    def compact_journal(self):
+        """
+        writes a new snapshot of db and empties journal
+        """
+        if self._dev_journal is None:
+            raise RuntimeError("no journal was started")
+        self._dev_journal.compact()
+
+    def stop_journal(self):
+        if self._dev_journal is not None:
+            self._dev_journal.close()
+            self._dev_journal = None
 
     # ----------------------------------- miscellaneous ----------------------------------------------------------------
     def get_major_version(self):
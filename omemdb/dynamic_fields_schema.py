@@ -50,21 +50,20 @@ class DynamicFieldsSchemaMixin:
         # this is quite hacky :
         #   - we use one marsh validator per field, which is not what was imagined originally. See fix me in
         #     dynamic post load -> we probably should not use marshmallow schemas anymore.
-        #   - we don't have access to the original marsh validator that was created in record update inert.
-        #     If we did, we would use it's instance to create the new validator's instance. We therefore recreated it in
-        #     a way that they match.
+        #   - we don't have access to the instance of the record's marsh validator. We therefore recreate it in a way
+        #     that they match (only if an error is reported).
         oec = OExceptionCollection()
         for field_name, field_descriptor in dsd.items():
-            marsh_validator = self._dev_table.get_db().marsh_validator_cls(
-                field_descriptor,
-                get_instance(
+            validated_data[field_name], field_oec = self._dev_table._dev_get_dynamic_field_marsh_validator(
+                field_descriptor
+            ).validate(
+                validated_data[field_name],
+                skip_validation=skip_validation,
+                root_instance=lambda: get_instance(
                     self._dev_table.get_ref(),
                     record_id=self._dev_table._dev_record_cls._dev_guess_new_data_id(self._dev_table, initial_data),
                     field_name=field_name
-                ))
-            validated_data[field_name], field_oec = marsh_validator.validate(
-                validated_data[field_name],
-                skip_validation=skip_validation
+                )
             )
             oec.append(field_oec)
 
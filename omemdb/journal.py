@@ -0,0 +1,255 @@
+import json
+import os
+import uuid
+
+from . import CONF
+from .packages.oversion import Version
+from .util import json_dumps, json_data_to_json_file
+from .json_stream import JsonObjectStream
+from .queryset import Queryset
+from .record import SORT_INDEX
+
+JOURNAL_KEY = "__journal__"  # snapshot token key (in snapshot and in journal header)
+
+
+class Journal:
+    """
+    Append-only journal of db operations (table.batch_add, record.update, queryset.bulk_update, queryset.delete,
+    record.delete and db.batch), written on top of a mono file snapshot of the db.
+
+    File is in json lines format: a header line ({"__journal__": snapshot token, ...settings}) followed by one line per
+    operation. Operations called by hooks (_post_save, _pre_delete) are not journaled, they are replayed by the
+    operation that triggered them. Operations of a db batch are journaled as a single entry, once batch is committed.
+
+    Compaction writes a new snapshot (with a new token), then a new empty journal. If a crash occurs in between, journal
+    header token does not match snapshot token anymore: journal is ignored (its operations are in snapshot).
+    """
+    def __init__(self, db, snapshot_path, journal_path, fsync=True, compact_every=None):
+        self._db = db
+        self._snapshot_path = snapshot_path
+        self._journal_path = journal_path
+        self._fsync = fsync
+        self._compact_every = compact_every
+        self._buffer = None
+        self._entries_nb = 0
+        self._batch_entries = None  # [entry, ...] while a db batch is in progress
+
+    @classmethod
+    def start(cls, db, snapshot_path, journal_path, fsync=True, compact_every=None):
+        """
+        writes a snapshot of db and an empty journal
+        """
+        journal = cls(db, snapshot_path, journal_path, fsync=fsync, compact_every=compact_every)
+        journal.compact()
+        return journal
+
+    @classmethod
+    def resume(cls, db, snapshot_path, journal_path):
+        """
+        replays journal operations on db (which was just loaded from snapshot), then resumes journaling
+
+        Returns
+        -------
+        journal
+        """
+        snapshot_header = read_snapshot_header(snapshot_path)
+        token = snapshot_header.get(JOURNAL_KEY)
+        header, entries, valid_size = read_journal(journal_path) if os.path.exists(journal_path) else (None, (), 0)
+
+        # journal does not belong to snapshot (or does not exist): start a new one
+        if header is None or header[JOURNAL_KEY] != token:
+            journal = cls(db, snapshot_path, journal_path)
+            journal._write_header(token)
+            return journal
+
+        # snapshot was migrated: journal entries can't be replayed, new snapshot is written
+        snapshot_version = snapshot_header.get("__version__")
+        if db.version is not None and snapshot_version is not None and (
+                Version.from_text(snapshot_version).major != Version.from_text(db.version).major):
+            if len(entries) > 0:
+                raise RuntimeError(
+                    f"journal {journal_path} can't be replayed on migrated snapshot {snapshot_path}, "
+                    f"it must be compacted with previous version of db")
+            return cls.start(
+                db,
+                snapshot_path,
+                journal_path,
+                fsync=header.get("fsync", True),
+                compact_every=header.get("compact_every")
+            )
+
+        # replay
+        for entry in entries:
+            replay_entry(db, entry)
+
+        # remove incomplete last entry (crash while writing), if any, and resume
+        journal = cls(
+            db,
+            snapshot_path,
+            journal_path,
+            fsync=header.get("fsync", True),
+            compact_every=header.get("compact_every")
+        )
+        if os.path.getsize(journal_path) != valid_size:
+            os.truncate(journal_path, valid_size)
+        journal._buffer = open(journal_path, "a", encoding=CONF.encoding)
+        journal._entries_nb = len(entries)
+        return journal
+
+    def close(self):
+        if self._buffer is not None:
+            self._buffer.close()
+            self._buffer = None
+
+    def compact(self):
+        """
+        writes a new snapshot of db and an empty journal
+        """
+        if self._batch_entries is not None:
+            raise RuntimeError("journal can't be compacted while a batch is in progress")
+        token = uuid.uuid4().hex
+        json_data = self._db.to_json_data()
+        json_data[JOURNAL_KEY] = token
+        json_data.move_to_end(JOURNAL_KEY, last=False)
+        json_data.move_to_end("__version__", last=False)
+        json_data_to_json_file(json_data, self._snapshot_path, indent=None)
+        self._write_header(token)
+
+    # entries are prepared while operation is in progress (before hooks are called, which may modify records)
+    @staticmethod
+    def get_add_entry(table, records, requested_sort_indexes):
+        """
+        requested sort indexes (not resulting ones) are journaled, so that replayed records are placed the same way
+        """
+        data = [r.to_json_data() for r in records]
+        if table._dev_sortable:
+            for record_data, sort_index in zip(data, requested_sort_indexes):
+                if sort_index is None:
+                    record_data.pop(SORT_INDEX, None)
+                else:
+                    record_data[SORT_INDEX] = sort_index
+        return dict(operation="add", table=table.get_ref(), data=data)
+
+    @staticmethod
+    def get_update_entry(record, record_id, data, requested_sort_index):
+        """
+        record_id: id before update
+        """
+        record_data = record.to_json_data()
+        data = {k: record_data[k] for k in data if k in record_data}
+        if SORT_INDEX in data:
+            data[SORT_INDEX] = requested_sort_index
+        return dict(operation="update", table=record.get_table_ref(), id=record_id, data=data)
+
+    @staticmethod
+    def get_bulk_update_entry(table, records, records_ids, field_names, requested_sort_indexes):
+        """
+        records_ids: ids before update
+        """
+        data = {field_name: [] for field_name in field_names}
+        for record, sort_index in zip(records, requested_sort_indexes):
+            record_data = record.to_json_data()
+            for field_name in field_names:
+                data[field_name].append(sort_index if field_name == SORT_INDEX else record_data.get(field_name))
+        return dict(operation="bulk_update", table=table.get_ref(), ids=list(records_ids), data=data)
+
+    @staticmethod
+    def get_delete_entry(table, records):
+        return dict(operation="delete", table=table.get_ref(), ids=[r.id for r in records])
+
+    def start_batch(self):
+        """
+        entries are kept until batch is ended (logged as one entry) or discarded (rolled back)
+        """
+        self._batch_entries = []
+
+    def end_batch(self):
+        entries, self._batch_entries = self._batch_entries, None
+        if entries:  # None if journal was started during batch
+            self.log(dict(operation="batch", entries=entries))
+
+    def discard_batch(self):
+        self._batch_entries = None
+
+    def log(self, entry):
+        """
+        called once operation is finished (including hooks)
+        """
+        if self._batch_entries is not None:
+            self._batch_entries.append(entry)
+            return
+        self._entries_nb += 1
+        if self._compact_every is not None and self._entries_nb > self._compact_every:
+            self.compact()  # snapshot contains operation
+            return
+        self._buffer.write(json_dumps(entry) + "\n")
+        self._buffer.flush()
+        if self._fsync:
+            os.fsync(self._buffer.fileno())
+
+    def _write_header(self, token):
+        self.close()
+        header = {JOURNAL_KEY: token, "fsync": self._fsync, "compact_every": self._compact_every}
+        json_data_to_json_file(header, self._journal_path, indent=None)  # journal is replaced, with a single line
+        with open(self._journal_path, "a", encoding=CONF.encoding) as f:
+            f.write("\n")
+            f.flush()
+            if self._fsync:
+                os.fsync(f.fileno())
+        self._buffer = open(self._journal_path, "a", encoding=CONF.encoding)
+        self._entries_nb = 0
+
+
+def read_snapshot_header(snapshot_path):
+    """
+    Returns
+    -------
+    {"__version__": version, "__journal__": token} (token is missing if snapshot was not written by a journal). Only
+    the beginning of snapshot file is read.
+    """
+    header = {}
+    with open(snapshot_path, encoding=CONF.encoding) as f:
+        for key, value in JsonObjectStream(f).items():
+            if key not in ("__version__", JOURNAL_KEY):  # tables were reached
+                break
+            header[key] = value
+    return header
+
+
+def read_journal(journal_path):
+    """
+    Returns
+    -------
+    header, entries, valid_size (size of the complete lines of journal: last line may be incomplete after a crash)
+    """
+    with open(journal_path, "rb") as f:
+        content = f.read()
+    lines = content.split(b"\n")
+    lines.pop()  # incomplete last line (or empty string if journal ends with a new line)
+    if len(lines) == 0:
+        return None, (), 0
+    header = json.loads(lines[0].decode(CONF.encoding))
+    entries = [json.loads(line.decode(CONF.encoding)) for line in lines[1:]]
+    valid_size = sum(len(line) + 1 for line in lines)
+    return header, entries, valid_size
+
+
+def replay_entry(db, entry):
+    operation = entry["operation"]
+    if operation == "batch":
+        with db.batch():
+            for batch_entry in entry["entries"]:
+                replay_entry(db, batch_entry)
+        return
+    table = db._tables[entry["table"]]
+    if operation == "add":
+        table.batch_add(entry["data"])
+    elif operation == "update":
+        table.one(entry["id"]).update(entry["data"])
+    elif operation == "bulk_update":
+        Queryset(table, records=[table.one(record_id) for record_id in entry["ids"]], sort=False).bulk_update(
+            entry["data"])
+    elif operation == "delete":
+        Queryset(table, records=[table.one(record_id) for record_id in entry["ids"]], sort=False).delete()
+    else:
+        raise ValueError(f"unknown journal operation: {operation}")
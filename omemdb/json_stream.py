@@ -0,0 +1,128 @@
+import json
+import re
+import types
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_NUMBER_CHARS = "0123456789.eE+-"
+
+
+class JsonObjectStream:
+    """
+    Iterates on the items of a json object read from a text buffer, without loading the whole object in memory. Array
+    values are returned as generators on their elements, which are decoded one by one (json module's decoder is used
+    for each element, no other dependency is required).
+    """
+    def __init__(self, buffer, chunk_size=2 ** 16):
+        self._buffer = buffer
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._text = ""
+        self._pos = 0
+        self._eof = False
+
+    def items(self):
+        """
+        Returns
+        -------
+        generator of (key, value). If value is an array, it is a generator of elements that must be consumed before
+        next item is read (if not, it is consumed when next item is requested).
+        """
+        self._expect("{")
+        if self._skip_whitespace() == "}":
+            self._pos += 1
+            return
+        while True:
+            # key
+            key = self._decode_value()
+            if not isinstance(key, str):
+                self._raise("Expecting property name enclosed in double quotes")
+            self._expect(":")
+
+            # value
+            if self._skip_whitespace() == "[":
+                self._pos += 1
+                elements = self._iter_elements()
+                yield key, elements
+                for _ in elements:  # make sure array was consumed
+                    pass
+            else:
+                yield key, self._decode_value()
+
+            # next
+            char = self._skip_whitespace()
+            self._pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                self._pos -= 1
+                self._raise("Expecting ',' delimiter")
+
+    def _iter_elements(self):
+        if self._skip_whitespace() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self._decode_value()
+            char = self._skip_whitespace()
+            self._pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                self._pos -= 1
+                self._raise("Expecting ',' delimiter")
+
+    def _decode_value(self):
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._text, self._pos)
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            else:
+                # numbers may be truncated if they are not followed by another char (a valid value is never followed by
+                # a number char)
+                if self._eof or (end < len(self._text) and self._text[end] not in _NUMBER_CHARS):
+                    self._pos = end
+                    return value
+            self._read(min_size=2 * (len(self._text) - self._pos))
+
+    def _skip_whitespace(self):
+        """
+        Returns
+        -------
+        next non whitespace char ("" if end of buffer was reached)
+        """
+        while True:
+            self._pos = _WHITESPACE.match(self._text, self._pos).end()
+            if self._pos < len(self._text):
+                return self._text[self._pos]
+            if self._eof:
+                return ""
+            self._read()
+
+    def _expect(self, char):
+        if self._skip_whitespace() != char:
+            self._raise(f"Expecting '{char}'")
+        self._pos += 1
+
+    def _read(self, min_size=0):
+        chunk = self._buffer.read(max(self._chunk_size, min_size))
+        if len(chunk) == 0:
+            self._eof = True
+        self._text = self._text[self._pos:] + chunk
+        self._pos = 0
+
+    def _raise(self, message):
+        raise json.JSONDecodeError(message, self._text, self._pos)
+
+
+def materialize(value):
+    """
+    Returns
+    -------
+    value, arrays generators being transformed to lists
+    """
+    if isinstance(value, types.GeneratorType):
+        return list(value)
+    return value
@@ -1,3 +1,4 @@
+import functools
 import inspect
 import itertools
 import json
@@ -26,7 +27,16 @@ class MarshValidator:
         self.root_instance = root_instance
         self.instance_sep = instance_sep
 
-    def validate(self, data_or_value, skip_validation=False):
+    def validate(self, data_or_value, skip_validation=False, root_instance=None):
+        """
+        Parameters
+        ----------
+        data_or_value
+        skip_validation: bool, default False
+        root_instance: str or callable, default None
+            instance of reported errors (validator's root instance if None). If callable, it is only called if an
+            error is reported.
+        """
         # load
         if self.schema is not None:
             result = self.schema.load(data_or_value, skip_validation=skip_validation)
@@ -42,7 +52,12 @@ class MarshValidator:
                 data, errors = None, [str(msg) for msg in e.messages]
 
         oec = OExceptionCollection()
-        oec.extend(self._marsh_errors_to_oexception_errors(self.root_instance, errors, instance_sep=self.instance_sep))
+        if errors:
+            if root_instance is None:
+                root_instance = self.root_instance
+            elif callable(root_instance):
+                root_instance = root_instance()
+            oec.extend(self._marsh_errors_to_oexception_errors(root_instance, errors, instance_sep=self.instance_sep))
 
         # return
         return data, oec
@@ -79,24 +94,37 @@ class MarshValidator:
     def _get_error_conversion_map(cls):  # may be subclassed
         return _marsh_message_to_oexception_cls
 
+    @classmethod
+    @functools.lru_cache()
+    def _get_error_conversion_matcher(cls):
+        """
+        Returns
+        -------
+        regex, oexception_classes
+
+        regex is an alternation of all conversion map messages (in map order), placeholders like {choices} match any
+        sequence. Group i matches message i, whose oexception class is oexception_classes[i].
+        """
+        conversion_map = cls._get_error_conversion_map()
+        patterns = []
+        for i, error_message in enumerate(conversion_map):
+            escaped_error_string = re.escape(error_message)
+            # replace placeholders like {choices} by a regex group that can match any sequence
+            pattern = re.sub(r'\\\{[^}]+\\\}', r'(?:[^}]+)', escaped_error_string)
+            patterns.append(f"(?P<m{i}>{pattern})")
+        return re.compile("|".join(patterns)), tuple(conversion_map.values())
+
     @classmethod
     def _get_marsh_error_message(cls, marsh_message):
         conversion_map = cls._get_error_conversion_map()
         if marsh_message in conversion_map:
             return conversion_map[marsh_message]
-        # handle error message matching with dynamic content
-        else:
-            for error_message in conversion_map:
-                escaped_error_string = re.escape(error_message)
-                # replace placeholders like {choices} by a regex group that can match any sequence
-                pattern = re.sub(r'\\\{[^}]+\\\}', r'([^}]+)', escaped_error_string)
-                regex = re.compile(pattern)
-                match = regex.match(marsh_message)
-                if match:
-                    return conversion_map[error_message]
-                else:
-                    continue
+        # handle error message matching with dynamic content (first matching message of conversion map wins)
+        regex, oexception_classes = cls._get_error_conversion_matcher()
+        match = regex.match(marsh_message)
+        if match is None:
             return None
+        return oexception_classes[int(match.lastgroup[1:])]
 
 
 _marsh_message_to_oexception_cls = {
@@ -2,7 +2,7 @@ from .schema import Schema
 from .decorators import (
     pre_dump, post_dump, pre_load, post_load, validates, validates_schema
 )
-from marshmallow import missing, ValidationError
+from marshmallow import missing, ValidationError, EXCLUDE
 # fixme: reconnect properly
 # from marshmallow.warnings import ChangedInMarshmallow3Warning as _ChangedInMarshmallow3Warning
 #
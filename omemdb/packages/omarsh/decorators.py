@@ -1,3 +1,4 @@
 from marshmallow.decorators import (
-    pre_dump, post_dump, pre_load, post_load, validates, validates_schema
+    pre_dump, post_dump, pre_load, post_load, validates, validates_schema,
+    PRE_LOAD, POST_LOAD, VALIDATES, VALIDATES_SCHEMA
 )
@@ -1,4 +1,5 @@
 import re
+import base64
 import datetime as dt
 import json
 import collections
@@ -10,6 +11,7 @@ import numpy as np
 import pandas as pd
 import copy
 from omemdb.record_link import RecordLink
+from omemdb.util import array_to_json_values, datetime_index_to_json_values
 
 ISO_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
 
@@ -47,6 +49,63 @@ def make_generic(category, instant):
     raise AttributeError(f"wrong category, instant couple: {category, instant}.")
 
 
+def make_index_generic(category, index):
+    """
+    vectorized version of make_generic, for datetime indexes
+
+    Parameters
+    ----------
+    category: 'day', 'year'
+    index: pd.Index
+    """
+    # element by element (timezone aware indexes, or empty indexes that are not datetime indexes)
+    if not isinstance(index, pd.DatetimeIndex) or index.tz is not None:
+        return index.map(lambda x: make_generic(category, x))
+
+    values = index.values.astype("datetime64[ns]")
+    if category == "day":
+        days = values.astype("datetime64[D]")
+        generic_values = np.datetime64("2012-01-01", "ns") + (values - days)
+    elif category == "year":
+        months = values.astype("datetime64[M]")
+        generic_months = np.datetime64("2012-01", "M") + months.astype("int64") % 12  # 2012 is a leap year
+        generic_values = generic_months.astype("datetime64[ns]") + (values - months)
+    else:
+        raise AttributeError(f"wrong category: {category}.")
+    return pd.DatetimeIndex(generic_values, name=index.name)
+
+
+def parse_index(date_format, values):
+    """
+    vectorized parsing of time series index json data
+
+    Parameters
+    ----------
+    date_format: 'iso', 'epoch'
+    values: list of iso strings (date_format='iso') or of epoch milliseconds (date_format='epoch'). May also contain
+        datetimes.
+
+    Returns
+    -------
+    pd.DatetimeIndex
+
+    Raises
+    ------
+    ValueError
+    """
+    if date_format == "iso":
+        return pd.DatetimeIndex(pd.to_datetime(values, format=ISO_FORMAT))
+    if date_format == "epoch":
+        array = np.asarray(values)
+        if array.dtype.kind in "iuf":
+            return pd.DatetimeIndex(pd.to_datetime(array, unit="ms"))
+        try:  # element by element (may contain datetimes)
+            return pd.DatetimeIndex([x if isinstance(x, dt.datetime) else epoch_parse_fct(x) for x in values])
+        except TypeError as e:
+            raise ValueError(str(e)) from None
+    raise AssertionError("should not be here")
+
+
 def iso_parse_fct(x):
     return dt.datetime.strptime(x, ISO_FORMAT)
 
@@ -108,17 +167,54 @@ class ImmutableDict(fields.Mapping):
         return make_deeply_immutable(value)
 
 
+def encode_array(array):
+    return base64.b64encode(np.ascontiguousarray(array).tobytes()).decode("ascii")
+
+
+def decode_array(data, dtype):
+    """
+    Returns
+    -------
+    read-only array
+    """
+    return np.frombuffer(base64.b64decode(data, validate=True), dtype=dtype)
+
+
 class NumpyArray(fields.Field):
     default_error_messages = {
         "invalid_numpy_array": "Is not a numpy array.",
     }
 
+    def __init__(self, encoding=None, *args, **kwargs):
+        """
+        Parameters
+        ----------
+        encoding: str, default None
+            None (list of values), 'base64' (raw buffer of non object arrays: {"data": base64, "dtype": str,
+            "shape": list})
+        """
+        self._encoding = encoding
+        super().__init__(*args, **kwargs)
+
     def _serialize(self, value, attr, obj, **kwargs):
-        return value.tolist() if value is not None else None
+        if value is None:
+            return None
+        if self._encoding == "base64" and not value.dtype.hasobject:
+            return collections.OrderedDict([
+                ("data", encode_array(value)),
+                ("dtype", value.dtype.str),
+                ("shape", list(value.shape))
+            ])
+        return value.tolist()
 
     def _deserialize(self, value, attr, data, **kwargs):
         if value is None:
             return None
+        if isinstance(value, dict):  # base64 encoding
+            try:
+                value = decode_array(value["data"], value["dtype"]).reshape(value["shape"])
+            except (ValueError, TypeError, KeyError):
+                raise self.make_error("invalid_numpy_array")
         if not isinstance(value, np.ndarray):
             try:
                 value = np.array(value)
@@ -136,7 +232,7 @@ class TimeSeries(fields.Field):
         "invalid_time_index": "Does not have a datetime index."
     }
 
-    def __init__(self, date_format="iso", generic=None, dtype=None, *args, **kwargs):
+    def __init__(self, date_format="iso", generic=None, dtype=None, encoding=None, *args, **kwargs):
         """
         Parameters
         ----------
@@ -144,15 +240,35 @@ class TimeSeries(fields.Field):
             'iso', 'epoch'
         generic: str, default None
             'day', 'year'
+        encoding: str, default None
+            None (split orient json data), 'base64' (raw buffers of non object series with a datetime index without
+            timezone: {"data": base64, "dtype": str, "index": base64 of datetime64[ns], "name": name})
         """
         self._generic = generic
         self._date_format = date_format
         self._dtype = dtype
+        self._encoding = encoding
         super().__init__(*args, **kwargs)
 
     def _serialize(self, value, attr, obj, **kwargs):
         if value is None:
             return None
+
+        # build json data directly if possible (numeric series with a datetime index)
+        index_is_direct = isinstance(value.index, pd.DatetimeIndex) and value.index.tz is None
+        if self._encoding == "base64" and index_is_direct and not value.dtype.hasobject:
+            return collections.OrderedDict([
+                ("data", encode_array(value.values)),
+                ("dtype", value.dtype.str),
+                ("index", encode_array(np.asarray(value.index.values, dtype="datetime64[ns]"))),
+                ("name", value.name)
+            ])
+        if index_is_direct and (value.name is None or isinstance(value.name, str) or type(value.name) in (int, bool)):
+            index = datetime_index_to_json_values(value.index, self._date_format)
+            data = array_to_json_values(value.values) if isinstance(value.values, np.ndarray) else None
+            if index is not None and data is not None:
+                return collections.OrderedDict([("data", data), ("index", index), ("name", value.name)])
+
         # convert to pandas json
         json_str = value.to_json(orient="split", date_unit="ms", date_format=self._date_format)
 
@@ -170,41 +286,50 @@ class TimeSeries(fields.Field):
         if not isinstance(value, pd.Series):
             # check dict
             if not isinstance(value, dict):
-                self.make_error("invalid_series")
+                raise self.make_error("invalid_series")
 
             # check keys
             if len({"data", "index", "name"}.intersection(value.keys())) != 3:
-                self.make_error("invalid_series")
+                raise self.make_error("invalid_series")
+
+            # base64 encoding
+            data = value["data"]
+            if isinstance(data, str):
+                try:
+                    data = decode_array(data, value["dtype"])
+                    index = decode_array(value["index"], "datetime64[ns]")
+                except (ValueError, TypeError, KeyError):
+                    raise self.make_error("invalid_series")
+                if len(index) != len(data):
+                    raise self.make_error("invalid_series")
 
             # parse index
-            if self._date_format == "iso":
-                parse_fct = iso_parse_fct
-            elif self._date_format == "epoch":
-                parse_fct = epoch_parse_fct
             else:
-                raise AssertionError("should not be here")
-
-            try:
-                index = list(map(lambda x: x if isinstance(x, dt.datetime) else parse_fct(x), value["index"]))
-            except ValueError:
-                self.make_error("invalid_time_index")
-
-            # make a series
+                try:
+                    index = parse_index(self._date_format, value["index"])
+                except ValueError:
+                    raise self.make_error("invalid_time_index")
+
+            # make a series (float lists are converted by numpy, much faster than pandas generic conversion)
+            if isinstance(data, list):
+                array = np.asarray(data)
+                if array.dtype.kind == "f":
+                    data = array
             try:
-                value = pd.Series(data=value["data"], index=index, name=value["name"], dtype=self._dtype)
+                value = pd.Series(data=data, index=index, name=value["name"], dtype=self._dtype)
             except (ValueError, KeyError):
-                self.make_error("invalid_series")
+                raise self.make_error("invalid_series")
 
         # check if time series
         if len(value) > 0 and not isinstance(value.index, pd.DatetimeIndex):
-            self.make_error("invalid_time_index")
+            raise self.make_error("invalid_time_index")
 
         # make generic if needed
         if self._generic:
-            value.index = value.index.map(lambda x: make_generic(self._generic, x))
+            value.index = make_index_generic(self._generic, value.index)
 
-        # cast values
-        value = value.astype(self._dtype)
+        # cast values (frozen values, for example memory-mapped ones, are not copied if dtype is already correct)
+        value = value.astype(self._dtype, copy=value.values.flags.writeable)
 
         # freeze
         value.values.flags.writeable = False
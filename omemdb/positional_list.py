@@ -0,0 +1,161 @@
+import itertools
+
+
+class _Block(list):
+    __slots__ = ("position",)
+
+
+class PositionalList:
+    """
+    List of distinct hashable items, supporting positional insert, remove, get item and index lookup in O(log n).
+
+    Items are stored in blocks of bounded size (a block is split when it becomes too big), the number of items
+    before each block is maintained in a Fenwick tree.
+    """
+    _load = 500  # blocks are split when they reach twice this size
+
+    def __init__(self, items=()):
+        self._blocks = []  # [block, ...]
+        self._block_by_item = {}  # {item: block, ...}
+        self._tree = [0]  # Fenwick tree of blocks lengths (1-based)
+        self._len = 0
+        self.extend(items)
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self._blocks)
+
+    def __contains__(self, item):
+        return item in self._block_by_item
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("positional list index out of range")
+        block, offset = self._locate(index)
+        return block[offset]
+
+    def index(self, item):
+        block = self._block_by_item[item]
+        return self._prefix(block.position) + block.index(item)
+
+    def insert(self, index, item):
+        """
+        index is clamped to [0, len] (like list.insert)
+        """
+        if item in self._block_by_item:
+            raise ValueError("item is already in positional list")
+
+        # manage empty list
+        if self._len == 0:
+            self._blocks.append(_Block([item]))
+            self._block_by_item[item] = self._blocks[0]
+            self._len = 1
+            self._rebuild()
+            return
+
+        # find block
+        index = min(max(index, 0), self._len)
+        if index == self._len:
+            block = self._blocks[-1]
+            offset = len(block)
+        else:
+            block, offset = self._locate(index)
+
+        # insert
+        block.insert(offset, item)
+        self._block_by_item[item] = block
+        self._len += 1
+        self._add(block.position, 1)
+
+        # split if needed
+        if len(block) >= 2 * self._load:
+            new_block = _Block(block[self._load:])
+            del block[self._load:]
+            for moved_item in new_block:
+                self._block_by_item[moved_item] = new_block
+            self._blocks.insert(block.position + 1, new_block)
+            self._rebuild()
+
+    def append(self, item):
+        self.insert(self._len, item)
+
+    def extend(self, items):
+        items = [item for item in items]
+        if len(items) == 0:
+            return
+        if len(set(items)) != len(items) or len(self._block_by_item.keys() & set(items)) > 0:
+            raise ValueError("items are already in positional list")
+
+        # complete last block, then create new blocks
+        if len(self._blocks) > 0 and len(self._blocks[-1]) < self._load:
+            size = self._load - len(self._blocks[-1])
+            self._blocks[-1].extend(items[:size])
+            for item in items[:size]:
+                self._block_by_item[item] = self._blocks[-1]
+            items = items[size:]
+        for start in range(0, len(items), self._load):
+            block = _Block(items[start:start + self._load])
+            for item in block:
+                self._block_by_item[item] = block
+            self._blocks.append(block)
+        self._len = sum(len(block) for block in self._blocks)
+        self._rebuild()
+
+    def remove(self, item):
+        block = self._block_by_item.pop(item)
+        block.remove(item)
+        self._len -= 1
+        if len(block) == 0:
+            del self._blocks[block.position]
+            self._rebuild()
+        else:
+            self._add(block.position, -1)
+
+    # fenwick tree
+    def _rebuild(self):
+        tree = [0] * (len(self._blocks) + 1)
+        for position, block in enumerate(self._blocks):
+            block.position = position
+            i = position + 1
+            tree[i] += len(block)
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _add(self, position, delta):
+        i = position + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, position):
+        """
+        number of items in blocks before given block position
+        """
+        total = 0
+        i = position
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, index):
+        """
+        Returns
+        -------
+        block, offset of item at given (valid) index
+        """
+        position = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step > 0:
+            next_position = position + step
+            if next_position < len(self._tree) and self._tree[next_position] <= index:
+                position = next_position
+                index -= self._tree[next_position]
+            step >>= 1
+        return self._blocks[position], index
@@ -1,7 +1,12 @@
 from itertools import filterfalse
+import itertools
 import collections
 
-from .oerrors_omemdb import MultipleRecordsReturnedError, RecordDoesNotExistError
+import numpy as np
+import pandas as pd
+
+from .oerrors_omemdb import MultipleRecordsReturnedError, RecordDoesNotExistError, OExceptionCollection
+from .record import SORT_INDEX
 from .util import json_data_to_json
 
 
@@ -28,43 +33,113 @@ def unique_ever_seen(iterable, key=None):
 
 
 class Queryset:
+    """
+    Records are filtered when queryset is created, and made unique, checked and sorted when queryset is first consumed.
+    Records are indexed by id on first id lookup. Querysets of table records (table.select and their selections) are
+    known to be unique and sorted: len, exists, one and queryset[0] then read their records directly.
+    """
     def __init__(self, table, records=None, sort=True):
         self._table = table
 
-        # manage no record
+        # records source (iterators are consumed now, so that queryset does not depend on their future state)
         if records is None:
-            records = {}
+            records = ()
+        self._source = records if isinstance(records, tuple) else tuple(records)
+        self._trusted = False  # True if source records are known to be unique records of table
+        self._sort = sort
+        self._source_sorted = False
 
-        # ensure unique, sort and make un-mutable
-        if sort:
-            self._records = collections.OrderedDict((r.id, r) for r in tuple(sorted(unique_ever_seen(records))))
-        else:
-            self._records = collections.OrderedDict((r.id, r) for r in tuple(unique_ever_seen(records)))
+        # materialized on first consumption
+        self._records = None  # (record, ...) positional access
+        self._ids = None  # {id: record, ...}
+        self._positions = None  # {record: position, ...}
+
+    @classmethod
+    def _dev_from_table_records(cls, table, records, filter_by=None, sort=True, sorted_records=True):
+        """
+        Parameters
+        ----------
+        table
+        records: tuple of unique records of table (they are not checked)
+        filter_by: callable, default None
+            called now
+        sort: bool, default True
+        sorted_records: bool, default True
+            True if records are already sorted
+        """
+        qs = cls(table, records if filter_by is None else filter(filter_by, records), sort=sort)
+        qs._trusted = True
+        qs._source_sorted = sorted_records
+        return qs
+
+    def _dev_is_streamable(self):
+        """
+        True if source records are queryset records (no materialization is needed to read them in order)
+        """
+        return self._records is None and self._trusted and (self._source_sorted or not self._sort)
+
+    def _dev_get_records(self):
+        """
+        Returns
+        -------
+        tuple of queryset records (materialized on first call)
+        """
+        if self._records is None:
+            records = self._source
+
+            # ensure unique and check table
+            if not self._trusted:
+                records = list(unique_ever_seen(records))
+                if len({r.get_table() for r in records}.difference({self._table})) > 0:
+                    raise RuntimeError(
+                        f"queryset contains records that belong to other table than {self.get_table_ref()}"
+                    )
 
-        # check table
-        if len({r.get_table() for r in self._records.values()}.difference({self._table})) > 0:
-            raise RuntimeError(
-                f"queryset contains records that belong to other table than {self.get_table_ref()}"
-            )
+            # sort (by table sort keys, records are not compared) and make un-mutable
+            if self._sort and not self._source_sorted:
+                records = self._table._dev_sort(records)
+            self._records = tuple(records)
+
+            # source is not needed anymore
+            self._source, self._trusted, self._source_sorted = self._records, True, self._sort
+        return self._records
+
+    def _dev_get_positions(self):
+        if self._positions is None:
+            self._positions = {r: i for i, r in enumerate(self._dev_get_records())}
+        return self._positions
 
     # python magic
     def __getitem__(self, item):
-        return next(iter(self)) if item == 0 else list(self)[item]
-
-    def __reversed__(self):
         """
-        we need to implement reversed since __getitem__ is not coded in a list fashion way
+        integer indexes (negative ones included) are O(1), slices are O(k) and return a list of records
         """
-        return reversed(self._records.values())
+        if item == 0 and self._dev_is_streamable():
+            if len(self._source) == 0:
+                raise IndexError("queryset index out of range")
+            return self._source[0]
+        records = self._dev_get_records()
+        return list(records[item]) if isinstance(item, slice) else records[item]
+
+    def __reversed__(self):
+        return reversed(self._dev_get_records())  # no copy
+
+    def __contains__(self, record):
+        return record in self._dev_get_positions()
 
     def __iter__(self):
-        return iter(self._records.values())
+        return iter(self._dev_get_records())
 
     def __repr__(self):
-        return f"<Queryset of {self._table.get_ref()}: {len(self._records)} records>"
+        return f"<Queryset of {self._table.get_ref()}: {len(self)} records>"
 
     def __len__(self):
-        return len(self._records)
+        if self._records is None and self._trusted:
+            return len(self._source)
+        return len(self._dev_get_records())
+
+    def __bool__(self):
+        return self.exists()
 
     def __add__(self, other):
         return Queryset(self._table, list(self) + list(other))
@@ -78,34 +153,165 @@ class Queryset:
     def get_table_ref(self):
         return self._table.get_ref()
 
+    def index(self, record):
+        """
+        Returns
+        -------
+        position of record in queryset (ValueError is raised if record is not in queryset)
+        """
+        try:
+            return self._dev_get_positions()[record]
+        except KeyError:
+            raise ValueError(f"{record} is not in queryset") from None
+
+    def exists(self):
+        """
+        Returns
+        -------
+        True if queryset contains at least one record
+        """
+        if self._records is None and self._trusted:
+            return len(self._source) > 0
+        return len(self._dev_get_records()) > 0
+
     def select(self, filter_by=None, sort=True):
-        iterator = self._records.values() if filter_by is None else filter(filter_by, self._records.values())
-        return Queryset(self._table, iterator, sort=sort)
+        """
+        filter_by is called now, returned queryset is sorted when consumed (a selection of a sorted queryset is sorted)
+        """
+        qs = Queryset(self._table, self._source if filter_by is None else filter(filter_by, self._source),
+                      sort=sort or self._sort)
+        qs._trusted, qs._source_sorted = self._trusted, self._source_sorted
+        return qs
 
     def one(self, filter_by=None):
         if isinstance(filter_by, (str, int)):
+            if self._ids is None:
+                self._ids = {r.id: r for r in self._dev_get_records()}
             try:
-                return self._records[filter_by]
+                return self._ids[filter_by]
             except KeyError:
                 raise RecordDoesNotExistError(
                     f"Queryset of table {self.get_table_ref()} contains no record whose id is '{filter_by}'"
                 )
 
-        # filter if needed
-        qs = self if filter_by is None else self.select(filter_by=filter_by)
-
-        # check one and only one
-        if len(qs) == 0:
+        # check one and only one (two records are enough, order does not matter)
+        if self._records is None and self._trusted:
+            records = self._source
+        else:
+            records = self._dev_get_records()
+        if filter_by is not None:
+            records = filter(filter_by, records)
+        records = tuple(itertools.islice(records, 2))
+        if len(records) == 0:
             raise RecordDoesNotExistError(
                 self.get_table_ref(),
                 message=f"Queryset of table{self.get_table_ref()} contains no value.")
-        if len(qs) > 1:
+        if len(records) > 1:
             raise MultipleRecordsReturnedError(
                 self.get_table_ref(),
                 message=f"Queryset of table {self.get_table_ref()} contains more than one value.")
 
         # return record
-        return qs[0]
+        return records[0]
+
+    def values(self, *field_names):
+        """
+        Parameters
+        ----------
+        field_names: str
+            if none is given, all fields are returned
+
+        Returns
+        -------
+        numpy array of records values if one field name is given (see Table.column), else pandas dataframe (one column
+        per field, indexed by records ids). Values are in queryset order.
+        """
+        records = list(self._dev_get_records())
+        if len(field_names) == 1:
+            return self._table._dev_get_column(field_names[0], records)
+        if len(field_names) == 0:
+            field_names = tuple(self._table._dev_field_offsets)
+        return pd.DataFrame(
+            collections.OrderedDict((name, self._table._dev_get_column(name, records)) for name in field_names),
+            index=pd.Index([r.id for r in records], name="id")
+        )
+
+    # update
+    def bulk_update(self, data=None, **or_data):
+        """
+        Updates all records of queryset in one operation.
+
+        Parameters
+        ----------
+        data: {field_name: values, ...}
+            values: sequence of values (one per record, in queryset order) or callable (record -> value)
+
+        workflow
+        --------
+        (methods belonging to create/update/delete framework:
+            db.__init__, table.batch_add, record.update, queryset.bulk_update, queryset.delete, record.delete)
+        1. data of all records is checked (no record is modified if an error is found)
+        2. update inert
+            * old links are unregistered
+        3. links are activated
+        4. uniqueness is checked (once)
+        5. set all sort indexes (once)
+        6. post_save is called
+        """
+        # prepare records data
+        data = or_data if data is None else data
+        records = list(self._dev_get_records())
+        columns = collections.OrderedDict()
+        for field_name, values in data.items():
+            if callable(values):
+                values = [values(r) for r in records]
+            elif isinstance(values, (np.ndarray, pd.Series)):
+                values = values.tolist()  # python values
+            if len(values) != len(records):
+                raise ValueError(
+                    f"{field_name}: {len(values)} values were given for a queryset of {len(records)} records")
+            columns[field_name] = values
+        if len(columns) == 0 or len(records) == 0:
+            return
+        records_data = [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+        # check update commitments and data (before any record is modified)
+        oec = OExceptionCollection()
+        new_records_data = []
+        for r, record_data in zip(records, records_data):
+            with oec.catch_errors():
+                r._dev_check_update_commitments(record_data)
+                new_records_data.append(r._dev_validate_data(record_data))
+        oec.raise_if_error()
+
+        # update inert
+        journal = self._table.get_db()._dev_journal
+        if journal is not None:
+            initial_ids = [r.id for r in records]
+        for r, record_data, new_data in zip(records, records_data, new_records_data):
+            r._dev_store_data(record_data, new_data)
+        if journal is not None:  # requested sort indexes are journaled (will be replaced once records are placed)
+            requested_sort_indexes = [r._dev_get_raw_value(SORT_INDEX, None) for r in records]
+
+        # activate links
+        for r in records:
+            r._dev_activate_links()
+
+        # check uniqueness (must be done after links activation so links point on records)
+        self._table._dev_check_uniqueness()
+
+        # set sort index
+        self._table._dev_set_all_sort_indexes()
+
+        # post save (operations of hooks are not journaled, they are replayed with this operation)
+        if journal is not None:
+            journal_entry = journal.get_bulk_update_entry(
+                self._table, records, initial_ids, tuple(columns), requested_sort_indexes)
+        with self._table.get_db()._dev_journal_suspended():
+            for r in records:
+                r._dev_post_save(False, False)  # not created, not db_is_initializing
+        if journal is not None:
+            journal.log(journal_entry)
 
     # delete
     def delete(self):
@@ -113,22 +319,30 @@ class Queryset:
         workflow
         --------
         (methods belonging to create/update/delete framework:
-            db.__init__, table.batch_add, record.update, queryset.delete, record.delete)
+            db.__init__, table.batch_add, record.update, queryset.bulk_update, queryset.delete, record.delete)
         1. delete without setting sort index (calls pre-delete)
         2. set all sort indexes
         """
-        for r in self:
+        journal = self._table.get_db()._dev_journal
+        if journal is not None:
+            journal_entry = journal.get_delete_entry(self._table, self)
+
+        for r in self._dev_get_records():
             r._dev_delete_without_setting_sort_index()
 
         # set sort index
         self._table._dev_set_all_sort_indexes()
 
         # clear content
-        self._records = ()
+        self._source = self._records = ()
+        self._ids = self._positions = None
+
+        if journal is not None:
+            journal.log(journal_entry)
 
     # ------------------------------------------- export ---------------------------------------------------------------
     def to_json_data(self, style=None):
-        return [r.to_json_data(style=style) for r in self._records.values()]
+        return [r.to_json_data(style=style) for r in self._dev_get_records()]
 
     def to_json(self, buffer_or_path=None, indent=2, style=None):
         d = self.to_json_data(style=style)
@@ -7,11 +7,12 @@ import numpy as np
 
 from .omemdb_fields.api import LinkField, TupleLinkField, BaseLinkableField
 from .record_link import RecordLink
-from .oerrors_omemdb import OExceptionCollection, UpdateCommitmentError, DeleteCommitmentError, get_instance
+from .rows_storage import ABSENT
+from .oerrors_omemdb import OException, OExceptionCollection, UpdateCommitmentError, DeleteCommitmentError, get_instance
 
-EPSILON = 0.00001
 SORT_GROUP = "sort_group"  # don't forget to change record property (and it's calls) if variable is changed
 SORT_INDEX = "sort_index"
+EPSILON = 0.00001  # deprecated, not used anymore (moved records are not shifted by epsilon), will be removed
 
 logger = logging.getLogger(__name__)
 
@@ -46,17 +47,21 @@ class Record:
             - explain to frontend current relations (to prevent wrong behavior)
             - block bad updates that omemdb would have accepted (delete was subclassed)
         no need to subclass delete
+
+    Storage
+    -------
+    Records are compact: instance state is stored in slots and data in a row of table rows storage (values ordered by
+    table._dev_field_offsets, ABSENT if value was not set). Record subclasses may declare __slots__ = () to avoid the
+    creation of a __dict__ per record.
     """
+    __slots__ = ("_table", "_row", "_post_save_in_progress", "_initialized")
+
     _committing_relations_for_update = None  # to subclass: {committed_field: {committed_to_tables, ...
     _committing_relations_for_delete = None  # to subclass: {committed_to_tables
 
     Schema = None
     TableMeta = None
 
-    _initialized_for_setattr_ = False  # used by __setattr__
-
-    _initialized = False
-
     def __init__(self, table, data, skip_validation=False):
         """
         Parameters
@@ -64,11 +69,9 @@ class Record:
         on creation, record is inert (updated inert called, not update)
         """
         self._table = table
-        self._data = {}
+        self._row = None
         self._post_save_in_progress = False
-
-        # signal initialized (to manage __setattr__
-        self._initialized_for_setattr_ = True
+        self._initialized = False
 
         # set data
         self._update_inert(data, skip_validation=skip_validation)
@@ -76,35 +79,58 @@ class Record:
 
     # ----------------------------------------------- private ----------------------------------------------------------
     def _update_inert(self, data, unregister_links=True, skip_validation=False):
+        new_data = self._dev_validate_data(data, skip_validation=skip_validation)
+        self._dev_store_data(data, new_data, unregister_links=unregister_links)
+
+    # ----------------------------------------- dev api ----------------------------------------------------------------
+    # update inert, in two steps (so that batches of records are validated before being modified)
+    def _dev_validate_data(self, data, skip_validation=False):
+        """
+        Returns
+        -------
+        new data (current data updated with deserialized data)
+
+        Raises
+        ------
+        OExceptionCollection
+        """
         initial_id = self.id if self._initialized else None
 
         # merge new data and current data
-        new_data = self._data.copy()
+        new_data = self._dev_get_data()
         new_data.update(data)
 
-        # manage error message pk
-        error_message_id = self._dev_guess_new_data_id(self._table, new_data) if initial_id is None else initial_id
-
-        # deserialize
-        schema = self.get_schema()
-        marsh_validator = self.get_db().marsh_validator_cls(
-            schema,
-            get_instance(
+        # deserialize (error message instance is only computed if an error is reported)
+        new_data, oec = self._table._dev_marsh_validator.validate(
+            new_data,
+            skip_validation=skip_validation,
+            root_instance=lambda: get_instance(
                 self.get_table_ref(),
-                record_id=error_message_id
+                record_id=self._dev_guess_new_data_id(self._table, new_data) if initial_id is None else initial_id
             )
         )
-        new_data, oec = marsh_validator.validate(new_data, skip_validation=skip_validation)
         oec.raise_if_error()
+        return new_data
+
+    def _dev_store_data(self, data, new_data, unregister_links=True):
+        """
+        data: data that was asked (new_data is the result of its validation)
+        """
+        initial_id = self.id if self._initialized else None
+
+        # save current data if a db batch is in progress (so that it can be rolled back)
+        if self._initialized and self.get_db()._dev_undo_log is not None:
+            self.get_db()._dev_undo_log.save(self)
 
         # manage pk update if persistent pk field (will be skipped on creation)
         if initial_id is not None and self._table._dev_pk_field is not None and self._table._dev_pk_field in data:
             self.get_table()._dev_update_pk(data[self._table._dev_pk_field], initial_id)
 
-        # unregister old links that will be removed, if asked
-        if unregister_links:
+        # unregister old links that will be removed, if asked (a record that is being created has no links)
+        if unregister_links and self._row is not None:
+            schema = self.get_schema()
             for key, value in new_data.items():
-                old_value = self._data.get(key)
+                old_value = self._dev_get_raw_value(key, None)
                 field_descriptor = schema.declared_fields[key]
                 if (
                         (old_value is None)
@@ -117,25 +143,48 @@ class Record:
                 for old_link in field_descriptor._dev_get_links(old_value):
                     old_link.unregister()
 
-        # tweak sort index if necessary
+        # find if record must be moved (will be done by table when sort indexes are set)
+        # (we compare with record position, reading sort index would renumber its whole group)
+        sort_index = None
         if (
-                self.get_table()._dev_sortable  # sortable
-                and len(self._data) > 0  # if first update inert (at creation), may not have a sort_index
+                self._initialized
+                and self.get_table()._dev_sortable
+                and SORT_INDEX in data
+                and new_data[SORT_INDEX] != self._table._dev_get_sort_position(self)
         ):
-            # for following comments, we consider records are ordered from left to right
-            if self._data[SORT_INDEX] < new_data[SORT_INDEX]:
-                # record has been shifted rightwards. New sort index might therefore overlap an existing record. We make
-                # sure current record is after existing record.
-                new_data[SORT_INDEX] += EPSILON
-            elif self._data[SORT_INDEX] > new_data[SORT_INDEX]:
-                # record has been shifted leftwards. Ne sort index might therefore overlap an existing record. We make
-                # sure that current record is before existing record.
-                new_data[SORT_INDEX] -= EPSILON
+            sort_index = new_data[SORT_INDEX]
 
         # store
-        self._data = new_data
+        self._row = self._table._dev_rows.write(self._row, new_data)
+
+        # inform table (skipped on creation, table is not aware of record yet)
+        if self._initialized:
+            self._table._dev_record_updated(self, sort_index=sort_index)
+
+    # create from data that was already deserialized (bulk loading)
+    @classmethod
+    def _dev_from_validated_data(cls, table, records_data):
+        """
+        equivalent to records creation (inert), without deserialization
+
+        Returns
+        -------
+        list of records
+        """
+        # slots are set directly (__setattr__ protects fields, which are not set yet)
+        set_table, set_row = Record._table.__set__, Record._row.__set__
+        set_in_progress, set_initialized = Record._post_save_in_progress.__set__, Record._initialized.__set__
+        write_row = table._dev_rows.write
+        records = []
+        for data in records_data:
+            record = cls.__new__(cls)
+            set_table(record, table)
+            set_row(record, write_row(None, data))
+            set_in_progress(record, False)
+            set_initialized(record, True)
+            records.append(record)
+        return records
 
-    # ----------------------------------------- dev api ----------------------------------------------------------------
     # guess id from data (for validation, record does not yet exist)
     @classmethod
     def _dev_guess_new_data_id(cls, table, data):
@@ -156,28 +205,48 @@ class Record:
         return "<" + ",".join(sorted(f"{repr(k)}={repr(v)}" for k, v in data.items())) + ">"
 
     # get
-    def _dev_get_raw_value(self, item):
-        return self._data[item]
+    def _dev_get_raw_value(self, item, *default):
+        """
+        Returns
+        -------
+        stored value (record links are not transformed). If value is not set, default is returned if given, else
+        KeyError is raised.
+        """
+        offset = self._table._dev_field_offsets.get(item)
+        value = ABSENT if (offset is None or self._row is None) else self._row[offset]
+        if value is ABSENT:
+            if default:
+                return default[0]
+            raise KeyError(item)
+        return value
+
+    def _dev_get_data(self):
+        """
+        Returns
+        -------
+        {field: stored value, ...} of set values (new dict)
+        """
+        if self._row is None:
+            return {}
+        return {field: value for field, value in zip(self._table._dev_field_offsets, self._row) if value is not ABSENT}
 
     # save/update/delete
     def _dev_activate_links(self):
         """
         used by: db.__init__, table.batch_add, record.update
         """
-        links_to_activate = []  # [(field, link), ...]
-        for field, descriptor in self.get_schema().declared_fields.items():
-            if not isinstance(descriptor, BaseLinkableField):
-                continue
-            links_to_activate.extend([
-                (field, link) for link in descriptor._dev_get_links(self._data[field])
-            ])
-
-        oec = OExceptionCollection()
-        for field, record_link in links_to_activate:
-            # activate
-            with oec.catch_errors():
-                record_link.activate(self, field)
-        oec.raise_if_error()
+        oec = None  # only created if an error occurs (called for each record on db load)
+        for field, descriptor in self._table._dev_linkable_fields:
+            for record_link in descriptor._dev_get_links(self._dev_get_raw_value(field)):
+                # activate
+                try:
+                    record_link.activate(self, field)
+                except (OException, OExceptionCollection) as e:
+                    if oec is None:
+                        oec = OExceptionCollection()
+                    oec.append(e)
+        if oec is not None:
+            oec.raise_if_error()
 
     def _dev_set_none_without_unregistering(self, field, target_record):
         """
@@ -186,7 +255,7 @@ class Record:
         """
         # prepare empty value
         field_schema = self.get_schema().fields[field]
-        empty_value = field_schema._dev_set_target_to_none(self._data[field], target_record)
+        empty_value = field_schema._dev_set_target_to_none(self._dev_get_raw_value(field), target_record)
 
         # update without unregistering links
         self._update_inert({field: empty_value}, unregister_links=False)
@@ -201,24 +270,56 @@ class Record:
             if len(delete_commitments) > 0:
                 raise DeleteCommitmentError.from_record(self, delete_commitments)
 
-        # call pre delete
-        self._pre_delete()
+        # call pre delete (operations of hooks are not journaled, they are replayed with deletion)
+        with self.get_db()._dev_journal_suspended():
+            self._pre_delete()
+
+        # save data if a db batch is in progress (so that it can be rolled back)
+        undo_log = self.get_db()._dev_undo_log
+        if undo_log is not None:
+            undo_log.save(self)
 
         # unregister record (will also unregister it's links)
         self.get_db()._dev_relations_manager.unregister_record(self)
 
         # tell table to remove without unregistering
+        if undo_log is not None:
+            undo_log.delete(self)
         self.get_table()._dev_remove_record_without_unregistering(self)
 
         # make stale
+        self._table._dev_rows.release(self._row)
         self._table = None
-        self._data = None
+        self._row = None
+
+    def _dev_check_update_commitments(self, data):
+        if self._committing_relations_for_update is None:
+            return
+
+        # retrieve update commitments
+        update_commitments = self.get_commitments()["update"]
+
+        # prepare error management
+        oec = OExceptionCollection()
+
+        # iter problems
+        for committed_field in set(update_commitments).intersection(data):
+            oec.append(
+                UpdateCommitmentError.from_record(self, committed_field, update_commitments[committed_field]))
+
+        # raise if relevant
+        oec.raise_if_error()
 
     def _dev_post_save(self, created, db_is_initializing):
         """
         Ensures user is not modifying the record on his post_save method, to avoid infinite loops.
         DO NOT OVERRIDE UNLESS YOU ARE SURE YOU KNOW WHAT YOU ARE DOING
         """
+        # deferred to the end of db batch, if any
+        batch = self.get_db()._dev_batch
+        if batch is not None:
+            batch.add_post_save(self, created)
+            return
         if self._post_save_in_progress:
             raise AssertionError("Tried to update a record from its post_save function, which is forbidden.")
         self._post_save_in_progress = True
@@ -234,7 +335,16 @@ class Record:
 
     # manage sort index
     def _dev_set_sort_index(self, sort_index):
-        self._data[SORT_INDEX] = sort_index
+        """
+        Returns
+        -------
+        True if sort index was changed
+        """
+        offset = self._table._dev_field_offsets[SORT_INDEX]
+        if self._row[offset] == sort_index:
+            return False
+        self._row[offset] = sort_index
+        return True
 
     # ------------------------------------------- public api -----------------------------------------------------------
     # python magic
@@ -247,18 +357,29 @@ class Record:
         if self.get_db() is None:
             return repr(self)
 
+        # make sure sort index is up to date
+        if self._table._dev_sortable:
+            getattr(self, SORT_INDEX, None)
+
         s = self.get_table_ref() + "\n"
         s += f"  id: {self.id}\n"
-        for k, v in sorted(self._data.items()):
+        for k, v in sorted(self._dev_get_data().items()):
             s += f"  {k}: {v}\n"
         return s
 
     def __getattr__(self, item):
+        # sort indexes are managed by table (renumbered lazily)
+        if item == SORT_INDEX and self._table._dev_sortable:
+            value = self._table._dev_get_sort_index(self)
+            if value is None:
+                raise AttributeError(f"'{item}' not found (record type: {self.get_table_ref()})")
+            return value
+
         # get raw value
-        try:
-            value = self._data[item]
-        except KeyError as e:
-            raise AttributeError(f"{e} not found (record type: {self.get_table_ref()})")
+        offset = self._table._dev_field_offsets.get(item)
+        value = ABSENT if offset is None else self._row[offset]
+        if value is ABSENT:
+            raise AttributeError(f"'{item}' not found (record type: {self.get_table_ref()})")
 
         # transform and return
         if isinstance(value, RecordLink):
@@ -271,13 +392,16 @@ class Record:
         """
         protect fields once object has been frozen
         """
-        if self._initialized_for_setattr_ and key in self._data:
+        if key not in Record.__slots__ and self._row is not None and (
+                self._dev_get_raw_value(key, ABSENT) is not ABSENT
+                or (key == SORT_INDEX and self._table._dev_sortable)  # sort index may not be numbered yet
+        ):
             self.update({key: value})
         else:
             super().__setattr__(key, value)
 
     def __dir__(self):
-        return list(self.get_schema().declared_fields.keys()) + list(self.__dict__.keys())
+        return list(self.get_schema().declared_fields.keys()) + list(getattr(self, "__dict__", ()))
 
     def __lt__(self, other):
         # compare tables
@@ -378,7 +502,7 @@ class Record:
          workflow
         --------
         (methods belonging to create/update/delete framework:
-            db.__init__, table.batch_add, record.update, queryset.delete, record.delete)
+            db.__init__, table.batch_add, record.update, queryset.bulk_update, queryset.delete, record.delete)
         1. update inert
             * data is checked
             * old links are unregistered
@@ -391,23 +515,15 @@ class Record:
         data = or_data if data is None else data
 
         # manage update commitments if relevant
-        if self._committing_relations_for_update is not None:
-            # retrieve update commitments
-            update_commitments = self.get_commitments()["update"]
-
-            # prepare error management
-            oec = OExceptionCollection()
-
-            # iter problems
-            for committed_field in set(update_commitments).intersection(data):
-                oec.append(
-                    UpdateCommitmentError.from_record(self, committed_field, update_commitments[committed_field]))
-
-            # raise if relevant
-            oec.raise_if_error()
+        self._dev_check_update_commitments(data)
 
         # update inert
+        journal = self.get_db()._dev_journal
+        if journal is not None:
+            initial_id = self.id
         self._update_inert(data)
+        if journal is not None:  # requested sort index is journaled (will be replaced once record is placed)
+            requested_sort_index = self._dev_get_raw_value(SORT_INDEX, None)
 
         # activate links
         self._dev_activate_links()
@@ -418,8 +534,13 @@ class Record:
         # set sort index
         self.get_table()._dev_set_all_sort_indexes()
 
-        # post save
-        self._dev_post_save(False, False)  # not created, not db_is_initializing
+        # post save (operations of hooks are not journaled, they are replayed with this operation)
+        if journal is not None:
+            journal_entry = journal.get_update_entry(self, initial_id, data, requested_sort_index)
+        with self.get_db()._dev_journal_suspended():
+            self._dev_post_save(False, False)  # not created, not db_is_initializing
+        if journal is not None:
+            journal.log(journal_entry)
 
         # fixme: [GL] cross table verifications are not called here, db may become corrupt, manage.
         #  Possible optimization problems.
@@ -452,12 +573,15 @@ class Record:
          workflow
         --------
         (methods belonging to create/update/delete framework:
-            db.__init__, table.batch_add, record.update, queryset.delete, record.delete)
+            db.__init__, table.batch_add, record.update, queryset.bulk_update, queryset.delete, record.delete)
         1. delete without setting all sort indexes
         2. set all sort indexes
         """
         # store table (to sort indexes later on)
         table = self._table
+        journal = table.get_db()._dev_journal
+        if journal is not None:
+            journal_entry = journal.get_delete_entry(table, [self])
 
         # delete
         self._dev_delete_without_setting_sort_index()
@@ -465,6 +589,9 @@ class Record:
         # set table sort index
         table._dev_set_all_sort_indexes()
 
+        if journal is not None:
+            journal.log(journal_entry)
+
     def get_commitments(self):
         """
         Returns
@@ -515,7 +642,7 @@ class Record:
         for field, descriptor in schema.declared_fields.items():
             if isinstance(descriptor, LinkField) or (
                     isinstance(descriptor, TupleLinkField) and isinstance(descriptor.inner, LinkField)):
-                d[field] = self._data.get(field)
+                d[field] = self._dev_get_raw_value(field, None)
             else:
                 d[field] = getattr(self, field, None)
         return d
@@ -1,3 +1,6 @@
+from .records_index import RecordsIndex
+
+
 class DuplicateFieldIdError(Exception):
     def __init__(self, record_id):
         self.id = record_id
@@ -28,22 +31,28 @@ class RecordsContainer:
     def remove_record(self, record):
         raise NotImplementedError
 
+    def refresh_record(self, record):
+        """
+        record data was updated (or data it depends on), its id may have changed
+        """
+        pass
+
+    def get_id(self, record):
+        return record.id
+
     def values(self, sort=False):
         raise NotImplementedError
 
-    def get_index(self, record):
-        return tuple(self.values(sort=True)).index(record)
-
 
 class FieldPkRecordsContainer(RecordsContainer):
     def __init__(self):
         self._records = {}  # {pk_str: record, ...}
 
     def __contains__(self, item):
-        return item in self._records
+        return str(item) in self._records
 
     def __getitem__(self, item):
-        return self._records[item]
+        return self._records[str(item)]
 
     def __len__(self):
         return len(self._records)
@@ -63,7 +72,7 @@ class FieldPkRecordsContainer(RecordsContainer):
         self._records[new_pk_str] = self._records.pop(str(old_pk))
 
     def remove_record(self, record):
-        del self._records[record.id]
+        del self._records[str(record.id)]
 
     def values(self, sort=False):
         if sort:
@@ -74,31 +83,48 @@ class FieldPkRecordsContainer(RecordsContainer):
 class DynamicPkRecordsContainer(RecordsContainer):
     def __init__(self):
         self._records = set()
+        self._ids_index = RecordsIndex(lambda x: x.id)  # ids are computed lazily (links must be activated)
 
     def __contains__(self, item):
         return item in self._records
 
     def __getitem__(self, item):
         try:
-            return next(filter(lambda x: x.id == item, self._records))
+            records = self._ids_index.get(item)
         except AttributeError as e:
             raise AssertionError(
                 # may be caused by get_pk function. If links were not activated in correct order, may happen
                 f"{e}\n(this may be caused by dynamic ids that did not declare their dependency tables)") from None
-        except StopIteration:
-            raise KeyError(item) from None
+        if len(records) == 0:
+            raise KeyError(item)
+        return records[0]
 
     def __len__(self):
         return len(self._records)
 
     def add_record(self, record):
         self._records.add(record)
+        self._ids_index.mark(record)
 
     def update_pk(self, new_pk, old_pk):
         raise AssertionError("should not be here")
 
     def remove_record(self, record):
         self._records.remove(record)
+        self._ids_index.discard(record)
+
+    def refresh_record(self, record):
+        if record in self._records:
+            self._ids_index.mark(record)
+
+    def refresh_all(self):
+        self._ids_index.mark_all()
+
+    def get_id(self, record):
+        """
+        id is not computed again if record was not refreshed
+        """
+        return self._ids_index.get_key(record)
 
     def values(self, sort=False):
         if sort:
@@ -0,0 +1,90 @@
+class RecordsIndex:
+    """
+    Hash index of table records: {key: records, ...}.
+
+    Keys are computed lazily. Records that are added or updated are only marked as pending, and their key is
+    (re)computed on next index access. This way keys that depend on links (link fields, dynamic ids) are computed once
+    links are activated.
+
+    Several records may share the same key, they are returned in insertion order.
+    """
+    def __init__(self, key_fct):
+        self._key_fct = key_fct
+        self._keys = {}  # {record: key, ...}
+        self._records = {}  # {key: {record: None, ...}, ...} (dicts are used as ordered sets)
+        self._pending = {}  # {record: None, ...}
+        self._duplicate_keys = {}  # {key: None, ...} keys shared by more than one record
+
+    def __len__(self):
+        self.flush()
+        return len(self._keys)
+
+    def mark(self, record):
+        """
+        record was added or updated, its key will be (re)computed on next access
+        """
+        self._pending[record] = None
+
+    def mark_all(self):
+        self._pending.update(dict.fromkeys(self._keys))
+
+    def discard(self, record):
+        """
+        record was removed from table (its key may not be computable anymore, we use the stored one)
+        """
+        self._pending.pop(record, None)
+        self._unindex(record)
+
+    def flush(self):
+        if len(self._pending) == 0:
+            return
+        # we iterate on a copy so that pending records whose key computation failed remain pending
+        for record in tuple(self._pending):
+            key = self._key_fct(record)
+            del self._pending[record]
+            self._unindex(record)
+            self._keys[record] = key
+            if key not in self._records:
+                self._records[key] = {}
+            records = self._records[key]
+            records[record] = None
+            if len(records) == 2:
+                self._duplicate_keys[key] = None
+
+    def get(self, key):
+        """
+        Returns
+        -------
+        tuple of records indexed by key (empty if none)
+        """
+        self.flush()
+        return tuple(self._records.get(key, ()))
+
+    def get_key(self, record):
+        self.flush()
+        return self._keys[record]
+
+    def duplicate_keys(self):
+        """
+        Returns
+        -------
+        tuple of keys that are shared by more than one record
+        """
+        self.flush()
+        return tuple(self._duplicate_keys)
+
+    def keys(self):
+        self.flush()
+        return self._records.keys()
+
+    def _unindex(self, record):
+        try:
+            key = self._keys.pop(record)
+        except KeyError:
+            return
+        records = self._records[key]
+        del records[record]
+        if len(records) == 1:
+            del self._duplicate_keys[key]
+        elif len(records) == 0:
+            del self._records[key]
@@ -61,6 +61,48 @@ class RelationsManager:
             self._links_by_target[record_link.target_record] = set()
         self._links_by_target[record_link.target_record].add(record_link)
 
+    def register_links(self, links):
+        """
+        activates and registers links at once: targets are looked up once per target id
+
+        Parameters
+        ----------
+        links: [(record_link, source_record, source_field), ...] (links that are not activated yet)
+
+        Returns
+        -------
+        False if a target was not found (no link was registered)
+        """
+        # find targets first, so that nothing is modified if a target is missing
+        targets_by_id = {}  # {(target_table_ref, target_id): target_record, ...}
+        targets = []
+        for record_link, source_record, source_field in links:
+            key = (record_link.target_table_ref, record_link.initial_target_id)
+            try:
+                targets.append(targets_by_id[key])
+            except KeyError:
+                try:
+                    target = getattr(self._db, key[0]).one(key[1])
+                except RecordDoesNotExistError:
+                    return False
+                targets_by_id[key] = target
+                targets.append(target)
+
+        # activate and store
+        links_by_source, links_by_target = self._links_by_source, self._links_by_target
+        for (record_link, source_record, source_field), target in zip(links, targets):
+            record_link.source_record = source_record
+            record_link.source_field = source_field
+            record_link.set_target(target)
+            record_link.initial_target_id = None
+            if source_record not in links_by_source:
+                links_by_source[source_record] = set()
+            links_by_source[source_record].add(record_link)
+            if target not in links_by_target:
+                links_by_target[target] = set()
+            links_by_target[target].add(record_link)
+        return True
+
     def unregister_record(self, record):
         # find pointing links
         for link in self._links_by_target.get(record, set()).copy():  # copy
@@ -83,6 +125,30 @@ class RelationsManager:
         if len(self._links_by_source[record_link.source_record]) == 0:
             del self._links_by_source[record_link.source_record]
 
+    def unregister_links_from(self, source_record):
+        """
+        unregisters links of source record, without modifying pointed records (used to roll back db batches)
+        """
+        for link in tuple(self._links_by_source.get(source_record, ())):
+            link.unregister()
+
+    def restore_link(self, record_link):
+        """
+        registers again a link that was activated, then unregistered (used to roll back db batches)
+        """
+        if record_link.source_record not in self._links_by_source:
+            self._links_by_source[record_link.source_record] = set()
+        self._links_by_source[record_link.source_record].add(record_link)
+        if record_link.target_record not in self._links_by_target:
+            self._links_by_target[record_link.target_record] = set()
+        self._links_by_target[record_link.target_record].add(record_link)
+
+    def iter_pointing_on(self, target_record):
+        """
+        light version of get_pointing_on (no queryset, no sort), a source record is yielded once per pointing link
+        """
+        return (link.source_record for link in tuple(self._links_by_target.get(target_record, ())))
+
     def get_pointing_on(self, target_record, sort=True):
         return MultiTableQueryset(
             self._db,
@@ -0,0 +1,261 @@
+import numpy as np
+
+from omemdb.packages.omarsh import fields
+
+ABSENT = object()  # row value of fields that were not set (value is missing from data)
+
+# states of columnar values
+_VALUE, _NONE, _ABSENT = 0, 1, 2
+
+# {field type: (python type, numpy dtype), ...} (field types must match exactly, subclasses may store other types)
+_TYPED_FIELDS = {
+    fields.Boolean: (bool, np.bool_),
+    fields.Integer: (int, np.int64),
+    fields.Float: (float, np.float64),
+    fields.String: (str, np.int32),  # code in strings pool
+    fields.RefField: (str, np.int32)
+}
+_INT64_MIN, _INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def values_to_array(values, field_descriptor):
+    """
+    Returns
+    -------
+    numpy array: typed if field is a boolean, integer, float or string field and all values are of field type
+    (strings are stored in an object array), object array else
+    """
+    python_type, dtype = _TYPED_FIELDS.get(type(field_descriptor), (None, None))
+    if python_type is not None and all(type(v) is python_type for v in values):
+        if python_type is not str and (
+                python_type is not int or len(values) == 0 or _INT64_MIN <= min(values) and max(values) <= _INT64_MAX):
+            return np.array(values, dtype=dtype)
+    return np.fromiter(values, dtype=object, count=len(values))
+
+
+class RowsStorage:
+    """
+    Stores records data: each record has a row (list-like of values ordered by field offsets, ABSENT if value was not
+    set).
+    """
+    def write(self, row, data):
+        """
+        Parameters
+        ----------
+        row: row to write or None (a new row is created)
+        data: {field: value, ...} (fields that are not in data are ABSENT)
+
+        Returns
+        -------
+        row
+        """
+        raise NotImplementedError
+
+    def release(self, row):
+        """
+        record was deleted
+        """
+        pass
+
+    def get_column(self, offset, rows=None):
+        """
+        Parameters
+        ----------
+        offset: field offset
+        rows: rows whose values are returned, in this order (all rows in storage order if None)
+
+        Returns
+        -------
+        numpy array, None if storage does not hold field values in a column
+        """
+        return None
+
+
+class ListRowsStorage(RowsStorage):
+    """
+    rows are lists of values
+    """
+    def __init__(self, field_offsets):
+        self._field_offsets = field_offsets
+
+    def write(self, row, data):
+        return [data.get(field, ABSENT) for field in self._field_offsets]
+
+
+class ColumnarRow:
+    """
+    row view on columnar storage (records only store this view)
+    """
+    __slots__ = ("_storage", "_row_id")
+
+    def __init__(self, storage, row_id):
+        self._storage = storage
+        self._row_id = row_id
+
+    def __getitem__(self, offset):
+        return self._storage._get_value(offset, self._row_id)
+
+    def __setitem__(self, offset, value):
+        self._storage._set_value(offset, self._row_id, value)
+
+    def __iter__(self):
+        return (self._storage._get_value(offset, self._row_id) for offset in range(len(self._storage._columns)))
+
+    def __len__(self):
+        return len(self._storage._columns)
+
+
+class _TypedColumn:
+    """
+    numpy arrays of values and of value states, scalars are read and written through memory views (python values)
+    """
+    __slots__ = ("python_type", "values", "states", "_values_view", "_states_view")
+
+    def __init__(self, python_type, values, states):
+        self.python_type = python_type
+        self.values = values
+        self.states = states
+        self._values_view = memoryview(values)
+        self._states_view = memoryview(states)
+
+    @classmethod
+    def empty(cls, python_type, dtype, capacity):
+        return cls(python_type, np.zeros(capacity, dtype=dtype), np.full(capacity, _ABSENT, dtype=np.int8))
+
+    def get(self, row_id, strings):
+        state = self._states_view[row_id]
+        if state == _VALUE:
+            value = self._values_view[row_id]
+            return strings[value] if self.python_type is str else value
+        return None if state == _NONE else ABSENT
+
+    def set(self, row_id, value, get_string_code):
+        """
+        Returns
+        -------
+        False if value can't be stored in column
+        """
+        if value is None:
+            self._states_view[row_id] = _NONE
+        elif value is ABSENT:
+            self._states_view[row_id] = _ABSENT
+        elif type(value) is not self.python_type or (self.python_type is int and not _INT64_MIN <= value <= _INT64_MAX):
+            return False
+        else:
+            self._values_view[row_id] = get_string_code(value) if self.python_type is str else value
+            self._states_view[row_id] = _VALUE
+        return True
+
+    def extended(self, extension):
+        return _TypedColumn(
+            self.python_type,
+            np.concatenate((self.values, np.zeros(extension, dtype=self.values.dtype))),
+            np.concatenate((self.states, np.full(extension, _ABSENT, dtype=self.states.dtype)))
+        )
+
+
+class ColumnarRowsStorage(RowsStorage):
+    """
+    Values are stored by column, a record row being a view on a row id (ids of deleted records are reused).
+
+    Boolean, integer, float and string (exact field types) columns are numpy arrays (strings are stored as codes in an
+    interned strings pool), with an array of value states (value, None, ABSENT). Other columns are python lists.
+    If a value that can't be stored in a typed column is written (for example, if validation was skipped), column is
+    converted to a python list.
+    """
+    _initial_capacity = 16
+
+    def __init__(self, schema, field_offsets):
+        self._fields = tuple(field_offsets)
+        self._capacity = self._initial_capacity
+        self._size = 0  # number of row ids that were used
+        self._free_row_ids = []
+        self._live = np.zeros(self._capacity, dtype=bool)
+
+        # columns: typed columns, or lists of values
+        self._columns = []
+        for field in self._fields:
+            python_type, dtype = _TYPED_FIELDS.get(type(schema.declared_fields[field]), (None, None))
+            if python_type is None:
+                self._columns.append([ABSENT] * self._capacity)
+            else:
+                self._columns.append(_TypedColumn.empty(python_type, dtype, self._capacity))
+
+        # strings pool
+        self._strings = []  # [string, ...]
+        self._strings_codes = {}  # {string: code, ...}
+        self._strings_array = None  # cache (object array of strings)
+
+    def __len__(self):
+        return self._size - len(self._free_row_ids)
+
+    # ------------------------------------------------ values ----------------------------------------------------------
+    def _get_value(self, offset, row_id):
+        column = self._columns[offset]
+        if type(column) is list:
+            return column[row_id]
+        return column.get(row_id, self._strings)
+
+    def _set_value(self, offset, row_id, value):
+        column = self._columns[offset]
+        if type(column) is list:
+            column[row_id] = value
+        elif not column.set(row_id, value, self._get_string_code):
+            # free rows are also converted (their values are not read)
+            self._columns[offset] = [column.get(i, self._strings) for i in range(self._capacity)]
+            self._columns[offset][row_id] = value
+
+    def _get_string_code(self, string):
+        try:
+            return self._strings_codes[string]
+        except KeyError:
+            code = len(self._strings)
+            self._strings.append(string)
+            self._strings_codes[string] = code
+            self._strings_array = None
+            return code
+
+    # ------------------------------------------------ rows ------------------------------------------------------------
+    def _new_row_id(self):
+        if len(self._free_row_ids) > 0:
+            return self._free_row_ids.pop()
+        if self._size == self._capacity:
+            extension = self._capacity
+            self._capacity += extension
+            self._live = np.concatenate((self._live, np.zeros(extension, dtype=bool)))
+            self._columns = [
+                column + [ABSENT] * extension if type(column) is list else column.extended(extension)
+                for column in self._columns
+            ]
+        self._size += 1
+        return self._size - 1
+
+    def write(self, row, data):
+        if row is None:
+            row = ColumnarRow(self, self._new_row_id())
+            self._live[row._row_id] = True
+        for offset, field in enumerate(self._fields):
+            self._set_value(offset, row._row_id, data.get(field, ABSENT))
+        return row
+
+    def release(self, row):
+        self._live[row._row_id] = False
+        self._free_row_ids.append(row._row_id)
+        for offset in range(len(self._columns)):  # release references
+            self._set_value(offset, row._row_id, ABSENT)
+
+    def get_column(self, offset, rows=None):
+        column = self._columns[offset]
+        if type(column) is list:
+            return None
+        row_ids = np.flatnonzero(self._live[:self._size]) if rows is None else \
+            np.fromiter((row._row_id for row in rows), dtype=np.int64)
+        values, states = column.values[row_ids], column.states[row_ids]
+        if column.python_type is str:
+            if self._strings_array is None:
+                self._strings_array = np.array(self._strings, dtype=object)
+            values = self._strings_array[values] if len(self._strings) > 0 else np.empty(len(values), dtype=object)
+        if (states != _VALUE).any():
+            values = values.astype(object)
+            values[states != _VALUE] = None
+        return values
@@ -0,0 +1,305 @@
+import itertools
+
+from .positional_list import PositionalList
+from .record import SORT_INDEX
+
+
+class SortManager:
+    """
+    Manages records order of a sortable table: one positional list per sort group (a single group if table is not
+    grouped).
+
+    Records are not placed when they are added or moved, operations are stored and performed on flush (once links
+    are activated, since sort groups may depend on links). Group keys are computed on flush only: a record whose group
+    may have changed must be updated (table does it when a record that groups may depend on is modified).
+
+    Sort indexes are renumbered lazily: a group is renumbered when the sort index of one of its records is read
+    (or eagerly, if asked, for example when dynamic ids depend on sort indexes).
+
+    A record that changes group without requesting a new sort index (or requesting its current one) keeps its sort
+    index: it is inserted before the record of the new group that has this index (last if new group is smaller).
+
+    Operations may be logged (see start_undo_log), so that they can be undone (used to roll back db batches).
+    """
+    _merge_threshold = 64  # batches of more records are merged with group (instead of inserted one by one)
+
+    def __init__(self, group_fct=None, on_sort_index_change=None, eager_numbering=False):
+        """
+        Parameters
+        ----------
+        group_fct: callable, default None
+            record -> sort group key
+        on_sort_index_change: callable, default None
+            called with record when its sort index was renumbered
+        eager_numbering: bool, default False
+            renumber groups as soon as they are modified
+        """
+        self._group_fct = group_fct
+        self._on_sort_index_change = on_sort_index_change
+        self._eager_numbering = eager_numbering
+
+        self._groups = {}  # {group_key: positional_list, ...}
+        self._group_keys = {}  # {record: group_key, ...} (placed records only)
+        self._pending = []  # [(record, is_add, requested_position), ...] operations performed on flush
+        self._pending_records = set()
+        self._dirty_groups = set()  # groups that must be renumbered
+        self._sorted_group_keys = None  # cache
+
+        # undo log (None if operations are not logged)
+        self._undo_log = None  # [(record, group_key, position), ...] placements (position None) and removals
+        self._undo_records = None  # {record, ...} records whose operations were stored since log was started
+
+    # ------------------------------------------- operations -----------------------------------------------------------
+    def add(self, record, priority):
+        """
+        Parameters
+        ----------
+        record
+        priority: (requested position, tie breaker), records added in a same batch are placed by ascending priority
+        """
+        self._pending.append((record, True, priority))
+        self._pending_records.add(record)
+        if self._undo_log is not None:
+            self._undo_records.add(record)
+
+    def update(self, record, sort_index=None):
+        """
+        Parameters
+        ----------
+        record: record that was modified (it's group will be checked)
+        sort_index: int, default None
+            requested sort index, if record must be moved
+        """
+        self._pending.append((record, False, sort_index))
+        self._pending_records.add(record)
+        if self._undo_log is not None:
+            self._undo_records.add(record)
+
+    def remove(self, record):
+        if record in self._pending_records:
+            self._pending = [op for op in self._pending if op[0] is not record]
+            self._pending_records.remove(record)
+        if record in self._group_keys:
+            self._remove_from_group(record)
+
+    def flush(self):
+        if len(self._pending) == 0:
+            return
+
+        # compute groups first, so that nothing is modified if a group function fails
+        group_keys = [
+            None if self._group_fct is None else self._group_fct(record)
+            for record, is_add, requested in self._pending
+        ]
+        pending, self._pending = self._pending, []
+        self._pending_records = set()
+
+        # perform operations (successive additions are placed together)
+        batch = []  # [(group_key, priority, record), ...]
+        for (record, is_add, requested), group_key in zip(pending, group_keys):
+            if is_add:
+                batch.append((group_key, requested, record))
+                continue
+            self._place_batch(batch)
+            batch = []
+            if record in self._group_keys:  # else was not placed (previous flush failed)
+                self._move(record, group_key, requested)
+        self._place_batch(batch)
+
+        # renumber if asked
+        if self._eager_numbering:
+            self.renumber()
+
+    def renumber(self):
+        """
+        renumbers modified groups now (stored sort indexes of placed records are then up to date)
+        """
+        for group_key in tuple(self._dirty_groups):
+            self._renumber(group_key)
+
+    # ---------------------------------------------- undo log ----------------------------------------------------------
+    def start_undo_log(self):
+        """
+        placements and removals of records are logged until log is stopped (or undone)
+        """
+        if self._undo_log is None:
+            self._undo_log = []
+            self._undo_records = set()
+
+    def stop_undo_log(self):
+        self._undo_log = None
+        self._undo_records = None
+
+    def undo(self):
+        """
+        undoes logged operations (records order is restored, stored operations of logged records are dropped) and
+        stops log. Stored sort indexes of modified groups are renumbered (when read, unless numbering is eager).
+        """
+        undo_log, undo_records = self._undo_log, self._undo_records
+        self.stop_undo_log()
+
+        # drop stored operations
+        self._pending = [op for op in self._pending if op[0] not in undo_records]
+        self._pending_records.difference_update(undo_records)
+
+        # undo placements and removals, last first
+        for record, group_key, position in reversed(undo_log):
+            if position is None:
+                self._remove_from_group(record)
+            else:
+                self._get_or_create_group(group_key).insert(position, record)
+                self._group_keys[record] = group_key
+                self._dirty_groups.add(group_key)
+
+        # renumber if asked
+        if self._eager_numbering:
+            self.renumber()
+
+    # ---------------------------------------------- queries -----------------------------------------------------------
+    def get_sort_index(self, record):
+        """
+        Returns
+        -------
+        sort index of record (stored value if record was not placed yet, None if no value is stored)
+        """
+        if record in self._group_keys:
+            group_key = self._group_keys[record]
+            if group_key in self._dirty_groups:
+                self._renumber(group_key)
+        try:
+            return record._dev_get_raw_value(SORT_INDEX)
+        except KeyError:
+            return None
+
+    def get_index(self, record):
+        """
+        Returns
+        -------
+        position of record in table (all groups)
+        """
+        self.flush()
+        group_key = self._group_keys[record]
+        index = self._groups[group_key].index(record)
+        for key in self._get_sorted_group_keys():
+            if key == group_key:
+                return index
+            index += len(self._groups[key])
+
+    def get_sort_key(self, record):
+        """
+        Returns
+        -------
+        (group key, position in group), keys of records are ordered as records
+        """
+        self.flush()
+        group_key = self._group_keys[record]
+        return group_key, self._groups[group_key].index(record)
+
+    def get_position(self, record):
+        """
+        Returns
+        -------
+        position of record in its group (its sort index once group is renumbered, group is not renumbered)
+        """
+        return self.get_sort_key(record)[1]
+
+    def records(self):
+        """
+        Returns
+        -------
+        list of records, sorted
+        """
+        self.flush()
+        return list(itertools.chain.from_iterable(self._groups[k] for k in self._get_sorted_group_keys()))
+
+    # ------------------------------------------------ private ---------------------------------------------------------
+    def _place_batch(self, batch):
+        # organize by group
+        batch_by_group = {}
+        for group_key, priority, record in batch:
+            if group_key not in batch_by_group:
+                batch_by_group[group_key] = []
+            batch_by_group[group_key].append((priority, record))
+
+        # place (by ascending priority, positions refer to group before batch was added)
+        for group_key, group_batch in batch_by_group.items():
+            group = self._get_or_create_group(group_key)
+            initial_length = len(group)
+            group_batch.sort(key=lambda x: x[0])
+            slots = [min(max(priority[0], 0), initial_length) for priority, record in group_batch]
+            if len(group_batch) < self._merge_threshold:
+                for i, (slot, (priority, record)) in enumerate(zip(slots, group_batch)):
+                    group.insert(slot + i, record)
+            else:
+                # big batch: merge with existing records and rebuild group (O(n))
+                records = []
+                batch_iter = iter(zip(slots, group_batch))
+                next_slot, (_, next_record) = next(batch_iter)
+                for index, record in enumerate(itertools.chain(group, (None,))):
+                    while next_slot == index:
+                        records.append(next_record)
+                        next_slot, (_, next_record) = next(batch_iter, (None, (None, None)))
+                    if record is not None:
+                        records.append(record)
+                self._groups[group_key] = PositionalList(records)
+            for priority, record in group_batch:
+                self._group_keys[record] = group_key
+                if self._undo_log is not None:
+                    self._undo_log.append((record, group_key, None))
+            self._dirty_groups.add(group_key)
+
+    def _move(self, record, group_key, sort_index):
+        current_group_key = self._group_keys[record]
+
+        # leave if nothing to do
+        if group_key == current_group_key and sort_index is None:
+            return
+
+        # find position in new group (without record)
+        # (stored sort index may already have been replaced by requested one, we use position in current group)
+        current_sort_index = self._groups[current_group_key].index(record)
+        if sort_index is None:  # we keep current sort index (in new group, record goes before the one that has it)
+            position = current_sort_index
+        elif sort_index > current_sort_index:  # record is shifted rightwards, goes after record at sort index
+            position = sort_index if group_key == current_group_key else sort_index + 1
+        else:  # record is shifted leftwards, goes before record at sort index
+            position = sort_index
+
+        # place
+        self._remove_from_group(record)
+        self._get_or_create_group(group_key).insert(position, record)  # insert clamps position
+        self._group_keys[record] = group_key
+        if self._undo_log is not None:
+            self._undo_log.append((record, group_key, None))
+        self._dirty_groups.add(group_key)
+
+    def _get_or_create_group(self, group_key):
+        if group_key not in self._groups:
+            self._groups[group_key] = PositionalList()
+            self._sorted_group_keys = None
+        return self._groups[group_key]
+
+    def _remove_from_group(self, record):
+        group_key = self._group_keys.pop(record)
+        group = self._groups[group_key]
+        if self._undo_log is not None:
+            self._undo_log.append((record, group_key, group.index(record)))
+        group.remove(record)
+        if len(group) == 0:
+            del self._groups[group_key]
+            self._dirty_groups.discard(group_key)
+            self._sorted_group_keys = None
+        else:
+            self._dirty_groups.add(group_key)
+
+    def _renumber(self, group_key):
+        self._dirty_groups.remove(group_key)
+        for index, record in enumerate(self._groups[group_key]):
+            if record._dev_set_sort_index(index) and self._on_sort_index_change is not None:
+                self._on_sort_index_change(record)
+
+    def _get_sorted_group_keys(self):
+        if self._sorted_group_keys is None:
+            self._sorted_group_keys = sorted(self._groups)
+        return self._sorted_group_keys
+
@@ -0,0 +1,133 @@
+import bisect
+import itertools
+import math
+
+
+def is_unordered(value):
+    return value is None or value != value  # None or nan
+
+
+class SortedIndex:
+    """
+    Sorted index of table records on values of a field (numbers, dates, ...): range lookups are bisections.
+
+    Values are computed lazily (like RecordsIndex): records that are added or updated are only marked as pending, and
+    are (re)positioned on next index access. If many records are pending, index is rebuilt by sorting all records.
+
+    Records with equal values are ordered by indexing order. Records whose value is None (or nan) can't be ordered,
+    they are kept apart (in indexing order).
+    """
+    _rebuild_ratio = 8  # index is rebuilt if pending records are more than 1/8 of indexed records
+
+    def __init__(self, value_fct):
+        self._value_fct = value_fct
+        self._sorted_keys = []  # [(value, num), ...] sorted
+        self._sorted_records = []  # [record, ...] in sorted keys order
+        self._keys = {}  # {record: key or None if unordered, ...}
+        self._unordered = {}  # {record: None, ...} (dicts are used as ordered sets)
+        self._nums = {}  # {record: num, ...} indexing order of records (tie-breaker of equal values)
+        self._counter = itertools.count()
+        self._pending = {}  # {record: None, ...}
+
+    def __len__(self):
+        self.flush()
+        return len(self._keys)
+
+    def mark(self, record, num=None):
+        """
+        record was added or updated, its position will be (re)computed on next access
+
+        num: indexing order of record, default None (kept if record is indexed, new else). Used to restore records.
+        """
+        if num is not None:
+            self._nums[record] = num
+        elif record not in self._nums:
+            self._nums[record] = next(self._counter)
+        self._pending[record] = None
+
+    def discard(self, record):
+        """
+        record was removed from table (its value may not be computable anymore, we use the stored key)
+        """
+        self._pending.pop(record, None)
+        self._unindex(record)
+        self._nums.pop(record, None)
+
+    def get_num(self, record):
+        """
+        indexing order of record
+        """
+        return self._nums[record]
+
+    def flush(self):
+        if len(self._pending) == 0:
+            return
+        # values are computed first so that pending records remain pending if a computation fails
+        records = tuple(self._pending)
+        keys = [self._get_key(record) for record in records]
+        self._pending = {}
+
+        if len(records) * self._rebuild_ratio > len(self._sorted_records):
+            for record, key in zip(records, keys):
+                self._unordered.pop(record, None)
+                self._keys[record] = key
+                if key is None:
+                    self._unordered[record] = None
+            # keys are distinct (num), records are never compared
+            items = sorted((key, record) for record, key in self._keys.items() if key is not None)
+            self._sorted_keys = [key for key, _ in items]
+            self._sorted_records = [record for _, record in items]
+            return
+
+        for record, key in zip(records, keys):
+            self._unindex(record)
+            self._keys[record] = key
+            if key is None:
+                self._unordered[record] = None
+            else:
+                position = bisect.bisect_right(self._sorted_keys, key)
+                self._sorted_keys.insert(position, key)
+                self._sorted_records.insert(position, record)
+
+    def range(self, lo=None, hi=None):
+        """
+        Parameters
+        ----------
+        lo: lower bound (included), None for no bound
+        hi: upper bound (included), None for no bound
+
+        Returns
+        -------
+        list of records whose value is in range, ordered by value (records with None values are never returned)
+        """
+        self.flush()
+        start = 0 if lo is None else bisect.bisect_left(self._sorted_keys, (lo,))
+        stop = len(self._sorted_keys) if hi is None else bisect.bisect_right(self._sorted_keys, (hi, math.inf))
+        return self._sorted_records[start:stop]
+
+    def ordered(self, reverse=False):
+        """
+        Returns
+        -------
+        list of all records, ordered by value (records with None values are last)
+        """
+        self.flush()
+        records = self._sorted_records[::-1] if reverse else self._sorted_records[:]
+        records.extend(sorted(self._unordered, key=self._nums.__getitem__))  # indexing order
+        return records
+
+    def _get_key(self, record):
+        value = self._value_fct(record)
+        return None if is_unordered(value) else (value, self._nums[record])
+
+    def _unindex(self, record):
+        try:
+            key = self._keys.pop(record)
+        except KeyError:
+            return
+        if key is None:
+            del self._unordered[record]
+            return
+        position = bisect.bisect_left(self._sorted_keys, key)
+        del self._sorted_keys[position]
+        del self._sorted_records[position]
@@ -1,17 +1,24 @@
 import itertools
 import logging
+import operator
+import weakref
 
 from omemdb.packages.omarsh import fields, missing as MISSING, Schema
 
-from .omemdb_fields.api import LinkField, BaseLinkField
+from .omemdb_fields.api import LinkField, BaseLinkField, BaseLinkableField
 from .oerrors_omemdb import OExceptionCollection, NotUnique, NotUniqueTogether, RecordDoesNotExistError, \
-    TableDefinitionError
+    TableDefinitionError, get_instance
 from .util import camel_to_lower, lower_to_initials
 from .queryset import Queryset
 from .record import Record
 from .records_container import FieldPkRecordsContainer, DynamicPkRecordsContainer, DuplicateFieldIdError
 from .dynamic_fields_schema import DynamicFieldsSchemaMixin
-from .record import EPSILON, SORT_INDEX, SORT_GROUP
+from .records_index import RecordsIndex
+from .sorted_index import SortedIndex, is_unordered
+from .rows_storage import ListRowsStorage, ColumnarRowsStorage, values_to_array
+from .sort_manager import SortManager
+from .bulk_loader import BulkLoader, BulkLoadError
+from .record import SORT_INDEX, SORT_GROUP
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +27,12 @@ class EmptyMeta:
     pass
 
 
+def _get_values_getter(field_names):
+    def get_values(record):
+        return tuple(getattr(record, k) for k in field_names)
+    return get_values
+
+
 class Table:
     # fixme: [GL] document for users (meta, dynamic fields, ...).
     #  Explain dynamic pk risks (must be unique or may corrupt db) and drawbacks (performance issues)
@@ -35,6 +48,8 @@ class Table:
         self._initials = lower_to_initials(self._ref)
         self._dev_record_cls = record_cls
         self._dev_schema = None  # we store prepared schema
+        self._dev_field_offsets = None  # {field_name: offset in records rows, ...}
+        self._dev_rows = None  # rows storage, depends on meta
         self._db = db
         self._records = None  # will depend on meta, is set in _check_and_prepare_table
 
@@ -42,9 +57,32 @@ class Table:
         self._dev_pk_field = None
         self._dev_dynamic_id_fct = None
         self._dev_dynamic_id_tables = ()
+        self._dev_dynamic_id_dependent_tables = set()  # tables whose dynamic ids depend on this table, set by db
+        self._dev_dynamic_id_relay_tables = set()  # tables through which their records may point, set by db
+        self._dev_sort_group_dependent_tables = set()  # sortable tables whose groups depend on this table, set by db
+        self._dev_sort_group_relay_tables = set()  # tables through which their records may point, set by db
 
         self._unique_together = None
+        self._dev_indexed_fields = None  # (fields names, ...) declared indexes and unique together fields
+        self._dev_indexes = None  # {fields_names: records_index, ...}
+        self._unique_indexes = None  # {unique_together: records_index, ...} (subset of indexes)
+        self._dev_sorted_indexed_fields = None  # (field_name, ...) declared sorted indexes
+        self._dev_sorted_indexes = None  # {field_name: sorted_index, ...}
         self._dev_sortable = None
+        self._sort_manager = None  # set if table is sortable
+
+        # sorted view (cache, invalidated when records are added, removed, or when their order may have changed)
+        self._dev_sorted_records = None  # (record, ...) sorted
+        self._dev_sort_positions = None  # {record: position in sorted view, ...}
+
+        # validators (reused by all records)
+        self._dev_marsh_validator = None
+        self._dev_dynamic_fields_marsh_validators = weakref.WeakKeyDictionary()  # {field_descriptor: validator, ...}
+        self._dev_bulk_loader = None  # set if table supports bulk loading
+        self._dev_linkable_fields = None  # ((field_name, descriptor), ...)
+
+        # change tracking (incremented each time exported data of table may have changed)
+        self._dev_revision = 0
 
     # ----------------------------------------- private ----------------------------------------------------------------
     # check table definition
@@ -118,8 +156,11 @@ class Table:
 
         # * check no unknown meta fields
         unknown_fields = {k for k in dir(table_meta) if k[0] != "_"}.difference({
+            "columnar",
             "dynamic_id",
+            "indexes",
             "sortable",
+            "sorted_indexes",
             "unique"
         })
         if len(unknown_fields) > 0:
@@ -201,6 +242,31 @@ class Table:
         # make unique and store
         self._unique_together = tuple(sorted(set(unique_together)))
 
+        # * manage indexes (used by select_by, unique together fields are indexed)
+        indexes = getattr(table_meta, "indexes", ())
+        indexed_fields = [(indexes,)] if isinstance(indexes, str) else \
+            [(i,) if isinstance(i, str) else tuple(i) for i in indexes]
+        for fields_names in indexed_fields:
+            for field_name in fields_names:
+                if field_name not in self._dev_schema.declared_fields:
+                    raise TableDefinitionError(
+                        self._ref,
+                        f"unknown field declared as indexed: {field_name}")
+        self._dev_indexed_fields = tuple(sorted(set(indexed_fields).union(self._unique_together)))
+
+        # * manage sorted indexes (used by select_range and order_by)
+        sorted_indexes = getattr(table_meta, "sorted_indexes", ())
+        sorted_indexed_fields = (sorted_indexes,) if isinstance(sorted_indexes, str) else tuple(sorted_indexes)
+        for field_name in sorted_indexed_fields:
+            if field_name not in self._dev_schema.declared_fields:
+                raise TableDefinitionError(
+                    self._ref,
+                    f"unknown field declared as sorted index: {field_name}")
+        self._dev_sorted_indexed_fields = tuple(sorted(set(sorted_indexed_fields)))
+
+        # prepare indexes (so that uniqueness checks only concern modified records)
+        self._dev_prepare_indexes()
+
         # * manage sorting
         # fixme: [GL] put admin fields at beginning in correct order to optimize sort ?
         self._dev_sortable = getattr(self._dev_record_cls.TableMeta, "sortable", False)
@@ -215,6 +281,23 @@ class Table:
             elif self._dev_sortable is not True:
                 raise TableDefinitionError(self._ref, "sortable must be a boolean or a callable")
 
+            # prepare sort manager (dynamic ids may depend on sort index, we renumber eagerly if it is a possibility)
+            self._sort_manager = SortManager(
+                group_fct=self._dev_sortable if callable(self._dev_sortable) else None,
+                on_sort_index_change=self._dev_sort_index_changed,
+                eager_numbering=self._dev_dynamic_id_fct is not None
+            )
+
+        # store records rows layout (dump only fields are not stored)
+        self._dev_field_offsets = {
+            name: offset for offset, name in enumerate(
+                name for name in self._dev_schema.declared_fields if name not in ("id", SORT_GROUP))
+        }
+        if getattr(table_meta, "columnar", False):
+            self._dev_rows = ColumnarRowsStorage(self._dev_schema, self._dev_field_offsets)
+        else:
+            self._dev_rows = ListRowsStorage(self._dev_field_offsets)
+
         # store link dependencies
         self._dev_link_dependencies = set(
             linkField.target_table_ref
@@ -222,6 +305,20 @@ class Table:
             if isinstance(linkField, BaseLinkField)
         )
 
+        # store linkable fields
+        self._dev_linkable_fields = tuple(
+            (name, descriptor)
+            for name, descriptor in self._dev_schema.declared_fields.items()
+            if isinstance(descriptor, BaseLinkableField)
+        )
+
+        # prepare validator
+        self._dev_marsh_validator = self._db.marsh_validator_cls(self._dev_schema, get_instance(self._ref))
+
+        # prepare bulk loader if possible
+        if BulkLoader.is_supported(self):
+            self._dev_bulk_loader = BulkLoader(self)
+
     def _check_mono_field(self, field):
         # check authorized type
         if isinstance(field, (fields.Nested, fields.List, fields.Dict)):
@@ -231,32 +328,57 @@ class Table:
             raise RuntimeError(f"table {self._ref}: unknown target_table of given link ({field.target_table_ref})")
 
     # -------------------------------------------- dev api -------------------------------------------------------------
-    def _dev_add_inert(self, records_data, skip_validation=False):
+    def _dev_get_dynamic_field_marsh_validator(self, field_descriptor):
+        try:
+            return self._dev_dynamic_fields_marsh_validators[field_descriptor]
+        except KeyError:
+            marsh_validator = self._db.marsh_validator_cls(field_descriptor, get_instance(self._ref))
+            self._dev_dynamic_fields_marsh_validators[field_descriptor] = marsh_validator
+            return marsh_validator
+
+    def _dev_add_inert(self, records_data, skip_validation=False, bulk=False):
+        """
+        bulk: if True and table supports it, records data is deserialized column by column (falls back to record by
+            record deserialization if it fails, so that errors are reported)
+        """
         # inert being: not unique checked, not sorted, links not activated
         added_records = []
 
         # prepare exceptions
         oec = OExceptionCollection()
 
+        # deserialize in bulk if asked and possible
+        bulk_data = None
+        if bulk and self._dev_bulk_loader is not None:
+            records_data = list(records_data)
+            try:
+                bulk_data = self._dev_bulk_loader.load(records_data, skip_validation=skip_validation)
+            except BulkLoadError:
+                pass  # records will be created one by one, so that errors are reported
+
         # create records
-        for data in records_data:
-            # create record
-            with oec.catch_errors():
-                added_records.append(self._dev_record_cls(self, data, skip_validation=skip_validation))
+        undo_log = self._db._dev_undo_log
+        self._dev_mark_modified()
+        self._dev_invalidate_sorted_view()
+        if bulk_data is not None:
+            added_records = self._dev_record_cls._dev_from_validated_data(self, bulk_data)
+        else:
+            for data in records_data:
+                # create record
+                with oec.catch_errors():
+                    added_records.append(self._dev_record_cls(self, data, skip_validation=skip_validation))
         oec.raise_if_error()
 
         for num, record in enumerate(added_records):
-            # manage ordering if necessary
+            # manage ordering if necessary (record will be placed by sort manager when sort indexes are set)
             # algorithm :
             #  - if no position given by user: put at the end of table
             #  - put record to required position (last added wins on a batch)
             #
-            #  we use EPSILON to manage priority (works as long as (num+1)*EPSILON is < 1)
+            #  priority is (requested position, -num): on equal requested positions, last added record comes first
+            priority = None
             if self._dev_sortable:
-                if (num + 1) * EPSILON >= 1:
-                    raise RuntimeError("algorithm won't work, too many records were added at once")
-                prioritized_sort_index = getattr(record, SORT_INDEX, len(self._records)) - (num + 1) * EPSILON
-                record._dev_set_sort_index(prioritized_sort_index)
+                priority = (getattr(record, SORT_INDEX, len(self._records)), -num)
 
             # store
             try:
@@ -265,28 +387,51 @@ class Table:
                 field_name = "id" if self._dev_pk_field is None else self._dev_pk_field
                 oec.append(NotUnique(self._ref, e.id, field_name, getattr(record, field_name)))
                 continue
+            if undo_log is not None:
+                undo_log.add(record)
+            for index in itertools.chain(self._dev_indexes.values(), self._dev_sorted_indexes.values()):
+                index.mark(record)
+            if self._dev_sortable:
+                self._sort_manager.add(record, priority)
 
         oec.raise_if_error()
 
         return added_records
 
+    def _dev_activate_links(self, records):
+        """
+        activates links of added records at once (db loading). If a target is missing, links are activated record by
+        record, so that errors are reported as usual.
+        """
+        links = [
+            (record_link, record, field)
+            for record in records
+            for field, descriptor in self._dev_linkable_fields
+            for record_link in descriptor._dev_get_links(record._dev_get_raw_value(field))
+        ]
+        if not self._db._dev_relations_manager.register_links(links):
+            for record in records:
+                record._dev_activate_links()
+
+    def _dev_prepare_indexes(self):
+        # indexes compute keys lazily (once links are activated)
+        self._dev_indexes = {
+            fields_names: RecordsIndex(_get_values_getter(fields_names)) for fields_names in self._dev_indexed_fields}
+        self._unique_indexes = {ut: self._dev_indexes[ut] for ut in self._unique_together}
+        self._dev_sorted_indexes = {
+            field_name: SortedIndex(operator.attrgetter(field_name)) for field_name in self._dev_sorted_indexed_fields}
+
     def _dev_check_uniqueness(self):
-        # check uniqueness
-        oec = OExceptionCollection()
-        for ut in self._unique_together:
-            values = tuple(map(lambda x: tuple(getattr(x, k) for k in ut), self._records.values()))
-            if len(values) != len(set(values)):
-                # find duplicates
-                seen, duplicates = set(), set()
-                for v in values:
-                    if v in seen:
-                        duplicates.add(v)
-                    else:
-                        seen.add(v)
+        # deferred to the end of db batch, if any
+        if self._db._dev_batch is not None:
+            self._db._dev_batch.touch(self)
+            return
 
-                # list records and append exception
-                records = filter(lambda x: tuple(getattr(x, k) for k in ut) in duplicates, self._records.values())
-                for r in records:
+        # check uniqueness (indexes only recompute values of modified records)
+        oec = OExceptionCollection()
+        for ut, index in self._unique_indexes.items():
+            for values in index.duplicate_keys():
+                for r in index.get(values):
                     if len(ut) == 1:
                         oec.append(NotUnique(
                             self._ref,
@@ -307,30 +452,258 @@ class Table:
         # leave if not relevant
         if not self._dev_sortable:
             return
-        # no sort group
-        if self._dev_sortable is True:
-            for index, record in enumerate(self._records.values(sort=True)):
-                record._dev_set_sort_index(index)
+        # deferred to the end of db batch, if any
+        if self._db._dev_batch is not None:
+            self._db._dev_batch.touch(self)
             return
-        # with sort group
-        for group_key, group in itertools.groupby(
-                self._records.values(sort=True),
-                self._dev_sortable
-        ):
-            for index, record in enumerate(group):
-                record._dev_set_sort_index(index)
+        # place added and moved records (sort indexes will be renumbered when read)
+        self._sort_manager.flush()
+
+    def _dev_renumber_sort_indexes(self):
+        """
+        stored sort indexes are renumbered now (exported data is then up to date, see revision)
+        """
+        if self._dev_sortable:
+            self._sort_manager.flush()
+            self._sort_manager.renumber()
+
+    def _dev_sort_index_changed(self, record):
+        self._dev_mark_modified()  # stored sort index was renumbered
+        self._dev_refresh_ids(record)
+
+    def _dev_get_sort_index(self, record):
+        return self._sort_manager.get_sort_index(record)
+
+    def _dev_get_sort_position(self, record):
+        return self._sort_manager.get_position(record)
+
+    def _dev_record_updated(self, record, sort_index=None):
+        """
+        called by record once its data was modified
+
+        Parameters
+        ----------
+        record
+        sort_index: int, default None
+            new sort index, if record must be moved (sortable tables only)
+        """
+        self._dev_mark_modified()
+        self._dev_invalidate_sorted_view()
+        for index in itertools.chain(self._dev_indexes.values(), self._dev_sorted_indexes.values()):
+            index.mark(record)
+        if self._dev_sortable:
+            self._sort_manager.update(record, sort_index=sort_index)
+        self._dev_refresh_ids(record)
+        self._dev_regroup_dependent_records(record)
+
+    def _dev_refresh_ids(self, record):
+        """
+        record data (or data it depends on) was modified: refreshes record id and ids of records whose dynamic id
+        depends on it (records of dependent tables that point on it, directly or through records of relay tables)
+        """
+        self._records.refresh_record(record)
+        if not self._dev_sortable:  # records are sorted by id
+            self._dev_invalidate_sorted_view()
+        if self._dev_dynamic_id_fct is not None:  # id may have changed, so may exported links of pointing records
+            self._dev_mark_modified()
+            self._dev_mark_pointing_tables_modified(record)
+        if len(self._dev_dynamic_id_dependent_tables) == 0:
+            return
+        for pointing_record in self._dev_iter_dependent_records(
+                record, self._dev_dynamic_id_dependent_tables, self._dev_dynamic_id_relay_tables):
+            pointing_record.get_table()._dev_refresh_ids(pointing_record)
+
+    def _dev_regroup_dependent_records(self, record):
+        """
+        record was modified: sort groups of records that may depend on it are checked again
+        """
+        if len(self._dev_sort_group_dependent_tables) == 0:
+            return
+        records_by_table = {}  # {table: [record, ...], ...}
+        for pointing_record in self._dev_iter_dependent_records(
+                record, self._dev_sort_group_dependent_tables, self._dev_sort_group_relay_tables):
+            records_by_table.setdefault(pointing_record.get_table(), []).append(pointing_record)
+        for table, records in records_by_table.items():
+            table._dev_regroup(records)
+
+    def _dev_regroup(self, records):
+        """
+        sort groups of records may have changed (a record they depend on was modified), they are checked when sort
+        indexes are set
+        """
+        undo_log = self._db._dev_undo_log
+        if undo_log is not None:  # records may be moved
+            undo_log.touch(self)
+        # records are moved last first, so that records leaving a same group keep their order (and their sort index)
+        for record in reversed(self._dev_sort(records)):
+            self._sort_manager.update(record)
+        self._dev_mark_modified()
+        self._dev_invalidate_sorted_view()
+        self._dev_set_all_sort_indexes()
+
+    def _dev_iter_dependent_records(self, record, dependent_tables, relay_tables):
+        """
+        Returns
+        -------
+        iterator of records of dependent tables that point on record, directly or through records of relay tables (a
+        record is yielded once)
+        """
+        visited = {record}
+        to_visit = [record]
+        while len(to_visit) > 0:
+            for pointing_record in self._db._dev_relations_manager.iter_pointing_on(to_visit.pop()):
+                if pointing_record in visited:
+                    continue
+                visited.add(pointing_record)
+                pointing_table = pointing_record.get_table()
+                if pointing_table in dependent_tables:
+                    yield pointing_record
+                if pointing_table in relay_tables:
+                    to_visit.append(pointing_record)
 
     def _dev_update_pk(self, new_pk, old_pk):
         try:
             self._records.update_pk(new_pk, old_pk)
         except DuplicateFieldIdError:
             raise NotUnique(self._ref, old_pk, self._dev_pk_field, new_pk)
+        self._dev_invalidate_sorted_view()
+        if new_pk != old_pk:  # exported links of pointing records have changed
+            self._dev_mark_pointing_tables_modified(self._records[new_pk])
+
+    def _dev_get_column(self, field_name, records=None):
+        """
+        records: records of table whose values are returned, in this order (all records in storage order if None)
+        """
+        if field_name not in self._dev_field_offsets:
+            raise KeyError(f"table {self._ref}: unknown field: {field_name}")
+        array = self._dev_rows.get_column(
+            self._dev_field_offsets[field_name],
+            rows=None if records is None else [r._row for r in records]
+        )
+        if array is not None:
+            return array
+        if records is None:
+            records = self._records.values()
+        return values_to_array(
+            [getattr(r, field_name, None) for r in records],
+            self._dev_schema.declared_fields[field_name]
+        )
+
+    def _dev_mark_modified(self):
+        """
+        called each time exported data of table may have changed (records added, updated or removed)
+        """
+        self._dev_revision += 1
+
+    def _dev_mark_pointing_tables_modified(self, record):
+        for pointing_table in {r.get_table() for r in self._db._dev_relations_manager.iter_pointing_on(record)}:
+            pointing_table._dev_mark_modified()
 
     def _dev_remove_record_without_unregistering(self, record):
+        self._dev_mark_modified()
+        self._dev_invalidate_sorted_view()
         self._records.remove_record(record)
+        if self._dev_sortable:
+            self._sort_manager.remove(record)
+        for index in itertools.chain(self._dev_indexes.values(), self._dev_sorted_indexes.values()):
+            index.discard(record)
+
+    def _dev_rollback(self, saved_data, added_records, deleted_records):
+        """
+        restores records that were modified during a db batch, without calling hooks (links are restored by db).
+        Restored records keep their identity, added records become stale.
+
+        Parameters
+        ----------
+        saved_data: {record: data before its first modification, ...} (updated and deleted records)
+        added_records: records added during batch (and not deleted)
+        deleted_records: {record: {sorted index field: indexing order, ...}, ...} (deleted records of all tables)
+        """
+        self._dev_mark_modified()
+        self._dev_invalidate_sorted_view()
+
+        # remove added records, and records whose pk was modified (pks may have been swapped during batch)
+        moved_records = [] if self._dev_pk_field is None else [
+            r for r, data in saved_data.items()
+            if r not in deleted_records and r._dev_get_raw_value(self._dev_pk_field) != data[self._dev_pk_field]
+        ]
+        for record in itertools.chain(added_records, moved_records):
+            self._records.remove_record(record)
+        for record in added_records:
+            for index in itertools.chain(self._dev_indexes.values(), self._dev_sorted_indexes.values()):
+                index.discard(record)
+            self._dev_rows.release(record._row)
+            record._table = None
+            record._row = None
+
+        # restore data
+        for record, data in saved_data.items():
+            if record in deleted_records:
+                record._table = self
+                record._row = self._dev_rows.write(None, data)
+            else:
+                record._row = self._dev_rows.write(record._row, data)
+            for index in self._dev_indexes.values():
+                index.mark(record)
+            for field_name, index in self._dev_sorted_indexes.items():
+                index.mark(record, num=deleted_records[record][field_name] if record in deleted_records else None)
+        for record in itertools.chain(moved_records, (r for r in saved_data if r in deleted_records)):
+            self._records.add_record(record)
+
+        # restore order, then ids (that may depend on sort indexes and on pointed records)
+        if self._dev_sortable:
+            self._sort_manager.undo()
+        for record in saved_data:
+            self._dev_refresh_ids(record)
 
     def _dev_get_index(self, record):
-        return self._records.get_index(record)
+        if self._dev_sortable:
+            return self._sort_manager.get_index(record)
+        return self._dev_get_sort_positions()[record]
+
+    def _dev_invalidate_sorted_view(self):
+        self._dev_sorted_records = None
+        self._dev_sort_positions = None
+
+    def _dev_get_sorted_records(self):
+        """
+        Returns
+        -------
+        tuple of records, sorted (cached until table is modified)
+        """
+        if self._dev_sorted_records is None:
+            if self._dev_sortable:
+                self._dev_sorted_records = tuple(self._sort_manager.records())
+            else:
+                self._dev_sorted_records = tuple(sorted(self._records.values(), key=self._records.get_id))
+        return self._dev_sorted_records
+
+    def _dev_get_sort_positions(self):
+        if self._dev_sort_positions is None:
+            self._dev_sort_positions = {r: i for i, r in enumerate(self._dev_get_sorted_records())}
+        return self._dev_sort_positions
+
+    def _dev_get_sort_key(self, record):
+        """
+        sort key of a record (records are not compared)
+        """
+        if self._dev_sortable:
+            return self._sort_manager.get_sort_key(record)
+        return self._records.get_id(record)
+
+    def _dev_sort(self, records):
+        """
+        Parameters
+        ----------
+        records: collection of table records
+
+        Returns
+        -------
+        list of records, sorted (by position in sorted view, unless positions are not cached and records are few)
+        """
+        if self._dev_sort_positions is None and len(records) * 8 < len(self._records):
+            return sorted(records, key=self._dev_get_sort_key)
+        return sorted(records, key=self._dev_get_sort_positions().__getitem__)
 
     # ---------------------------------------- public api --------------------------------------------------------------
     # python magic
@@ -338,14 +711,15 @@ class Table:
         return f"<table:{self.get_ref()}>"
 
     def __getitem__(self, item):
-        return self.select()[item]
+        records = self._dev_get_sorted_records()
+        return list(records[item]) if isinstance(item, slice) else records[item]
 
     def __iter__(self):
         """
         returned records are sorted
         """
-        # sort returns a list, therefore self._records may be modified safely during iteration
-        return iter(sorted(self._records.values()))
+        # we iterate on a tuple, therefore self._records may be modified safely during iteration
+        return iter(self._dev_get_sorted_records())
 
     def __len__(self):
         return len(self._records)
@@ -370,7 +744,7 @@ class Table:
         workflow
         --------
         (methods belonging to create/update/delete framework:
-            db.__init__, table.batch_add, record.update, queryset.delete, record.delete)
+            db.__init__, table.batch_add, record.update, queryset.bulk_update, queryset.delete, record.delete)
         1. add inert
             * data is checked
             * old links are unregistered
@@ -382,6 +756,9 @@ class Table:
         """
         # add inert
         added_records = self._dev_add_inert(records_data)
+        journal = self._db._dev_journal
+        if journal is not None:  # requested sort indexes are journaled (will be replaced once records are placed)
+            requested_sort_indexes = [r._dev_get_raw_value(SORT_INDEX, None) for r in added_records]
 
         # activate links
         for r in added_records:
@@ -393,16 +770,156 @@ class Table:
         # set sort index
         self._dev_set_all_sort_indexes()
 
-        # post save
-        for r in added_records:
-            r._dev_post_save(True, False)  # created, not db_is_initializing
+        # post save (operations of hooks are not journaled, they are replayed with this operation)
+        if journal is not None:
+            journal_entry = journal.get_add_entry(self, added_records, requested_sort_indexes)
+        with self._db._dev_journal_suspended():
+            for r in added_records:
+                r._dev_post_save(True, False)  # created, not db_is_initializing
+        if journal is not None:
+            journal.log(journal_entry)
 
         return added_records
 
     # explore
     def select(self, filter_by=None, sort=True):
-        records = self._records.values() if filter_by is None else filter(filter_by, self._records.values())
-        return Queryset(self, records=records, sort=sort)
+        # sorted view is already sorted
+        records = self._dev_get_sorted_records() if sort else tuple(self._records.values())
+        return Queryset._dev_from_table_records(self, records, filter_by=filter_by, sort=sort, sorted_records=sort)
+
+    def select_by(self, **field_values):
+        """
+        Selects records whose fields are equal to given values, using the table index that covers most of given fields
+        (see TableMeta.indexes, unique fields are also indexed). Other fields are filtered.
+
+        Parameters
+        ----------
+        field_values: field_name=value (link fields values may be records or ids)
+
+        Returns
+        -------
+        Queryset (sorted)
+
+        Examples
+        --------
+        table.select_by(zone=zone, kind="wall")
+        """
+        # prepare values
+        values = {}
+        for field_name, value in field_values.items():
+            field_descriptor = self._dev_schema.declared_fields.get(field_name)
+            if field_descriptor is None:
+                raise KeyError(f"table {self._ref}: unknown field: {field_name}")
+            if isinstance(field_descriptor, LinkField) and isinstance(value, (str, int)):
+                try:
+                    value = self._db._tables[field_descriptor.target_table_ref].one(value)
+                except RecordDoesNotExistError:
+                    return Queryset(self)  # no record points on a record that does not exist
+            values[field_name] = value
+
+        # find records (in index, or in all records if no index is relevant)
+        index_fields = max(
+            (fields_names for fields_names in self._dev_indexes if set(fields_names).issubset(values)),
+            key=len,
+            default=None
+        )
+        if index_fields is None:
+            records = self._dev_get_sorted_records()
+        else:
+            records = self._dev_indexes[index_fields].get(tuple(values[k] for k in index_fields))
+            values = {k: v for k, v in values.items() if k not in index_fields}
+
+        # filter other fields
+        filter_by = None
+        if len(values) > 0:
+            def filter_by(record):
+                return all(getattr(record, k) == v for k, v in values.items())
+
+        return Queryset._dev_from_table_records(
+            self, records, filter_by=filter_by, sort=True, sorted_records=index_fields is None)
+
+    def select_range(self, field_name, lo=None, hi=None):
+        """
+        Selects records whose field value is between lo and hi (included), using the sorted index of field if any (see
+        TableMeta.sorted_indexes): O(log n + k). If field is not indexed, all records are read.
+
+        Parameters
+        ----------
+        field_name
+        lo: lower bound, default None (no bound)
+        hi: upper bound, default None (no bound)
+
+        Returns
+        -------
+        Queryset, ordered by field value (records whose value is None are never selected)
+
+        Examples
+        --------
+        table.select_range("area", 10, 20)
+        """
+        index = self._dev_get_sorted_index(field_name)
+        if index is not None:
+            records = index.range(lo, hi)
+        else:
+            get_value = operator.attrgetter(field_name)
+            records = sorted(
+                (r for r in self._dev_get_sorted_records() if
+                 not is_unordered(get_value(r)) and
+                 (lo is None or lo <= get_value(r)) and
+                 (hi is None or get_value(r) <= hi)),
+                key=get_value
+            )
+        return Queryset._dev_from_table_records(self, records, sort=False, sorted_records=False)
+
+    def order_by(self, field_name, reverse=False):
+        """
+        Uses the sorted index of field if any (see TableMeta.sorted_indexes), else records are sorted.
+
+        Parameters
+        ----------
+        field_name
+        reverse: bool, default False
+
+        Returns
+        -------
+        Queryset of all records, ordered by field value (records whose value is None are last)
+        """
+        index = self._dev_get_sorted_index(field_name)
+        if index is not None:
+            records = index.ordered(reverse=reverse)
+        else:
+            get_value = operator.attrgetter(field_name)
+            records = self._dev_get_sorted_records()
+            unordered = [r for r in records if is_unordered(get_value(r))]
+            records = sorted(
+                (r for r in records if not is_unordered(get_value(r))), key=get_value, reverse=reverse) + unordered
+        return Queryset._dev_from_table_records(self, records, sort=False, sorted_records=False)
+
+    def _dev_get_sorted_index(self, field_name):
+        """
+        Returns
+        -------
+        sorted index of field, None if field is not indexed
+        """
+        if field_name not in self._dev_schema.declared_fields:
+            raise KeyError(f"table {self._ref}: unknown field: {field_name}")
+        return self._dev_sorted_indexes.get(field_name)
+
+    def column(self, field_name, sort=True):
+        """
+        Parameters
+        ----------
+        field_name
+        sort: bool, default True
+            if False, values are returned in storage order (for columnar tables, values are then read without python
+            work per record)
+
+        Returns
+        -------
+        numpy array of records values (typed for boolean, integer and float fields without None values, object
+        array else), link values being records
+        """
+        return self._dev_get_column(field_name, list(self) if sort else None)
 
     def one(self, filter_by=None):
         if isinstance(filter_by, (str, int)):
@@ -410,7 +927,7 @@ class Table:
                 return self._records[filter_by]
             except KeyError:
                 raise RecordDoesNotExistError(self.get_ref(), filter_by)
-        return self.select(filter_by=filter_by).one()
+        return self.select(sort=False).one(filter_by)
 
     # delete
     def delete(self):
@@ -1,6 +1,11 @@
 import collections
 import json
 import logging
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
 
 from . import CONF
 
@@ -60,6 +65,30 @@ def json_data_to_json(json_data, buffer_or_path=None, indent=2):
     )
 
 
+def write_file_atomically(path, buffer_writer, is_bytes=False):
+    """
+    content is written to a temporary file of the same directory, which is then renamed: readers never see a partially
+    written file
+    """
+    dir_path, file_name = os.path.split(path)
+    temp_path = os.path.join(dir_path, f".{file_name}.{uuid.uuid4().hex}.tmp")  # not mkstemp: keep default permissions
+    try:
+        with (open(temp_path, "xb") if is_bytes else open(temp_path, "x", encoding=CONF.encoding)) as buffer:
+            buffer_writer(buffer)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def json_data_to_json_file(json_data, path, indent=2):
+    """
+    file is written atomically (see write_file_atomically)
+    """
+    write_file_atomically(path, lambda buffer: json_dump(json_data, buffer, indent=indent))
+
+
 def camel_to_lower(camel):
     """
     Parameters
@@ -78,11 +107,121 @@ def lower_to_initials(lower):
     return "".join([word[0] for word in lower.split("_")])
 
 
+# pandas json encoder writes floats in fixed notation rounded to 10 decimals, except very large or very small ones
+_DOUBLE_PRECISION = 10
+_FIXED_MAX = 1e16
+_FIXED_MIN = 1e-15
+
+
+def array_to_json_values(array):
+    """
+    Converts a numeric array to json values, identical to the ones pandas json encoder writes (floats are rounded the
+    same way, nan and inf are written as None).
+
+    Returns
+    -------
+    (nested) list of values, None if array is not numeric
+    """
+    if array.dtype.kind in "iub":
+        return array.tolist()
+    if array.dtype.kind != "f":
+        return None
+
+    # same algorithm as encoder: whole part, then fractional part rounded half to even
+    values = array.astype(np.float64)
+    finite = np.isfinite(values)
+    absolute = np.where(finite, np.abs(values), 0)
+    pow10 = 10. ** _DOUBLE_PRECISION
+    whole = np.floor(absolute)
+    tmp = (absolute - whole) * pow10
+    frac = np.floor(tmp)
+    diff = tmp - frac
+    frac += (diff > 0.5) | ((diff == 0.5) & ((frac == 0) | (frac % 2 == 1)))
+
+    # written decimal value is whole.frac, its float is obtained by an exact division while numerator is exact
+    numerator = whole * pow10 + frac
+    result = numerator / pow10
+    special = (absolute > _FIXED_MAX) | ((absolute != 0) & (absolute < _FIXED_MIN)) | (numerator >= 2 ** 53)
+    for i in zip(*np.nonzero(special)):
+        if (absolute[i] > _FIXED_MAX) or (absolute[i] < _FIXED_MIN):  # exponent notation
+            result[i] = float(f"%.{_DOUBLE_PRECISION}g" % absolute[i])
+        elif frac[i] >= pow10:  # rounding reached next whole
+            result[i] = whole[i] + 1
+        else:
+            result[i] = float(f"{int(whole[i])}.{int(frac[i]):0{_DOUBLE_PRECISION}d}")
+    result = np.where(values < 0, -result, result)
+
+    if finite.all():
+        return result.tolist()
+    result = result.astype(object)
+    result[~finite] = None
+    return result.tolist()
+
+
+def datetime_index_to_json_values(index, date_format):
+    """
+    Converts a datetime index to json values (date_unit being ms), identical to the ones pandas json encoder writes.
+
+    Returns
+    -------
+    list of values, None if index is not a datetime index without timezone and without missing values
+    """
+    if not isinstance(index, pd.DatetimeIndex) or index.tz is not None or index.hasnans:
+        return None
+    values = np.asarray(index.values, dtype="datetime64[ns]")
+    if date_format == "iso":
+        return np.datetime_as_string(values.astype("datetime64[ms]"), unit="ms").tolist()
+    if date_format == "epoch":  # truncated towards zero
+        nanoseconds = values.view("int64")
+        return (np.sign(nanoseconds) * (np.abs(nanoseconds) // 10 ** 6)).tolist()
+    return None
+
+
+def _is_json_label(label):
+    return label is None or isinstance(label, str) or type(label) in (int, bool)
+
+
+def _frame_to_split_json_data(frame, date_format):
+    """
+    Returns
+    -------
+    json data, None if frame can't be converted directly
+    """
+    if not isinstance(frame, pd.DataFrame) or len(frame.columns) == 0:
+        return None
+    if isinstance(frame.columns, pd.MultiIndex) or not all(_is_json_label(c) for c in frame.columns):
+        return None
+
+    # index
+    if isinstance(frame.index, pd.DatetimeIndex):
+        index = datetime_index_to_json_values(frame.index, date_format)
+    elif not isinstance(frame.index, pd.MultiIndex) and frame.index.dtype.kind in "iu":
+        index = frame.index.tolist()
+    else:
+        index = None
+    if index is None:
+        return None
+
+    # data (floats are encoded as doubles, other types must be homogeneous to keep their representation)
+    kinds = {dtype.kind for dtype in frame.dtypes}
+    if kinds != {"f"} and not (len(set(frame.dtypes)) == 1 and kinds <= {"i", "u", "b"}):
+        return None
+    data = array_to_json_values(frame.to_numpy())
+
+    return collections.OrderedDict([("columns", frame.columns.tolist()), ("data", data), ("index", index)])
+
+
 def frame_to_json_data(frame, orient="split", date_unit="ms", date_format="iso"):
     # manage Nones
     if frame is None:
         return None
 
+    # build json data directly if possible (numeric frames)
+    if orient == "split" and date_unit == "ms":
+        json_data = _frame_to_split_json_data(frame, date_format)
+        if json_data is not None:
+            return json_data
+
     # convert to pandas json
     json_str = frame.to_json(orient=orient, date_unit=date_unit, date_format=date_format)
 
@@ -0,0 +1,22 @@
+from omemdb import Db
+
+from tests import app_building
+
+
+class Construction(app_building.Construction):
+    class TableMeta:
+        columnar = True
+
+
+class Vertex(app_building.Vertex):
+    class TableMeta:
+        columnar = True
+
+
+class AppColumnarDb(Db):
+    models = [
+        app_building.Zone,
+        app_building.Surface,
+        Construction,
+        Vertex
+    ]
@@ -0,0 +1,34 @@
+from omemdb.packages.omarsh import Schema, fields
+from omemdb import Record, Db, LinkField
+
+
+class Zone(Record):
+    class Schema(Schema):
+        ref = fields.String(required=True)
+
+
+class Surface(Record):
+    class Schema(Schema):
+        ref = fields.String(required=True)
+        zone = LinkField("Zone", required=True)
+
+
+def _window_id(x):
+    return f"{x.surface.zone.ref}/{x.surface.ref}/{x.name}"
+
+
+class Window(Record):
+    class Schema(Schema):
+        surface = LinkField("Surface", required=True)
+        name = fields.String(required=True)
+
+    class TableMeta:
+        dynamic_id = (_window_id, ("surface", "zone"))
+
+
+class AppDynamicIdChain(Db):
+    models = [
+        Zone,
+        Surface,
+        Window
+    ]
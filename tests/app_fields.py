@@ -10,6 +10,7 @@ class CustomFieldsRecord(Record):
         time = fields.Time(allow_none=True, load_default=None)
         time_delta = fields.TimeDelta(allow_none=True, load_default=None)
         numpy_array = fields.NumpyArray(allow_none=True, load_default=None)
+        time_series = fields.TimeSeries(allow_none=True, load_default=None)
 
     class TableMeta:
         pass
@@ -0,0 +1,17 @@
+from omemdb import Db
+
+from tests import app_building
+
+
+class Surface(app_building.Surface):
+    class TableMeta:
+        indexes = ("major_zone", ("major_zone", "minor_zone"))
+
+
+class AppIndexesDb(Db):
+    models = [
+        app_building.Zone,
+        Surface,
+        app_building.Construction,
+        app_building.Vertex
+    ]
@@ -0,0 +1,17 @@
+from omemdb import Record, Db
+
+from tests import app_simple
+
+
+class Simple(Record):
+    __slots__ = ()  # compact records (no __dict__)
+
+    class Schema(app_simple.Simple.Schema):
+        pass
+
+
+class AppSlotsDb(Db):
+    models = [
+        Simple,
+        app_simple.Pointing
+    ]
@@ -0,0 +1,30 @@
+from omemdb.packages.omarsh import Schema, fields
+from omemdb import Record, Db
+
+
+class Item(Record):
+    class Schema(Schema):
+        ref = fields.String(required=True)
+
+    class TableMeta:
+        sortable = True
+
+
+def _get_sort_group(x):
+    return x.group
+
+
+class GroupedItem(Record):
+    class Schema(Schema):
+        ref = fields.String(required=True)
+        group = fields.Integer(required=True)
+
+    class TableMeta:
+        sortable = _get_sort_group
+
+
+class AppSortable(Db):
+    models = [
+        Item,
+        GroupedItem
+    ]
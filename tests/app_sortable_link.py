@@ -0,0 +1,27 @@
+from omemdb.packages.omarsh import Schema, fields
+from omemdb import Record, Db, LinkField
+
+
+class Zone(Record):
+    class Schema(Schema):
+        ref = fields.String(required=True)
+
+
+def _get_sort_group(x):
+    return x.zone.ref
+
+
+class Surface(Record):
+    class Schema(Schema):
+        ref = fields.String(required=True)
+        zone = LinkField("Zone", required=True)
+
+    class TableMeta:
+        sortable = _get_sort_group
+
+
+class AppSortableLink(Db):
+    models = [
+        Zone,
+        Surface
+    ]
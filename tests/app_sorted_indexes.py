@@ -0,0 +1,15 @@
+from omemdb import Db
+
+from tests import app_simple
+
+
+class Simple(app_simple.Simple):
+    class TableMeta:
+        sorted_indexes = ("optional_age",)
+
+
+class AppSortedIndexesDb(Db):
+    models = [
+        Simple,
+        app_simple.Pointing
+    ]
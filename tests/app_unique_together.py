@@ -0,0 +1,17 @@
+from omemdb import Db
+
+from tests import app_building
+
+
+class Vertex(app_building.Vertex):
+    class TableMeta:
+        unique = (("x", "y", "z"),)
+
+
+class AppUniqueTogetherDb(Db):
+    models = [
+        app_building.Zone,
+        app_building.Surface,
+        app_building.Construction,
+        Vertex
+    ]
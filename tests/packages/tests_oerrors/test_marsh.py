@@ -29,3 +29,36 @@ class TestMarsh(unittest.TestCase):
         data, oec = mv.validate(dict(my_float=0.5, my_string="unavailable choice"))
         self.assertEqual(1, len(oec))
         self.assertIsInstance(oec.exception_list()[0], validation_errors.InvalidChoice)
+
+    def test_lazy_root_instance(self):
+        mv = MarshValidator(MySchema)
+        calls = []
+
+        def get_root_instance():
+            calls.append(None)
+            return "/my_root"
+
+        # correct data: instance is not computed
+        mv.validate(dict(my_float=0.5), root_instance=get_root_instance)
+        self.assertEqual(0, len(calls))
+
+        # bad data
+        data, oec = mv.validate(dict(my_float=1.5), root_instance=get_root_instance)
+        self.assertEqual(1, len(calls))
+        self.assertEqual("/my_root/my_float", oec.exception_list()[0].instance)
+
+    def test_error_message_conversion(self):
+        # exact message
+        self.assertIs(
+            validation_errors.InvalidString,
+            MarshValidator._get_marsh_error_message(fields.String.default_error_messages["invalid"])
+        )
+
+        # message with dynamic content
+        self.assertIs(
+            validation_errors.MinLengthNotReached,
+            MarshValidator._get_marsh_error_message(validate.Length.message_min.format(min=3))
+        )
+
+        # unknown message
+        self.assertIsNone(MarshValidator._get_marsh_error_message("unknown message"))
@@ -1,8 +1,16 @@
 import unittest
 import datetime as dt
+import io
+import json
+import os
+import tempfile
 import numpy as np
+import pandas as pd
+from marshmallow import ValidationError
 from omemdb.packages.oerrors.oexception_collection import OExceptionCollection
 from omemdb.packages.omarsh import fields
+from omemdb.packages.omarsh.ofields import make_generic
+from omemdb import frame_to_json_data
 
 from tests.app_fields import AppFields
 
@@ -27,6 +35,108 @@ class TestFields(unittest.TestCase):
             self.assertIsInstance(custom_fields_record.numpy_array, np.ndarray)
             self.assertTrue(np.array_equal(custom_fields_record.numpy_array, np.array([[1, 2, 3], [4, 5, 6]])))
 
+    def test_binary_export(self):
+        db = AppFields()
+        index = pd.date_range("2012-01-01", periods=5, freq="h")
+        db.custom_fields_record.batch_add([
+            dict(pk=0, numpy_array=np.array([[1, 2, 3], [4, 5, 6]]), time_series=pd.Series(range(5), index=index)),
+            dict(pk=1, numpy_array=np.array([1.5, 2.5]), time_series=pd.Series(range(3), index=index[:3], name="s")),
+            dict(pk=2, numpy_array=np.array(["a", "b"], dtype=object)),  # stored as json data
+            dict(pk=3)
+        ])
+        buffer = io.BytesIO()
+        db.to_binary(buffer)
+        buffer.seek(0)
+        db2 = AppFields.from_binary(buffer)
+        self.assertEqual(db, db2)
+
+        r0, r1 = db2.custom_fields_record.one(0), db2.custom_fields_record.one(1)
+        self.assertTrue(np.array_equal(np.array([[1, 2, 3], [4, 5, 6]]), r0.numpy_array))
+        self.assertFalse(r0.numpy_array.flags.writeable)
+        pd.testing.assert_series_equal(db.custom_fields_record.one(1).time_series, r1.time_series, check_freq=False)
+        self.assertEqual(["a", "b"], db2.custom_fields_record.one(2).numpy_array.tolist())
+        self.assertIsNone(db2.custom_fields_record.one(3).time_series)
+
+        # memory-mapped blocks
+        with tempfile.TemporaryDirectory() as dir_path:
+            path = os.path.join(dir_path, "db.omemdb")
+            db.to_binary(path)
+            db2 = AppFields.from_binary(path, mmap=True)
+            self.assertEqual(db, db2)
+            r0, r1 = db2.custom_fields_record.one(0), db2.custom_fields_record.one(1)
+            self.assertIsInstance(r0.numpy_array, np.memmap)
+            self.assertFalse(r0.numpy_array.flags.writeable)
+            self.assertFalse(r1.time_series.values.flags.writeable)
+            del db2, r0, r1  # release mapped file
+
+    def test_time_series_field(self):
+        index = pd.date_range("2013-02-27", periods=100, freq="7h")
+        series = pd.Series(np.arange(100) / 4, index=index, name="s")
+        for date_format in ("iso", "epoch"):
+            for generic in (None, "year", "day"):
+                field = fields.TimeSeries(date_format=date_format, generic=generic)
+                deserialized = field.deserialize(field._serialize(series, None, None))
+                expected_index = index if generic is None else \
+                    pd.DatetimeIndex([make_generic(generic, x) for x in index])
+                self.assertTrue(expected_index.equals(deserialized.index))
+                self.assertTrue(np.array_equal(series.values, deserialized.values))
+                self.assertEqual("s", deserialized.name)
+                self.assertFalse(deserialized.values.flags.writeable)
+
+        # index may contain datetimes
+        field = fields.TimeSeries(date_format="epoch")
+        deserialized = field.deserialize(dict(data=[1, 2], index=[dt.datetime(2012, 1, 1), 1325379600000], name=None))
+        self.assertEqual([dt.datetime(2012, 1, 1), dt.datetime(2012, 1, 1, 1)], list(deserialized.index))
+
+        # invalid indexes are reported
+        for date_format, index in (("iso", ["not a date"]), ("epoch", ["not a date"])):
+            with self.assertRaises(ValidationError) as cm:
+                fields.TimeSeries(date_format=date_format).deserialize(dict(data=[1], index=index, name=None))
+            self.assertEqual(["Does not have a datetime index."], cm.exception.messages)
+        with self.assertRaises(ValidationError) as cm:
+            field.deserialize([1, 2])
+        self.assertEqual(["Is not a pandas series."], cm.exception.messages)
+
+        # nanosecond iso strings are parsed, empty indexes are datetime indexes
+        field = fields.TimeSeries(date_format="iso")
+        deserialized = field.deserialize(dict(data=[1], index=["2012-01-01T00:00:00.000000001"], name=None))
+        self.assertEqual(1, deserialized.index[0].nanosecond)
+        self.assertEqual("datetime64[ns]", field.deserialize(dict(data=[], index=[], name=None)).index.dtype)
+
+    def test_direct_serialization(self):
+        # json data is identical to pandas one
+        index = pd.DatetimeIndex(["1969-12-31 23:59:59.9996", "2012-01-01 01:00"]).append(
+            pd.date_range("2013-01-01", periods=5, freq="7h"))
+        data = [1 / 3, np.nan, -2.5e-10, 1e-16, 1.5e16, 123456789012345.678, 1e10 + 0.99999999999]
+        for values in (np.array(data), np.arange(7), np.array(data, dtype="float32")):
+            series = pd.Series(values, index=index, name="s")
+            for date_format in ("iso", "epoch"):
+                expected = json.loads(series.to_json(orient="split", date_unit="ms", date_format=date_format))
+                serialized = fields.TimeSeries(date_format=date_format)._serialize(series, None, None)
+                self.assertEqual(["data", "index", "name"], list(serialized))
+                self.assertEqual(json.dumps(expected, sort_keys=True), json.dumps(serialized))
+            frame = pd.DataFrame({"a": values, "b": values[::-1]})
+            expected = json.loads(frame.to_json(orient="split", date_unit="ms", date_format="iso"))
+            self.assertEqual(json.dumps(expected, sort_keys=True), json.dumps(frame_to_json_data(frame)))
+
+        # base64 encoding
+        series = pd.Series(np.arange(10) / 3, index=pd.date_range("2012-01-01", periods=10, freq="h"), name="s")
+        field = fields.TimeSeries(encoding="base64", generic="year")
+        serialized = field._serialize(series, None, None)
+        self.assertIsInstance(serialized["data"], str)
+        deserialized = field.deserialize(json.loads(json.dumps(serialized)))
+        pd.testing.assert_series_equal(series, deserialized, check_freq=False)
+        self.assertFalse(deserialized.values.flags.writeable)
+        with self.assertRaises(ValidationError):
+            field.deserialize(dict(serialized, data="#"))
+
+        array = np.array([[1.5, 2], [3, 4]], dtype="float32")
+        field = fields.NumpyArray(encoding="base64")
+        deserialized = field.deserialize(json.loads(json.dumps(field._serialize(array, None, None))))
+        self.assertEqual(np.dtype("float32"), deserialized.dtype)
+        self.assertTrue(np.array_equal(array, deserialized))
+        self.assertEqual(["a"], field._serialize(np.array(["a"], dtype=object), None, None))  # not encoded
+
     def test_ref_field(self):
         db = AppFields()
 
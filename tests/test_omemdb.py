@@ -1,19 +1,33 @@
 import unittest
 import tempfile
 import os
+import io
+import json
 
-from omemdb import TableDefinitionError, RecordDoesNotExistError, \
+from omemdb import Record, Db, LinkField, TableDefinitionError, RecordDoesNotExistError, \
     MultipleRecordsReturnedError
+from omemdb.packages.omarsh import Schema, fields
 from omemdb.packages.oerrors import OExceptionCollection, ValidationError
+from omemdb.json_stream import JsonObjectStream, materialize
+from omemdb.queryset import Queryset
+from omemdb.marsh_validator import OmemdbMarshValidator
 
 from tests.app_simple import AppSimpleDb
+from tests.app_slots import AppSlotsDb
 from tests.app_err import AppErrDb
 from tests.app_building import AppBuildingDb
-from tests.app_dynamic_id import AppDynamicId
+from tests.app_dynamic_id import AppDynamicId, Base
+from tests.app_dynamic_id_chain import AppDynamicIdChain
+from tests.app_sortable import AppSortable
+from tests.app_sortable_link import AppSortableLink
+from tests.app_unique_together import AppUniqueTogetherDb
+from tests.app_columnar import AppColumnarDb
+from tests.app_indexes import AppIndexesDb
+from tests.app_sorted_indexes import AppSortedIndexesDb
 
 
-def building_standard_populate():
-    db = AppBuildingDb()
+def building_standard_populate(db_cls=AppBuildingDb):
+    db = db_cls()
 
     # populate
     for c_i in range(3):
@@ -151,6 +165,35 @@ class OmemdbTest(unittest.TestCase):
             lambda x: x.ref[0] == "s"
         )
 
+    def test_error_instances(self):
+        # validators are built once per table
+        built = []
+
+        class CountingMarshValidator(OmemdbMarshValidator):
+            def __init__(self, *args, **kwargs):
+                built.append(self)
+                super().__init__(*args, **kwargs)
+
+        class CountingDb(AppSimpleDb):
+            marsh_validator_cls = CountingMarshValidator
+
+        db = CountingDb()
+        self.assertEqual(2, len(built))  # simple and pointing
+        db.simple.batch_add([dict(ref=f"s{i}", age=i) for i in range(10)])
+        db.simple.one("s3").age = 30
+
+        # errors report the instance of the invalid record (computed when the error is reported)
+        with self.assertRaises(OExceptionCollection) as cm:
+            db.simple.batch_add([dict(ref="a", age=0), dict(ref="b", age=1), dict(ref="c", age="x")])
+        self.assertEqual(["/simple/c/age"], [e.instance for e in cm.exception])
+        with self.assertRaises(OExceptionCollection) as cm:
+            db.simple.one("s7").age = "x"
+        self.assertEqual(["/simple/s7/age"], [e.instance for e in cm.exception])
+        with self.assertRaises(OExceptionCollection) as cm:
+            db.pointing.add(pk=5, simple="unknown")
+        self.assertEqual(["/pointing/5/simple"], [e.instance for e in cm.exception])
+        self.assertEqual(2, len(built))
+
     def test_links(self):
         # create db and populate
         db = building_standard_populate()
@@ -202,7 +245,7 @@ class OmemdbTest(unittest.TestCase):
         s02 = db.surface.one("s02")
 
         # check link is in db and is activated
-        link = s02._data["major_zone"]
+        link = s02._dev_get_raw_value("major_zone")
         self.assertIn(link, db._dev_relations_manager)
         self.assertIsNotNone(link.source_record)
         self.assertIsNotNone(link.target_record)
@@ -271,12 +314,440 @@ class OmemdbTest(unittest.TestCase):
             db2 = AppBuildingDb.from_json(mono_path)
             self.assertEqual(db, db2)
 
+            # mono, bulk load
+            db2 = AppBuildingDb.from_json(mono_path, bulk_load=True)
+            self.assertEqual(db, db2)
+
+            # mono, stream
+            db2 = AppBuildingDb.from_json(mono_path, stream=True)
+            self.assertEqual(db, db2)
+            db2 = AppBuildingDb.from_json(mono_path, stream=True, bulk_load=True)
+            self.assertEqual(db, db2)
+
+            # binary
+            binary_path = os.path.join(dir_path, "db.omemdb")
+            db.to_binary(binary_path)
+            db2 = AppBuildingDb.from_binary(binary_path)
+            self.assertEqual(db, db2)
+            db2 = AppBuildingDb.from_binary(binary_path, bulk_load=True)
+            self.assertEqual(db, db2)
+
             # multi
             multi_path = os.path.join(dir_path, "multi")
             db.to_json(multi_path, multi_files=True)
             db2 = AppBuildingDb.from_json(multi_path)
             self.assertEqual(db, db2)
 
+            # multi, concurrent
+            db2 = AppBuildingDb.from_json(multi_path, max_workers=2)
+            self.assertEqual(db, db2)
+            db2 = AppBuildingDb.from_json(multi_path, max_workers=2, use_processes=True)
+            self.assertEqual(db, db2)
+
+            # multi, concurrent export (no temporary files remain)
+            for use_processes in (False, True):
+                multi_path = os.path.join(dir_path, f"multi_concurrent_{use_processes}")
+                db.to_json(multi_path, multi_files=True, max_workers=2, use_processes=use_processes)
+                self.assertEqual(
+                    sorted(os.listdir(multi_path)),
+                    sorted(["__admin__.json"] + [f"{ref}.json" for ref in db.get_table_refs()])
+                )
+                db2 = AppBuildingDb.from_json(multi_path)
+                self.assertEqual(db, db2)
+
+    def test_incremental_export(self):
+        db = building_standard_populate()
+
+        with tempfile.TemporaryDirectory() as dir_path:
+            def get_written_tables(**kwargs):
+                # files are replaced when they are written
+                paths = {ref: os.path.join(dir_path, f"{ref}.json") for ref in db.get_table_refs()}
+                inodes = {ref: os.stat(path).st_ino if os.path.exists(path) else None for ref, path in paths.items()}
+                db.to_json(dir_path, multi_files=True, incremental=True, **kwargs)
+                self.assertEqual(db, AppBuildingDb.from_json(dir_path))
+                return {ref for ref, path in paths.items() if os.stat(path).st_ino != inodes[ref]}
+
+            # first export
+            self.assertEqual({"construction", "zone", "surface", "vertex"}, get_written_tables())
+
+            # no modification
+            self.assertEqual(set(), get_written_tables())
+
+            # pk update (exported links of pointing records are modified)
+            db.zone.one("z1").ref = "new_z1"
+            self.assertEqual({"zone", "surface"}, get_written_tables())
+
+            # deletion (pointing records are modified)
+            db.construction.one("c0").delete()
+            self.assertEqual({"construction", "surface"}, get_written_tables(max_workers=2))
+
+            # add
+            db.construction.add(ref="c3")
+            self.assertEqual({"construction"}, get_written_tables())
+
+            # loaded db only writes modified tables
+            db = AppBuildingDb.from_json(dir_path)
+            db.zone.one("z0").ref = "new_z0"
+            self.assertEqual({"zone", "surface"}, get_written_tables())
+
+            # export to another dir does not change snapshot, full export neither
+            db.to_json(os.path.join(dir_path, "other"), multi_files=True)
+            db.to_json(dir_path, multi_files=True)
+            self.assertEqual(set(), get_written_tables())
+
+        # dynamic ids that depend on a field of pointed record: ids of table are modified
+        class Dyn(Record):
+            class Schema(Schema):
+                base = LinkField("Base", required=True)
+                weak_ref = fields.String(required=True)
+
+            class TableMeta:
+                dynamic_id = lambda x: f"{x.base.age}/{x.weak_ref}"
+
+        class AppDyn(Db):
+            models = [Base, Dyn]
+
+        db = AppDyn()
+        db.base.add(ref="b", age=1)
+        db.dyn.add(base="b", weak_ref="w")
+        with tempfile.TemporaryDirectory() as dir_path:
+            db.to_json(dir_path, multi_files=True, incremental=True)
+            db.base.one("b").age = 2
+            db.to_json(dir_path, multi_files=True, incremental=True)
+            with open(os.path.join(dir_path, "dyn.json")) as f:
+                self.assertEqual(["2/w"], [d["id"] for d in json.load(f)])  # ids are exported (not loaded)
+
+        # dynamic ids that depend on a record through another table
+        db = AppDynamicIdChain()
+        db.zone.add(ref="z")
+        db.surface.add(ref="s", zone="z")
+        db.window.add(surface="s", name="w")
+        with tempfile.TemporaryDirectory() as dir_path:
+            db.to_json(dir_path, multi_files=True, incremental=True)
+            db.zone.one("z").ref = "y"
+            db.to_json(dir_path, multi_files=True, incremental=True)
+            with open(os.path.join(dir_path, "window.json")) as f:
+                self.assertEqual(["y/s/w"], [d["id"] for d in json.load(f)])
+
+        # sort indexes renumbered on load are exported
+        with tempfile.TemporaryDirectory() as dir_path:
+            item_path = os.path.join(dir_path, "item.json")
+            AppSortable().to_json(dir_path, multi_files=True)
+            with open(item_path, "w") as f:
+                json.dump([dict(ref=f"i{i}", sort_index=10 * i) for i in range(3)], f)
+            db = AppSortable.from_json(dir_path)
+            db.to_json(dir_path, multi_files=True, incremental=True)
+            with open(item_path) as f:
+                self.assertEqual([0, 1, 2], [d["sort_index"] for d in json.load(f)])
+            self.assertEqual(db.item.to_json_data(), json.loads(db.to_json(multi_files=False))["item"])
+
+    def test_journal(self):
+        with tempfile.TemporaryDirectory() as dir_path:
+            snapshot_path = os.path.join(dir_path, "snapshot.json")
+            journal_path = os.path.join(dir_path, "journal.jsonl")
+
+            def restore(db_cls, resume=False):
+                restored_db = db_cls.from_json(snapshot_path, journal_path=journal_path)
+                if not resume:
+                    restored_db.stop_journal()
+                return restored_db
+
+            # operations are replayed on snapshot
+            db = building_standard_populate()
+            db.start_journal(snapshot_path, journal_path, fsync=False)
+            db.zone.add(ref="z3")
+            db.zone.one("z1").ref = "new_z1"
+            db.construction.one("c0").delete()
+            db.surface.select(lambda x: x.major_zone.ref == "z0").delete()
+            db.surface.select().bulk_update(ref=lambda x: x.ref + "_new", minor_zone=lambda x: "z3")
+            with db.batch():
+                db.zone.add(ref="z5")
+                db.zone.one("z3").ref = "z6"
+                db.zone.one("z5").ref = "z3"
+            with self.assertRaises(KeyError):  # rolled back: not journaled
+                with db.batch():
+                    db.zone.add(ref="z7")
+                    db.zone.one("z7").ref = "z8"
+                    raise KeyError("z8")
+            db.stop_journal()
+            restored_db = restore(AppBuildingDb)
+            self.assertEqual(db, restored_db)
+
+            # incomplete last entry (crash) is ignored and removed, journaling is resumed
+            with open(journal_path, "a") as f:
+                f.write('{"operation": "add", "table": "zone", "da')
+            db = restore(AppBuildingDb, resume=True)
+            self.assertEqual(restored_db, db)
+            db.zone.add(ref="z4")
+            db.stop_journal()
+            self.assertEqual(db, restore(AppBuildingDb))
+
+            # compaction
+            self.assertRaises(RuntimeError, db.compact_journal)
+            db.start_journal(snapshot_path, journal_path, fsync=False, compact_every=2)
+            for i in range(5):
+                db.construction.add(ref=f"new_c{i}")
+            with open(journal_path) as f:
+                self.assertEqual(3, len(f.readlines()))  # header and two entries (compacted on third add)
+            self.assertEqual(db, restore(AppBuildingDb))
+            db.compact_journal()
+            with open(journal_path) as f:
+                self.assertEqual(1, len(f.readlines()))
+            db.stop_journal()
+            self.assertEqual(db, restore(AppBuildingDb))
+
+            # sortable: requested positions are replayed
+            db = AppSortable()
+            db.start_journal(snapshot_path, journal_path, fsync=False)
+            db.item.batch_add([dict(ref=f"i{i}") for i in range(5)])
+            db.item.batch_add([dict(ref="a", sort_index=1), dict(ref="b", sort_index=1), dict(ref="c")])
+            db.item.one("i0").sort_index = 2
+            db.item.one("i4").sort_index = 0
+            db.item.one("a").delete()
+            db.grouped_item.batch_add([dict(ref=f"g{i}", group=i % 2) for i in range(6)])
+            db.grouped_item.one("g2").update(group=1, sort_index=0)
+            db.item.select(lambda x: x.ref in ("i1", "i2")).bulk_update(sort_index=[5, 0])
+            db.stop_journal()
+            self.assertEqual(db, restore(AppSortable))
+
+    def test_json_stream(self):
+        json_data = dict(
+            __version__="1.0.0",
+            table_a=[dict(ref="a", value=-1.5e-3, values=[1, [2, {}]]), dict(ref="b", value=None)],
+            table_b=[],
+            other=dict(value=True)
+        )
+        for indent in (None, 2):
+            content = json.dumps(json_data, indent=indent)
+            for chunk_size in (1, 5, 1000):
+                stream = JsonObjectStream(io.StringIO(content), chunk_size=chunk_size)
+                self.assertEqual(json_data, {k: materialize(v) for k, v in stream.items()})
+
+        # array generators that are not consumed are skipped
+        items = JsonObjectStream(io.StringIO(json.dumps(json_data)), chunk_size=3).items()
+        self.assertEqual(["__version__", "table_a", "table_b", "other"], [k for k, v in items])
+
+    def test_bulk_load_errors(self):
+        json_data = building_standard_populate().to_json_data()
+        json_data["zone"].append(dict(ref=3))
+        json_data["surface"].append(dict(ref="s_new", major_zone="unknown"))
+
+        # errors must be the same as with record by record loading
+        instances = []
+        for bulk_load in (False, True):
+            with self.assertRaises(OExceptionCollection) as cm:
+                AppBuildingDb(json_data, bulk_load=bulk_load)
+            instances.append(sorted(e.instance for e in cm.exception))
+        self.assertEqual(["/zone/3/ref"], instances[0])
+        self.assertEqual(instances[0], instances[1])
+
+        # missing link targets (links are registered at once, then record by record to report errors)
+        json_data["zone"].pop()
+        instances = []
+        for bulk_load in (False, True):
+            with self.assertRaises(OExceptionCollection) as cm:
+                AppBuildingDb(json_data, bulk_load=bulk_load)
+            instances.append(sorted(e.instance for e in cm.exception))
+        self.assertEqual(["/surface/s_new/major_zone"], instances[0])
+        self.assertEqual(instances[0], instances[1])
+
+    def test_compact_records(self):
+        db = AppSlotsDb()
+        db.simple.add(ref="s0", age=1)
+        db.pointing.add(pk=0, simple="s0")
+        s0, p0 = db.simple.one("s0"), db.pointing.one(0)
+
+        # data is stored in rows, records of slotted classes have no __dict__
+        self.assertFalse(hasattr(s0, "__dict__"))
+        self.assertEqual(["s0", 1, None], s0._row)
+        self.assertEqual(dict(ref="s0", age=1, optional_age=None), s0._dev_get_data())
+        self.assertIn("age", dir(s0))
+
+        # public api is unchanged
+        s0.age = 2
+        self.assertEqual(2, db.simple.one("s0").age)
+        self.assertIs(s0, p0.simple)
+        self.assertEqual(dict(id="0", pk=0, simple="s0"), p0.to_json_data())
+        with self.assertRaises(AttributeError):
+            s0.unknown_field
+        with self.assertRaises(AttributeError):  # no __dict__
+            s0.unknown_field = 1
+        p0.custom_attribute = 1  # not a field, stored in __dict__ of non slotted classes
+        self.assertEqual(1, p0.custom_attribute)
+
+    def test_columnar(self):
+        db = building_standard_populate(AppColumnarDb)
+        db.vertex.batch_add([dict(pk=i, x=i, y=-i, z=0) for i in (2, 0, 1)])
+        self.assertEqual(
+            [(0, 0, 0, 0), (1, 1, -1, 0), (2, 2, -2, 0)],
+            [(v.pk, v.x, v.y, v.z) for v in db.vertex]
+        )
+
+        # columns
+        x = db.vertex.column("x")
+        self.assertEqual("int64", x.dtype)
+        self.assertEqual([0, 1, 2], x.tolist())
+        self.assertEqual([2, 0, 1], db.vertex.column("x", sort=False).tolist())  # storage order
+        self.assertEqual(["c0", "c1", "c2"], db.construction.column("ref").tolist())
+        self.assertEqual(["z0", "z0", "z0"], [z.ref for z in db.surface.column("major_zone")[:3]])  # not columnar
+
+        # updates and deletions (row ids are reused)
+        db.vertex.one(0).update(x=10)
+        db.vertex.one(1).delete()
+        db.vertex.add(pk=3, x=3, y=3, z=3)
+        self.assertEqual([10, 2, 3], db.vertex.column("x").tolist())
+        self.assertEqual(9, len(db.construction.one("c0").get_pointing_records().surface))  # links to columnar records
+
+        # export and load
+        db2 = AppColumnarDb(db.to_json_data())
+        self.assertEqual(db, db2)
+        self.assertEqual([10, 2, 3], db2.vertex.column("x").tolist())
+
+    def test_values_and_bulk_update(self):
+        db = building_standard_populate(AppUniqueTogetherDb)
+        db.vertex.batch_add([dict(pk=i, x=i, y=0, z=0) for i in range(3)])
+
+        # values
+        surfaces = db.surface.select(lambda x: x.major_zone.ref == "z1")
+        self.assertEqual(["s10", "s11", "s12"], surfaces.values("ref").tolist())
+        df = db.vertex.select().values("x", "y")
+        self.assertEqual(["x", "y"], list(df.columns))
+        self.assertEqual([0, 1, 2], df.index.tolist())
+        self.assertEqual("int64", df["x"].dtype)
+        self.assertEqual([0, 0, 0], df["y"].tolist())
+        self.assertEqual(["pk", "x", "y", "z"], list(db.vertex.select().values().columns))
+
+        # bulk update: values may be swapped (uniqueness is checked once), post save is called once per record
+        vertices = db.vertex.select()
+        vertices.bulk_update(x=vertices.values("x")[::-1])
+        self.assertEqual([2, 1, 0], db.vertex.column("x").tolist())
+        counters = [s._post_save_counter for s in surfaces]
+        surfaces.bulk_update(ref=["a", "b", "c"], minor_zone=lambda x: db.zone.one("z0"))
+        self.assertEqual(["a", "b", "c"], [s.ref for s in surfaces])
+        self.assertEqual([db.zone.one("z0")] * 3, [s.minor_zone for s in surfaces])
+        self.assertEqual([c + 1 for c in counters], [s._post_save_counter for s in surfaces])
+
+        # errors: no record is modified
+        with self.assertRaises(OExceptionCollection) as cm:
+            surfaces.bulk_update(ref=["d", 1, 2])
+        self.assertEqual({"/surface/b/ref", "/surface/c/ref"}, {e.instance for e in cm.exception})
+        self.assertEqual(["a", "b", "c"], [s.ref for s in surfaces])
+        with self.assertRaises(ValueError):
+            surfaces.bulk_update(ref=["d"])
+
+        # sortable
+        db = AppSortable()
+        db.item.batch_add([dict(ref=f"i{i}") for i in range(5)])
+        db.item.select(lambda x: x.ref in ("i0", "i1")).bulk_update(sort_index=[4, 4])
+        self.assertEqual(["i2", "i3", "i4", "i0", "i1"], [r.ref for r in db.item])  # same as successive updates
+
+    def test_batch(self):
+        db = building_standard_populate(AppUniqueTogetherDb)
+        db.vertex.batch_add([dict(pk=i, x=i, y=0, z=0) for i in range(3)])
+
+        # uniqueness is checked at the end of batch (values may be swapped), post save is called once per record
+        s00 = db.surface.one("s00")
+        counter = s00._post_save_counter
+        with db.batch():
+            db.vertex.one(0).x = 2
+            db.vertex.one(2).x = 0
+            s00.ref = "s00_a"
+            s00.update(minor_zone=None)
+            self.assertEqual(counter, s00._post_save_counter)
+            s_new = db.surface.add(ref="s_new", major_zone="z0")
+            db.surface.one("s01").delete()
+        self.assertEqual([2, 1, 0], db.vertex.column("x").tolist())
+        self.assertEqual(counter + 1, s00._post_save_counter)
+        self.assertEqual(1, s_new._post_save_counter)
+        self.assertEqual(["s00_a", "s_new"], [s.ref for s in db.surface if s.ref.startswith(("s00", "s01", "s_"))])
+
+        # rollback: uniqueness error (records are restored in place)
+        json_data = db.to_json_data()
+        with self.assertRaises(OExceptionCollection):
+            with db.batch():
+                db.zone.add(ref="z4")
+                db.vertex.one(0).x = 1
+        self.assertEqual(json_data, db.to_json_data())
+        self.assertIs(s00, db.surface.one("s00_a"))
+        self.assertEqual(db.zone.one("z0"), s00.major_zone)
+
+        # rollback: error raised in batch
+        z0, s10 = db.zone.one("z0"), db.surface.one("s10")
+        pointing = list(z0.get_pointing_records().surface)
+        links_nb = len(db._dev_relations_manager)
+        with self.assertRaises(KeyError):
+            with db.batch():
+                z0.delete()  # surfaces pointing on zone are modified or deleted
+                with db.batch():  # nested
+                    db.construction.add(ref="c3")
+                    s10.update(ref="s10_a", minor_zone=db.zone.one("z2"))
+                raise KeyError("z0")
+        self.assertEqual(json_data, db.to_json_data())
+        self.assertIs(z0, db.zone.one("z0"))
+        self.assertIs(z0, s00.major_zone)
+        self.assertIs(s10, db.surface.one("s10"))
+        self.assertEqual(pointing, list(z0.get_pointing_records().surface))
+        self.assertEqual(links_nb, len(db._dev_relations_manager))
+
+        # sortable
+        db = AppSortable()
+        db.item.batch_add([dict(ref=f"i{i}") for i in range(5)])
+        with db.batch():
+            db.item.one("i0").sort_index = 4
+            db.item.one("i1").sort_index = 4
+            db.item.add(ref="a", sort_index=0)
+        self.assertEqual(["a", "i2", "i3", "i4", "i0", "i1"], [r.ref for r in db.item])
+        self.assertEqual(list(range(6)), [r.sort_index for r in db.item])
+
+    def test_batch_rollback_held_records(self):
+        db = AppSimpleDb()
+        db.simple.batch_add([dict(ref=f"r{i}", age=i) for i in range(3)])
+        db.pointing.add(pk=0, simple="r1")
+
+        # records retrieved before a failed batch remain valid (pks may be swapped)
+        held = db.simple.one("r0")
+        r1 = db.simple.one("r1")
+        with self.assertRaises(KeyError):
+            with db.batch():
+                r1.update(ref="r_tmp", age=10)
+                held.ref = "r1"
+                db.simple.one("r2").delete()
+                db.simple.add(ref="r2", age=20)
+                raise KeyError("r2")
+        self.assertEqual(["r0", "r1", "r2"], [r.ref for r in db.simple])
+        self.assertEqual((0, 1), (held.age, r1.age))
+        self.assertIs(held, db.simple.one("r0"))
+        self.assertIs(r1, db.simple.one("r1"))
+        self.assertIs(r1, db.pointing.one(0).simple)
+        self.assertEqual([2], [r.age for r in db.simple.select_by(ref="r2")])
+        held.update(age=5)  # records are usable
+        self.assertEqual(5, db.simple.one("r0").age)
+
+        # sortable
+        db = AppSortable()
+        db.grouped_item.batch_add([dict(ref=f"i{i}", group=i % 2) for i in range(6)])
+        items = list(db.grouped_item)
+        with self.assertRaises(KeyError):
+            with db.batch():
+                items[0].sort_index = 2
+                items[1].update(group=0)
+                items[2].delete()
+                db.grouped_item.add(ref="a", group=1, sort_index=0)
+                raise KeyError("a")
+        self.assertEqual(items, list(db.grouped_item))
+        self.assertEqual([0, 1, 2, 0, 1, 2], [r.sort_index for r in items])
+        self.assertEqual([0, 0, 0, 1, 1, 1], [r.group for r in items])
+
+        # dynamic ids
+        db = AppDynamicId()
+        db.base.add(ref="b1", age=15)
+        d = db.dynamic_id.add(base="b1", weak_ref="d")
+        with self.assertRaises(KeyError):
+            with db.batch():
+                db.base.one("b1").ref = "b2"
+                raise KeyError("b2")
+        self.assertIs(d, db.dynamic_id.one("b1/d"))
+
     def test_dynamic_id(self):
 
         db1 = AppDynamicId()
@@ -294,6 +765,318 @@ class OmemdbTest(unittest.TestCase):
         self.assertDictEqual(db1.to_json_data(), db2.to_json_data())
         self.assertEqual(db1, db2)
 
+    def test_dynamic_id_lookup(self):
+        db = AppDynamicId()
+        db.base.add(ref="b1", age=15)
+        db.base.add(ref="b2", age=15)
+        d = db.dynamic_id.add(base="b1", weak_ref="d")
+        self.assertIs(d, db.dynamic_id.one("b1/d"))
+
+        # update record field
+        d.weak_ref = "e"
+        self.assertIs(d, db.dynamic_id.one("b1/e"))
+        self.assertRaises(RecordDoesNotExistError, db.dynamic_id.one, "b1/d")
+
+        # update field of pointed record
+        db.base.one("b1").ref = "b1_new"
+        self.assertIs(d, db.dynamic_id.one("b1_new/e"))
+        self.assertRaises(RecordDoesNotExistError, db.dynamic_id.one, "b1/e")
+
+        # change link
+        d.base = "b2"
+        self.assertIs(d, db.dynamic_id.one("b2/e"))
+
+        # delete
+        d.delete()
+        self.assertRaises(RecordDoesNotExistError, db.dynamic_id.one, "b2/e")
+
+    def test_dynamic_id_lookup_chain(self):
+        # window id depends on zone through surface
+        db = AppDynamicIdChain()
+        db.zone.batch_add([dict(ref="z"), dict(ref="y")])
+        db.surface.add(ref="s", zone="z")
+        w = db.window.add(surface="s", name="w")
+        self.assertIs(w, db.window.one("z/s/w"))
+
+        # update record pointed by pointed record
+        db.zone.one("z").update(ref="Z")
+        self.assertIs(w, db.window.one("Z/s/w"))
+        self.assertRaises(RecordDoesNotExistError, db.window.one, "z/s/w")
+
+        # change link of pointed record
+        db.surface.one("s").zone = "y"
+        self.assertIs(w, db.window.one("y/s/w"))
+        db.zone.one("Z").ref = "x"
+        self.assertIs(w, db.window.one("y/s/w"))
+
+    def test_sorted_view(self):
+        # sorted view is cached until table is modified
+        db = building_standard_populate()
+        sorted_zones = db.zone._dev_get_sorted_records()
+        self.assertIs(sorted_zones, db.zone._dev_get_sorted_records())
+        self.assertEqual(["z0", "z1", "z2"], [z.ref for z in db.zone])
+        db.zone.one("z0").ref = "z9"
+        db.zone.add(ref="z5")
+        self.assertEqual(["z1", "z2", "z5", "z9"], [z.ref for z in db.zone])
+        self.assertEqual(["z2", "z5"], [z.ref for z in db.zone[1:3]])
+        self.assertEqual("z9", db.zone[-1].ref)
+        self.assertEqual(3, db.zone.one("z9").get_index())
+        db.zone.one("z5").delete()
+        self.assertEqual(["z1", "z2", "z9"], [z.ref for z in db.zone.select()])
+
+        # querysets are sorted by table sort keys
+        surfaces = [db.surface.one(ref) for ref in ("s22", "s02", "s10")]
+        self.assertEqual(["s02", "s10", "s22"], [s.ref for s in db.surface.select().select(lambda x: x in surfaces)])
+        pointing_surfaces = db.construction.one("c0").get_pointing_records().surface
+        self.assertEqual(["s02", "s10", "s22"], [s.ref for s in pointing_surfaces if s in surfaces])
+
+        # dynamic ids: order is refreshed when a record they depend on is modified
+        db = AppDynamicId()
+        db.base.batch_add([dict(ref="b1", age=1), dict(ref="b2", age=2)])
+        db.dynamic_id.batch_add([dict(base="b1", weak_ref="d"), dict(base="b2", weak_ref="d")])
+        self.assertEqual(["b1/d", "b2/d"], [d.id for d in db.dynamic_id])
+        db.base.one("b1").ref = "b3"
+        self.assertEqual(["b2/d", "b3/d"], [d.id for d in db.dynamic_id])
+
+        # sortable
+        db = AppSortable()
+        db.item.batch_add([dict(ref=f"i{i}") for i in range(5)])
+        self.assertEqual(["i0", "i1", "i2", "i3", "i4"], [r.ref for r in db.item])
+        db.item.one("i0").sort_index = 4
+        self.assertEqual(["i1", "i2", "i3", "i4", "i0"], [r.ref for r in db.item])
+        self.assertEqual(["i4", "i0"], [r.ref for r in db.item.select(lambda x: x.ref in ("i0", "i4"))])
+        self.assertEqual(["i3", "i0"], [r.ref for r in db.item.select(sort=False).select(
+            lambda x: x.ref in ("i0", "i3"))])
+
+    def test_lazy_queryset(self):
+        db = AppBuildingDb()
+        db.zone.batch_add([dict(ref=f"z{i}") for i in range(10)])
+        calls = []
+
+        def is_odd(zone):
+            calls.append(zone.ref)
+            return int(zone.ref[1:]) % 2 == 1
+
+        # filters are called on selection
+        qs = db.zone.select(is_odd).select(lambda x: x.ref != "z1")
+        self.assertEqual(10, len(calls))
+        self.assertEqual(["z3", "z5", "z7", "z9"], [z.ref for z in qs])
+        self.assertEqual(4, len(qs))
+        self.assertEqual(10, len(calls))
+
+        # selections do not depend on later changes (loop variables included)
+        selections = {i: db.zone.select(lambda x: x.ref == f"z{i}") for i in range(3)}
+        self.assertEqual({0: ["z0"], 1: ["z1"], 2: ["z2"]}, {i: [z.ref for z in qs] for i, qs in selections.items()})
+        qs = db.zone.select(lambda x: x.ref.startswith("z1"))
+        db.zone.add(ref="z10")
+        self.assertEqual(["z1"], [z.ref for z in qs])
+        db.zone.one("z10").delete()
+
+        # short-circuits
+        calls.clear()
+        self.assertEqual("z4", db.zone.one(lambda x: x.ref == "z4").ref)
+        with self.assertRaises(MultipleRecordsReturnedError):
+            db.zone.one(is_odd)
+        self.assertEqual(["z0", "z1", "z2", "z3"], calls)
+        qs = db.zone.select()
+        self.assertEqual(10, len(qs))
+        self.assertIsNone(qs._records)
+        self.assertFalse(db.zone.select(lambda x: False))
+        with self.assertRaises(IndexError):
+            db.zone.select(lambda x: False)[0]
+
+        # querysets of given records are made unique, checked and sorted on consumption
+        z1, z2 = db.zone.one("z1"), db.zone.one("z2")
+        self.assertEqual([z1, z2], list(Queryset(db.zone, [z2, z1, z2])))
+        self.assertEqual([z2, z1], list(Queryset(db.zone, [z2, z1, z2], sort=False)))
+        self.assertEqual([z1], list(Queryset(db.zone, [z2, z1], sort=False).select(lambda x: x.ref == "z1")))
+        qs = Queryset(db.zone, [z1, AppBuildingDb().zone.add(ref="z1")])
+        self.assertRaises(RuntimeError, len, qs)
+
+    def test_queryset_indexing(self):
+        db = AppBuildingDb()
+        db.zone.batch_add([dict(ref=f"z{i}") for i in range(10)])
+        qs = db.zone.select(lambda x: x.ref != "z5")
+        refs = [z.ref for z in qs]
+        for i in range(-len(refs), len(refs)):
+            self.assertEqual(refs[i], qs[i].ref)
+        for item in (slice(2, 5), slice(None, None, -2), slice(-3, None), slice(20, 30)):
+            self.assertEqual(refs[item], [z.ref for z in qs[item]])
+        self.assertRaises(IndexError, lambda: qs[9])
+        self.assertEqual(refs[::-1], [z.ref for z in reversed(qs)])
+
+        # membership and positions
+        z7 = db.zone.one("z7")
+        self.assertIn(z7, qs)
+        self.assertNotIn(db.zone.one("z5"), qs)
+        self.assertEqual(6, qs.index(z7))
+        self.assertRaises(ValueError, qs.index, db.zone.one("z5"))
+
+    def test_select_by(self):
+        db = building_standard_populate(AppIndexesDb)
+        z0, z1, z2 = [db.zone.one(ref) for ref in ("z0", "z1", "z2")]
+
+        # indexed fields (links may be given as records or ids), other fields are filtered
+        self.assertEqual(["s10", "s11", "s12"], [s.ref for s in db.surface.select_by(major_zone="z1")])
+        self.assertEqual(["s11"], [s.ref for s in db.surface.select_by(major_zone=z1, minor_zone=z2)])
+        self.assertEqual(["s12"], [s.ref for s in db.surface.select_by(major_zone=z1, minor_zone=None)])
+        self.assertEqual(["s21"], [s.ref for s in db.surface.select_by(minor_zone=z2, ref="s21")])
+        self.assertEqual(0, len(db.surface.select_by(major_zone="unknown")))
+        self.assertRaises(KeyError, db.surface.select_by, unknown=1)
+
+        # indexes are kept in sync
+        db.surface.one("s12").update(major_zone=z0, ref="s03")
+        db.surface.add(ref="s13", major_zone="z1", minor_zone="z2")
+        db.surface.one("s10").delete()
+        self.assertEqual(["s00", "s01", "s02", "s03"], [s.ref for s in db.surface.select_by(major_zone=z0)])
+        self.assertEqual(["s11", "s13"], [s.ref for s in db.surface.select_by(major_zone=z1, minor_zone=z2)])
+        db.surface.one("s11").minor_zone = None
+        self.assertEqual(["s11"], [s.ref for s in db.surface.select_by(major_zone=z1, minor_zone=None)])
+
+        # unique fields are indexed, pk updates are taken into account
+        db = AppUniqueTogetherDb()
+        db.vertex.batch_add([dict(pk=i, x=i, y=0, z=0) for i in range(3)])
+        db.vertex.one(1).update(pk=10, x=5)
+        self.assertEqual([10], [v.pk for v in db.vertex.select_by(x=5, y=0, z=0)])
+        self.assertEqual([], list(db.vertex.select_by(x=1, y=0, z=0)))
+        self.assertEqual([0, 2, 10], [v.pk for v in db.vertex.select_by(y=0)])
+
+    def test_select_range(self):
+        db = AppSortedIndexesDb()
+        db.simple.batch_add([
+            dict(ref=f"s{i}", age=i % 5, optional_age=None if i % 4 == 0 else i % 5) for i in range(20)])
+
+        def check(field_name, lo, hi):
+            # indexed (optional_age) and non indexed (age) fields return the same results as a scan
+            expected = sorted(
+                (r for r in db.simple if
+                 getattr(r, field_name) is not None and
+                 (lo is None or lo <= getattr(r, field_name)) and
+                 (hi is None or getattr(r, field_name) <= hi)),
+                key=lambda r: getattr(r, field_name)
+            )
+            qs = db.simple.select_range(field_name, lo, hi)
+            self.assertEqual([getattr(r, field_name) for r in expected], [getattr(r, field_name) for r in qs])
+            self.assertEqual(set(expected), set(qs))
+
+        for field_name in ("age", "optional_age"):
+            for lo, hi in ((1, 3), (2, 2), (None, 1), (3, None), (None, None), (4, 1), (1.5, 3.5)):
+                check(field_name, lo, hi)
+
+        # order by (None values last)
+        for field_name in ("age", "optional_age"):
+            for reverse in (False, True):
+                values = [r.optional_age for r in db.simple.order_by("optional_age", reverse=reverse)]
+                self.assertEqual(sorted(values[:15], reverse=reverse) + [None] * 5, values)
+                self.assertEqual(20, len(db.simple.order_by(field_name, reverse=reverse)))
+        self.assertRaises(KeyError, db.simple.select_range, "unknown", 0, 1)
+
+        # index is kept in sync
+        db.simple.one("s1").optional_age = 10
+        db.simple.one("s4").update(optional_age=0)
+        db.simple.one("s2").optional_age = None
+        db.simple.one("s3").delete()
+        db.simple.add(ref="s20", optional_age=3, age=0)
+        self.assertEqual(["s4", "s5", "s10", "s15"], [r.ref for r in db.simple.select_range("optional_age", hi=0)])
+        self.assertEqual(["s13", "s18", "s20"], [r.ref for r in db.simple.select_range("optional_age", 3, 3)])
+        self.assertEqual(["s1"], [r.ref for r in db.simple.select_range("optional_age", 5)])
+        self.assertEqual(  # None values last, in indexing order
+            ["s0", "s2", "s8", "s12", "s16"], [r.ref for r in db.simple.order_by("optional_age")[-5:]])
+        for lo, hi in ((0, 2), (3, 10)):
+            check("optional_age", lo, hi)
+
+    def test_unique_together(self):
+        db = AppUniqueTogetherDb()
+        db.vertex.batch_add([dict(pk=i, x=i, y=0, z=0) for i in range(10)])
+        v1 = db.vertex.one(lambda x: x.pk == 1)
+
+        # update to existing values
+        with self.assertRaises(OExceptionCollection) as cm:
+            v1.update(x=2)
+        self.assertEqual(
+            {"/vertex/1", "/vertex/2"},
+            {e.instance for e in cm.exception}
+        )
+
+        # come back to unique values
+        v1.update(x=1)
+        v1.update(x=2, y=1)
+        db.vertex.one(lambda x: x.pk == 2).delete()
+        v1.update(y=0)
+
+    def test_sortable(self):
+        db = AppSortable()
+        db.item.batch_add([dict(ref=f"i{i}") for i in range(5)])
+
+        # insert (last added wins)
+        db.item.batch_add([dict(ref="a", sort_index=1), dict(ref="b", sort_index=1)])
+        self.assertEqual(["i0", "b", "a", "i1", "i2", "i3", "i4"], [r.ref for r in db.item])
+
+        # move rightwards, then leftwards
+        db.item.one("i0").sort_index = 2
+        self.assertEqual(["b", "a", "i0", "i1", "i2", "i3", "i4"], [r.ref for r in db.item])
+        db.item.one("i4").sort_index = 0
+        self.assertEqual(["i4", "b", "a", "i0", "i1", "i2", "i3"], [r.ref for r in db.item])
+
+        # delete
+        db.item.one("a").delete()
+        self.assertEqual(list(range(6)), [r.sort_index for r in db.item])
+        self.assertEqual(3, db.item.one("i1").get_index())
+
+        # big batch (last added wins)
+        db.item.batch_add([dict(ref=f"l{i}", sort_index=0) for i in range(100)])
+        self.assertEqual("l99", db.item.one(lambda x: x.sort_index == 0).ref)
+        self.assertEqual(99, db.item.one("l0").sort_index)
+        self.assertEqual(100, db.item.one("i4").sort_index)
+
+        # groups
+        db.grouped_item.batch_add([dict(ref=f"g{i}", group=i % 2) for i in range(6)])
+        self.assertEqual(["g0", "g2", "g4", "g1", "g3", "g5"], [r.ref for r in db.grouped_item])
+        self.assertEqual([0, 1, 2, 0, 1, 2], [r.sort_index for r in db.grouped_item])
+
+        # change group
+        db.grouped_item.one("g2").update(group=1, sort_index=0)
+        self.assertEqual(["g0", "g4", "g2", "g1", "g3", "g5"], [r.ref for r in db.grouped_item])
+        self.assertEqual(1, db.grouped_item.one("g4").sort_index)
+        self.assertEqual(2, db.grouped_item.one("g2").get_index())
+
+        # change group, sort index is kept: record goes before the record that has it in new group
+        db.grouped_item.one("g4").group = 1
+        self.assertEqual(["g0", "g2", "g4", "g1", "g3", "g5"], [r.ref for r in db.grouped_item])
+        db.grouped_item.one("g0").update(group=1, sort_index=0)  # current sort index
+        self.assertEqual(["g0", "g2", "g4", "g1", "g3", "g5"], [r.ref for r in db.grouped_item])
+        self.assertEqual(list(range(6)), [r.sort_index for r in db.grouped_item])
+
+        # requested sort indexes are compared with record positions, groups are not renumbered on moves
+        db = AppSortable()
+        db.item.batch_add([dict(ref=f"i{i}") for i in range(5)])
+        self.assertEqual(0, db.item.one("i0").sort_index)
+        db.item.one("i0").sort_index = 3
+        db.item.one("i4").sort_index = 4  # current position, not moved
+        self.assertEqual({None}, db.item._sort_manager._dirty_groups)
+        self.assertEqual(["i1", "i2", "i3", "i0", "i4"], [r.ref for r in db.item])
+        self.assertEqual(3, db.item.one("i0").sort_index)
+
+    def test_sortable_link_group(self):
+        # surfaces are grouped by zone ref
+        db = AppSortableLink()
+        db.zone.batch_add([dict(ref="a"), dict(ref="b")])
+        db.surface.batch_add([dict(ref="s1", zone="a"), dict(ref="s2", zone="a"), dict(ref="s3", zone="b")])
+
+        # groups of pointing records follow linked record modifications (records keep their order)
+        db.zone.one("a").ref = "c"
+        db.surface.add(ref="s4", zone="c")
+        expected = [("s3", "b", 0), ("s1", "c", 0), ("s2", "c", 1), ("s4", "c", 2)]
+        self.assertEqual(expected, [(s.ref, s.sort_group, s.sort_index) for s in db.surface])
+
+        # rollback
+        with self.assertRaises(KeyError):
+            with db.batch():
+                db.zone.one("c").ref = "a"
+                db.surface.add(ref="s5", zone="a", sort_index=0)
+                raise KeyError("a")
+        self.assertEqual(expected, [(s.ref, s.sort_group, s.sort_index) for s in db.surface])
+
     def test_rename(self):
         db = building_standard_populate()
         links_before = db.surface.one("s00").get_pointed_records()